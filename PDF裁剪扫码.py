@@ -1,49 +1,60 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog, messagebox
-import fitz  # PyMuPDF
-from PIL import Image
-import numpy as np
 import os
 import subprocess
 import tempfile
 import shutil
-import pandas as pd
-import cv2
-from pyzbar.pyzbar import decode
-from pdf2image import convert_from_path
 from datetime import datetime
 import re
 import sys
 import logging
 import threading
+import multiprocessing
+
+# 处理引擎(pdfclip.engine)及 PyMuPDF、OpenCV、pyzbar、openpyxl 等重量级依赖在开始处理时才导入
+from pdfclip import default_workers
+from pdfclip.barcode import BARCODE_BACKENDS, normalize_barcode
+from pdfclip.probe import check_poppler, check_zbar
+from pdfclip.trace import span
+from pdfclip.uiqueue import UIEventQueue, run_actions, start_pump, trim_text
+
+# 界面事件队列：处理线程只投递事件，由主线程定时批量更新界面
+ui_events = UIEventQueue()
+UI_UPDATES_PER_SECOND = 10  # 界面每秒最多刷新次数
+MAX_LOG_LINES = 5000  # 日志框最多保留的行数
 
 # 定义日志函数
 def log_message(message, level="info"):
-    """记录日志消息到日志框"""
-    global log_text
-    if log_text:
-        timestamp = datetime.now().strftime("%H:%M:%S")
+    """记录日志消息到日志框（可在任意线程中调用）"""
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    ui_events.log(f"[{timestamp}] {message}", level)
+
+def set_status(text):
+    """更新状态栏（可在任意线程中调用，只显示最新状态）"""
+    ui_events.status(text)
+
+def apply_ui_events(batch):
+    """在主线程中合并应用一批界面事件"""
+    with span("ui_update", cat="ui", logs=len(batch.logs), dropped=batch.dropped):
+        _apply_ui_events(batch)
+
+def _apply_ui_events(batch):
+    if log_text and (batch.logs or batch.dropped):
+        lines = [text for text, _ in batch.logs]
+        if batch.dropped:
+            lines.insert(0, f"...（省略 {batch.dropped} 条日志，完整内容见日志文件）")
         log_text.configure(state='normal')
-        log_text.insert(tk.END, f"[{timestamp}] {message}\n")
+        log_text.insert(tk.END, "\n".join(lines) + "\n")
+        trim_text(log_text, MAX_LOG_LINES)
         log_text.see(tk.END)  # 自动滚动到底部
         log_text.configure(state='disabled')
-
-# 创建主窗口 - 改为标准tkinter样式
-window = tk.Tk()
-window.title("PDF 自动裁剪与重命名工具")
-window.resizable(False, False)  # 固定窗口大小
-window_width = 1200
-window_height = 1000
-window.geometry(f"{window_width}x{window_height}")
-
-# 检查并设置程序图标
-icon_path = os.path.join(os.path.dirname(__file__), "PDF裁剪扫码.ico")
-if os.path.exists(icon_path):
-    try:
-        window.iconbitmap(icon_path)
-    except Exception as e:
-        log_message(f"设置图标失败: {str(e)}", "warning")
+    if batch.status is not None:
+        status_label.config(text=batch.status)
+    if batch.progress is not None:
+        progress_bar.config(value=batch.progress.fraction * 100)
+        progress_label.config(text=batch.progress.describe())
+    run_actions(batch, messagebox)
 
 # ==================== 打包环境支持 ====================
 def resource_path(relative_path):
@@ -72,10 +83,23 @@ if os.name == 'nt':  # 仅在 Windows 上启用 DPI 感知
         print("Failed to set DPI awareness")
 
 # ==================== 全局变量 ==================== 
-enable_rename_var = tk.BooleanVar(value=True)
-enable_logging_var = tk.BooleanVar(value=True)
-report_path = tk.StringVar()  # 不再设置初始值，改为输出文件夹改变时动态更新
-poppler_path = tk.StringVar(value="poppler/bin")  # 修改为默认相对路径
+# Tk 变量与控件在 create_main_window()/build_ui() 中创建，
+# 使多进程工作进程导入本脚本时不会创建窗口
+window = None
+enable_rename_var = None
+enable_logging_var = None
+enable_pipeline_var = None  # 内存流水线模式（不写临时文件）
+report_path = None  # 不再设置初始值，改为输出文件夹改变时动态更新
+poppler_path = None
+barcode_backend_var = None  # 条码识别渲染后端: pymupdf / poppler
+workers_var = None  # 工作进程数
+enable_cache_var = None  # 启用结果缓存
+enable_resume_var = None  # 断点续传
+enable_trace_var = None  # 记录跟踪(Chrome trace)
+vector_crop_var = None  # 矢量裁剪：由绘制记录计算裁剪区域，不渲染页面
+cropbox_page_var = None  # 改写页面框：输出页面不嵌入 XObject
+text_layer_var = None  # 优先从文字层读取运单号
+learn_rois_var = None  # 学习各版式的条码位置
 log_text = None  # 用于日志文本框的全局引用
 is_processing = False  # 添加处理状态标志
 
@@ -105,8 +129,24 @@ def check_dll_files():
     log_message(f"libiconv2.dll路径检查通过: {libiconv}")
     return True
 
-def check_dependencies():
-    """简化后的依赖检查"""
+def check_poppler_backend(refresh=False):
+    """检查 poppler 后端所需的 poppler 与 libiconv2.dll"""
+    if not check_poppler_installed(refresh) and not is_frozen:
+        log_message("警告: Poppler未安装，条码检测功能可能无法正常工作！", "warning")
+        log_message("请安装Poppler: https://github.com/oschwartz10612/poppler-windows/releases/", "warning")
+    
+    if not check_dll_files():
+        log_message("警告: 部分依赖库缺失，功能可能受限", "warning")
+
+def on_barcode_backend_changed(event=None):
+    """切换条码识别后端"""
+    backend = barcode_backend_var.get()
+    log_message(f"条码识别后端: {backend}")
+    if backend == "poppler":
+        check_poppler_backend()
+
+def check_dependencies(refresh=False):
+    """简化后的依赖检查（功能测试结果会被缓存，refresh 为 True 时重新检测）"""
     poppler = resource_path(poppler_path.get()) if poppler_path.get() else resource_path("poppler/bin")
     libiconv = resource_path("libiconv2.dll")
     
@@ -119,14 +159,15 @@ def check_dependencies():
     log_message(f"Poppler {'存在' if poppler_exists else '不存在'}")
     log_message(f"libiconv2.dll {'存在' if libiconv_exists else '不存在'}")
     
-    # 功能测试
-    try:
-        # 测试条码识别功能
-        test_image = np.zeros((100, 100), dtype=np.uint8)
-        decode(test_image)  # 尝试解码空白图像
+    # 功能测试：测试条码识别功能
+    if check_zbar(refresh=refresh):
         log_message("条码识别功能测试通过")
-    except Exception as e:
-        log_message(f"条码识别功能测试失败: {str(e)}", "error")
+    else:
+        log_message("条码识别功能测试失败: 无法加载条码识别库", "error")
+    
+    # 仅在选择 poppler 后端时检查 poppler 与 DLL
+    if barcode_backend_var.get() == "poppler":
+        check_poppler_backend(refresh)
     
     # 更新状态栏
     status_label.config(text=f"Poppler路径: {poppler}\nlibiconv2.dll路径: {libiconv}")
@@ -158,242 +199,29 @@ def select_report_path():
     """删除此函数，不再需要手动选择报告路径"""
     pass
 
-def split_pdf_to_single_pages(input_pdf_path, output_folder):
-    """将PDF拆分为单页文件"""
-    os.makedirs(output_folder, exist_ok=True)
-    pdf_document = fitz.open(input_pdf_path)
-    file_name = os.path.splitext(os.path.basename(input_pdf_path))[0]
-    page_files = []
-    
-    for page_number in range(pdf_document.page_count):
-        # 创建单页PDF
-        single_page_pdf = fitz.open()
-        single_page_pdf.insert_pdf(pdf_document, from_page=page_number, to_page=page_number)
-        
-        # 保存单页文件
-        output_path = os.path.join(output_folder, f"{file_name}_page{page_number+1}.pdf")
-        single_page_pdf.save(output_path)
-        single_page_pdf.close()
-        page_files.append(output_path)
-    
-    pdf_document.close()
-    return page_files
-
-def auto_crop_pdf(input_pdf_path, output_pdf_path, border_width=5):
-    """自动裁剪单页PDF文件中的内容区域"""
-    pdf_document = fitz.open(input_pdf_path)
-    output_pdf = fitz.open()
-
-    for page_number in range(pdf_document.page_count):
-        page = pdf_document[page_number]
-        pix = page.get_pixmap()
-        
-        # 将 PDF 页面转换为 PIL 图像
-        image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-
-        # 转换为灰度图
-        image = image.convert("L")
-        image_array = np.array(image)
-
-        # 获取图像尺寸
-        height, width = image_array.shape
-
-        # 初始化裁剪边界
-        left, top, right, bottom = width, height, 0, 0
-
-        # 判断像素是否位于边框
-        def is_border_pixel(x, y):
-            return x < border_width or y < border_width or x >= width - border_width or y >= height - border_width
-        
-        # 寻找所有非白色像素，并且忽略边框
-        for y in range(height):
-            for x in range(width):
-                if not is_border_pixel(x, y) and image_array[y, x] < 255:
-                    left = min(left, x)
-                    right = max(right, x)
-                    top = min(top, y)
-                    bottom = max(bottom, y)
-                    
-        # 如果整个页面都是白色或只有边框，则不裁剪
-        if left == width and top == height and right == 0 and bottom == 0:
-            new_page = output_pdf.new_page(width=pix.width, height=pix.height)
-            new_page.show_pdf_page(new_page.rect, pdf_document, page_number)
-            continue
-        
-        # 创建裁剪区域的矩形
-        crop_rect = fitz.Rect(left, top, right + 1, bottom + 1)  # 注意加一操作
-
-        # 创建新的 PDF 页面
-        new_page = output_pdf.new_page(width=crop_rect.width, height=crop_rect.height)
-
-        # 从原始页面提取并显示内容
-        new_page.show_pdf_page(new_page.rect, pdf_document, page_number, clip=crop_rect)
-
-    # 保存输出 PDF
-    output_pdf.save(output_pdf_path)
-    pdf_document.close()
-    output_pdf.close()
-
-def resize_pdf_page(input_pdf_path, output_pdf_path, target_width_mm=100, target_height_mm=150):
-    """
-    调整PDF页面大小为指定的毫米尺寸
-    
-    Args:
-        input_pdf_path: 输入PDF文件路径
-        output_pdf_path: 输出PDF文件路径
-        target_width_mm: 目标宽度(毫米)
-        target_height_mm: 目标高度(毫米)
-    """
-    # 毫米转换为点 (1mm = 2.83465点)
-    target_width_pt = target_width_mm * 2.83465
-    target_height_pt = target_height_mm * 2.83465
-    
-    # 打开原始PDF
-    doc = fitz.open(input_pdf_path)
-    
-    # 创建新PDF
-    new_doc = fitz.open()
-    
-    for page in doc:
-        # 获取原始页面的边界框
-        original_bbox = page.rect
-        
-        # 创建新页面
-        new_page = new_doc.new_page(width=target_width_pt, height=target_height_pt)
-        
-        # 计算缩放比例
-        scale_x = target_width_pt / original_bbox.width
-        scale_y = target_height_pt / original_bbox.height
-        
-        # 使用最小值确保内容完整显示（保持纵横比）
-        scale = min(scale_x, scale_y)
-        
-        # 计算缩放后的宽高
-        scaled_width = original_bbox.width * scale
-        scaled_height = original_bbox.height * scale
-        
-        # 计算偏移量以居中内容
-        offset_x = (target_width_pt - scaled_width) / 2
-        offset_y = (target_height_pt - scaled_height) / 2
-        
-        # 在新页面上创建用于内容的矩形（居中）
-        content_rect = fitz.Rect(offset_x, offset_y, 
-                                offset_x + scaled_width, 
-                                offset_y + scaled_height)
-        
-        # 复制原始内容到新页面
-        new_page.show_pdf_page(
-            content_rect,   # 目标矩形（居中）
-            doc,            # 源文档
-            page.number     # 源页面索引
-        )
+def get_poppler_path():
+    """返回条码识别使用的Poppler路径"""
+    poppler = poppler_path.get() if poppler_path.get() else None
     
-    # 保存调整后的PDF
-    new_doc.save(output_pdf_path)
-    doc.close()
-    new_doc.close()
-
-def detect_barcode_in_pdf(pdf_path):
-    """检测PDF文件中的条码并返回条码内容"""
-    try:
-        # 尝试使用poppler（如果可用）
-        poppler = poppler_path.get() if poppler_path.get() else None
-        
-        # 在打包环境中使用资源路径
-        if is_frozen and not poppler:
-            poppler = resource_path("poppler/bin")
-        
-        # 将PDF页面转换为图像
-        images = convert_from_path(pdf_path, dpi=200, grayscale=True, poppler_path=poppler)
-        
-        for img in images:
-            # 转换为OpenCV格式
-            open_cv_image = np.array(img)
-            height, width = open_cv_image.shape
-            
-            # 根据快递面单特点，条码通常在右上角
-            start_x = int(width * 0.6)  # 右半部分
-            start_y = int(height * 0.1)  # 上半部分
-            end_x = int(width * 0.95)    # 保留边缘安全距离
-            end_y = int(height * 0.4)    # 保证条码完整
-            
-            cropped_img = open_cv_image[start_y:end_y, start_x:end_x]
-            
-            # 增强对比度（黑白图像特别有效）
-            enhanced_img = cv2.convertScaleAbs(cropped_img, alpha=1.8, beta=40)
-            
-            # 检测条码
-            barcodes = decode(enhanced_img)
-            
-            # 如果未检测到，尝试整个页面
-            if not barcodes:
-                barcodes = decode(open_cv_image)
-            
-            for barcode in barcodes:
-                try:
-                    barcode_data = barcode.data.decode("utf-8")
-                    if barcode_data:
-                        return barcode_data
-                except UnicodeDecodeError:
-                    try:
-                        barcode_data = barcode.data.decode("latin-1")
-                        if barcode_data:
-                            return barcode_data
-                    except:
-                        continue
-        return None
-    except Exception as e:
-        log_message(f"条码检测失败: {os.path.basename(pdf_path)} - {str(e)}")
-        return None
-
-def generate_rename_report(report_data, report_file_path):
-    """生成重命名报告Excel文件"""
-    try:
-        # 确保报告目录存在
-        report_dir = os.path.dirname(report_file_path)
-        if report_dir and not os.path.exists(report_dir):
-            os.makedirs(report_dir, exist_ok=True)
-        
-        # 如果文件已存在，先删除
-        if os.path.exists(report_file_path):
-            os.remove(report_file_path)
-        
-        # 创建DataFrame
-        df = pd.DataFrame(report_data)
-        
-        # 确保列顺序一致
-        columns = ["原始文件名", "页码", "新文件名", "条码内容"]
-        df = df[columns]
-        
-        # 保存Excel文件
-        df.to_excel(report_file_path, index=False, engine='openpyxl')
-        return True
-    except Exception as e:
-        log_message(f"生成Excel报告失败: {str(e)}")
-        return False
-
-def check_poppler_installed():
-    """检查poppler是否安装"""
-    try:
-        # 在打包环境中直接返回True
-        if is_frozen:
-            return True
-            
-        # 尝试导入pdf2image
-        from pdf2image import pdfinfo_from_path
-        # 尝试获取PDF信息
-        with tempfile.NamedTemporaryFile(suffix='.pdf') as temp_pdf:
-            # 创建一个空白PDF
-            doc = fitz.open()
-            doc.new_page(width=100, height=100)
-            doc.save(temp_pdf.name)
-            doc.close()
-            
-            # 尝试获取信息
-            pdfinfo_from_path(temp_pdf.name)
+    # 在打包环境中使用资源路径
+    if is_frozen and not poppler:
+        poppler = resource_path("poppler/bin")
+    return poppler
+
+def detect_barcode_in_pdf(pdf_path, backend=None, cache=None, text_layer="off"):
+    """检测PDF文件中的条码并返回条码内容（使用界面中选择的后端与Poppler路径）"""
+    backend = backend or barcode_backend_var.get()
+    poppler = get_poppler_path() if backend == "poppler" else None
+    from pdfclip import engine
+    return engine.detect_barcode_in_pdf(pdf_path, backend=backend, poppler_path=poppler, cache=cache,
+                                        text_layer=text_layer)
+
+def check_poppler_installed(refresh=False):
+    """检查poppler是否安装（结果按环境缓存）"""
+    # 在打包环境中直接返回True
+    if is_frozen:
         return True
-    except Exception as e:
-        return False
+    return check_poppler(refresh=refresh)
 
 def search_log():
     """搜索日志内容"""
@@ -452,6 +280,15 @@ def process_pdf_files():
     output_folder = output_folder_entry.get()
     enable_rename = enable_rename_var.get()
     enable_logging = enable_logging_var.get()
+    enable_pipeline = enable_pipeline_var.get()
+    workers_str = workers_var.get()
+    enable_cache = enable_cache_var.get()
+    enable_resume = enable_resume_var.get()
+    enable_trace = enable_trace_var.get()
+    crop_mode = "vector" if vector_crop_var.get() else "raster"
+    page_mode = "cropbox" if cropbox_page_var.get() else "xobject"
+    text_layer = "first" if text_layer_var.get() else "off"
+    learn_rois = learn_rois_var.get()
     report_file_path = report_path.get()
 
     if not file_paths:
@@ -466,6 +303,15 @@ def process_pdf_files():
         log_message("错误: 边框宽度必须是整数", "error")
         return
     
+    try:
+        workers = int(workers_str)
+        if workers < 1:
+            raise ValueError
+    except ValueError:
+        status_label.config(text="错误: 工作进程数必须是正整数")
+        log_message("错误: 工作进程数必须是正整数", "error")
+        return
+    
     if not output_folder:
         output_folder = "output"  # 设置默认输出文件夹为 output
         os.makedirs(output_folder, exist_ok=True)  # 如果文件夹不存在，创建它
@@ -481,6 +327,16 @@ def process_pdf_files():
             log_message(message, "error")
             return
 
+    cache_path = None
+    if enable_cache:
+        from pdfclip.resultcache import default_cache_path
+        cache_path = default_cache_path()
+
+    roi_memory_path = None
+    if learn_rois:
+        from pdfclip.roimemory import default_memory_path
+        roi_memory_path = default_memory_path()
+
     # 禁用处理按钮
     process_button.config(state=tk.DISABLED)
     is_processing = True
@@ -490,7 +346,9 @@ def process_pdf_files():
     # 创建后台处理线程
     processing_thread = threading.Thread(
         target=process_pdf_files_thread,
-        args=(file_paths, border_width, output_folder, enable_rename, enable_logging, report_file_path),
+        args=(file_paths, border_width, output_folder, enable_rename, enable_logging, report_file_path,
+              enable_pipeline, workers, cache_path, enable_resume, enable_trace, crop_mode,
+              page_mode, text_layer, roi_memory_path),
         daemon=True
     )
     processing_thread.start()
@@ -498,12 +356,120 @@ def process_pdf_files():
     # 启动线程状态检查
     window.after(100, check_thread_status, processing_thread)
 
-def process_pdf_files_thread(file_paths, border_width, output_folder, enable_rename, enable_logging, report_file_path):
+def handle_page_result(result, enable_rename, logger, processed_files, report):
+    """记录内存流水线/多进程模式下单页的处理结果，重命名成功的页面写入报告"""
+    from pdfclip.report import report_row
+    
+    file_name = result.source_name
+    i = result.page_number - 1
+    if result.error:
+        msg = f"处理 {file_name} 第 {i+1} 页时发生错误: {result.error}"
+        set_status(f"处理 {file_name} 第 {i+1} 页时出错")
+        log_message(msg, "error")
+        if logger:
+            logger.error(msg)
+        return
+    
+    processed_files.append(result.output_path)
+    if result.renamed:
+        if report:
+            report.write(report_row(result))
+        msg = f"第 {i+1} 页处理完成，已命名为: {result.output_name}"
+        log_message(msg)
+        if logger:
+            logger.info(f"{msg} (条码: {result.barcode})")
+    else:
+        if not enable_rename:
+            msg = f"第 {i+1} 页处理完成: {result.output_name}"
+        elif result.raw_barcode:
+            msg = f"条码内容无效: {result.barcode}"
+        elif result.barcode_error:
+            msg = f"条码检测失败({result.barcode_error}): {result.output_name}"
+        else:
+            msg = f"未检测到条码: {result.output_name}"
+        log_message(msg, "warning" if enable_rename else "info")
+        if logger:
+            if enable_rename:
+                logger.warning(msg)
+            else:
+                logger.info(msg)
+    set_status(f"已完成 {file_name} 第 {i+1} 页的处理")
+
+def process_files_with_engine(file_paths, border_width, output_folder, enable_rename, workers, logger,
+                              processed_files, report, cache_path=None, manifest=None, completed=None,
+                              progress=None, metrics=None, crop_mode="raster", page_mode="xobject",
+                              text_layer="off", roi_memory_path=None):
+    """内存流水线模式：由处理引擎逐页处理，workers 大于 1 时使用多进程
+
+    每完成一页就追加到处理清单 manifest；completed 中的页面(断点续传)被跳过。
+    roi_memory_path 不为 None 时按版式学习条码位置(见 pdfclip.roimemory)。
+    返回结果缓存的 (命中次数, 未命中次数)
+    """
+    from pdfclip import engine
+    
+    backend = barcode_backend_var.get()
+    poppler = get_poppler_path() if backend == "poppler" else None
+    if workers > 1:
+        log_message(f"使用 {workers} 个工作进程处理")
+        if logger:
+            logger.info(f"使用 {workers} 个工作进程处理")
+    
+    current_file = None
+    cache_hits = cache_misses = 0
+    for result in engine.process_files(file_paths, output_folder, border_width=border_width,
+                                       enable_rename=enable_rename, workers=workers,
+                                       barcode_backend=backend, poppler_path=poppler,
+                                       cache_path=cache_path, completed=completed, progress=progress,
+                                       metrics=metrics, crop_mode=crop_mode, page_mode=page_mode,
+                                       text_layer=text_layer, roi_memory_path=roi_memory_path):
+        cache_hits += result.cache_hits
+        cache_misses += result.cache_misses
+        if result.page_number == 0:
+            msg = f"打开 {result.source_name} 时发生错误: {result.error}"
+            set_status(f"打开 {result.source_name} 时发生错误")
+            log_message(msg, "error")
+            if logger:
+                logger.error(msg)
+            continue
+        if result.source_name != current_file:
+            current_file = result.source_name
+            set_status(f"处理 {current_file}...")
+            log_message(f"处理文件: {current_file}")
+            if logger:
+                logger.info(f"开始处理文件: {current_file}")
+        handle_page_result(result, enable_rename, logger, processed_files, report)
+        if manifest and not result.error:
+            manifest.append(result)
+        if progress:
+            ui_events.progress(progress.snapshot())
+    return cache_hits, cache_misses
+
+def process_pdf_files_thread(file_paths, border_width, output_folder, enable_rename, enable_logging, report_file_path,
+                             enable_pipeline=False, workers=1, cache_path=None, enable_resume=False,
+                             enable_trace=False, crop_mode="raster", page_mode="xobject", text_layer="off",
+                             roi_memory_path=None):
     """PDF文件处理线程"""
+    from pdfclip import engine
+    from pdfclip.manifest import RunManifest, default_manifest_path
+    from pdfclip.metrics import StageMetrics, record_timings, stage
+    from pdfclip.pipeline import barcode_output_path
+    from pdfclip.progress import ProgressTracker, count_pages
+    from pdfclip.report import open_report_sink
+    from pdfclip.resultcache import shared_cache
+    from pdfclip.trace import TraceWriter, emit, now_us
+    
     # 创建临时文件夹用于处理单页
     temp_folder = tempfile.mkdtemp()
     processed_files = []  # 保存处理后的文件路径
-    report_data = []  # 保存重命名报告数据
+    report = None  # 重命名报告写入器，每完成一页追加一行
+    report_failed = False
+    cache_stats = None  # 结果缓存的 (命中次数, 未命中次数)
+    cache = shared_cache(cache_path)  # 传统模式下在本线程中使用的结果缓存
+    cache_before = (cache.hits, cache.misses) if cache else (0, 0)
+    manifest = None  # 处理清单（内存流水线模式下用于断点续传）
+    progress = None  # 分阶段进度统计
+    metrics = StageMetrics()  # 各阶段耗时统计
+    trace_writer = None  # 跟踪记录（启用时写出 Chrome trace JSON）
     
     # 创建日志记录器（如果需要）
     logger = None
@@ -527,158 +493,234 @@ def process_pdf_files_thread(file_paths, border_width, output_folder, enable_ren
         logger.info(f"边框宽度: {border_width} 像素")
         logger.info(f"启用重命名: {'是' if enable_rename else '否'}")
         logger.info(f"启用日志记录: {'是' if enable_logging else '否'}")
+        logger.info(f"内存流水线模式: {'是' if enable_pipeline else '否'}")
+        logger.info(f"工作进程数: {workers}")
+        logger.info(f"结果缓存: {cache_path or '未启用'}")
+        logger.info(f"断点续传: {'是' if enable_resume else '否'}")
+        logger.info(f"学习条码位置: {roi_memory_path or '否'}")
         logger.info(f"报告路径: {report_file_path}")
     
     try:
+        if enable_trace:
+            trace_path = os.path.join(output_folder, f"处理跟踪_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+            trace_writer = TraceWriter(trace_path).activate()
+            log_message(f"记录跟踪: {trace_path}")
+        
+        if enable_rename:
+            try:
+                report = open_report_sink(report_file_path)
+            except (OSError, ValueError) as e:
+                report_failed = True
+                msg = f"无法创建重命名报告: {str(e)}"
+                log_message(msg, "error")
+                if logger:
+                    logger.error(msg)
+        
+        # 快速统计总页数，用于显示进度、吞吐量和剩余时间
+        page_counts = count_pages([path for path in file_paths if os.path.isfile(path)])
+        total_pages = sum(page_counts.values())
+        progress = ProgressTracker(total_pages, ("split", "crop", "barcode") if enable_rename else ("split", "crop"))
+        ui_events.progress(progress.snapshot())
+        log_message(f"共 {len(page_counts)} 个文件，{total_pages} 页")
+        
+        if enable_resume and not enable_pipeline:
+            msg = "断点续传需要启用内存流水线模式，本次将完整处理所有页面"
+            log_message(msg, "warning")
+            if logger:
+                logger.warning(msg)
+        
+        if enable_pipeline:
+            manifest = RunManifest(default_manifest_path(output_folder), resume=enable_resume)
+            completed = manifest.completed_pages() if enable_resume else None
+            if completed:
+                msg = f"断点续传: 跳过 {sum(len(pages) for pages in completed.values())} 个已完成的页面"
+                log_message(msg)
+                if logger:
+                    logger.info(msg)
+                # 之前运行中已完成(本次跳过)的页面先写入报告
+                if report:
+                    report.write_rows(manifest.report_rows(completed))
+                skipped = sum(len(completed.get(os.path.abspath(path), ())) for path in page_counts)
+                for stage_name in progress.stages:
+                    progress.set_total(stage_name, total_pages - skipped)
+            
+            existing_files = []
+            for input_pdf_path in file_paths:
+                if os.path.isfile(input_pdf_path):
+                    existing_files.append(input_pdf_path)
+                else:
+                    msg = f"文件不存在: {input_pdf_path}"
+                    log_message(msg, "warning")
+                    if logger:
+                        logger.warning(msg)
+            cache_stats = process_files_with_engine(existing_files, border_width, output_folder, enable_rename,
+                                                    workers, logger, processed_files, report, cache_path,
+                                                    manifest, completed, progress, metrics, crop_mode,
+                                                    page_mode, text_layer, roi_memory_path)
+            file_paths = []  # 已全部由处理引擎处理
+        
         for input_pdf_path in file_paths:
             # 检查输入文件是否存在
             if not os.path.isfile(input_pdf_path):
                 msg = f"文件不存在: {input_pdf_path}"
-                messagebox.showwarning("警告", msg)
-                status_label.config(text=f"跳过不存在的文件: {os.path.basename(input_pdf_path)}")
+                ui_events.dialog("showwarning", "警告", msg)
+                set_status(f"跳过不存在的文件: {os.path.basename(input_pdf_path)}")
                 log_message(msg, "warning")
                 if logger:
                     logger.warning(msg)
-                window.update_idletasks()
                 continue
                 
             file_name = os.path.basename(input_pdf_path)
             base_name = os.path.splitext(file_name)[0]
+            file_start_us = now_us()
             
             # 步骤1: 将PDF分割为单页
-            window.after(0, lambda msg=f"分割 {file_name} 为单页...": status_label.config(text=msg))
-            window.after(0, lambda: log_message(f"分割文件: {file_name}"))
-            window.update_idletasks()
+            set_status(f"分割 {file_name} 为单页...")
+            log_message(f"分割文件: {file_name}")
             if logger:
                 logger.info(f"开始分割文件: {file_name}")
                 
             try:
-                page_files = split_pdf_to_single_pages(input_pdf_path, temp_folder)
+                with record_timings({}) as split_timings:
+                    page_files = engine.split_pdf_to_single_pages(input_pdf_path, temp_folder)
+                metrics.observe_timings(split_timings)
                 if logger:
                     logger.info(f"成功分割 {file_name} 为 {len(page_files)} 页")
                 log_message(f"成功分割 {file_name} 为 {len(page_files)} 页")
             except Exception as e:
                 msg = f"分割 {file_name} 时发生错误: {str(e)}"
-                messagebox.showerror("错误", msg)
-                status_label.config(text=f"分割 {file_name} 时发生错误")
+                ui_events.dialog("showerror", "错误", msg)
+                set_status(f"分割 {file_name} 时发生错误")
                 log_message(msg, "error")
                 if logger:
                     logger.error(msg)
-                window.update_idletasks()
+                # 无法分割的文件的页面计为已完成
+                progress.page_done(page_counts.get(input_pdf_path, 0))
+                ui_events.progress(progress.snapshot())
                 continue
+            progress.advance("split", len(page_files))
             
             # 步骤2: 对每个单页进行裁剪和尺寸调整
             for i, page_file in enumerate(page_files):
-                window.after(0, lambda msg=f"处理 {file_name} 第 {i+1} 页...": status_label.config(text=msg))
-                window.after(0, lambda: log_message(f"处理第 {i+1} 页"))
-                window.update_idletasks()
+                page_stage = "crop"  # 当前页正在进行的阶段
+                set_status(f"处理 {file_name} 第 {i+1} 页...")
+                log_message(f"处理第 {i+1} 页")
                 if logger:
                     logger.info(f"开始处理第 {i+1} 页")
                 
-                # 裁剪后的临时文件名
-                cropped_temp_name = f"{base_name}_page{i+1}_cropped_temp.pdf"
-                cropped_temp_path = os.path.join(temp_folder, cropped_temp_name)
-                
-                try:
-                    # 裁剪单页PDF
-                    auto_crop_pdf(page_file, cropped_temp_path, border_width)
-                    if logger:
-                        logger.info(f"裁剪第 {i+1} 页完成")
-                    log_message(f"裁剪第 {i+1} 页完成")
-                    
-                    # 最终输出的文件名
-                    final_page_name = f"{base_name}_page{i+1}_final.pdf"
-                    final_page_path = os.path.join(output_folder, final_page_name)
+                page_timings = {}  # 本页各阶段耗时
+                with record_timings(page_timings), span("page", cat="page", file=file_name, page=i + 1):
+                    try:
+                        # 最终输出的文件名
+                        final_page_name = f"{base_name}_page{i+1}_final.pdf"
+                        final_page_path = os.path.join(output_folder, final_page_name)
                     
-                    # 调整页面大小到100x150mm
-                    resize_pdf_page(cropped_temp_path, final_page_path, 100, 150)
+                        # 裁剪单页PDF并调整页面大小到100x150mm(一次完成，不写中间文件)
+                        engine.crop_and_resize_pdf(page_file, final_page_path, border_width, 100, 150,
+                                                   cache=cache, crop_mode=crop_mode, page_mode=page_mode)
+                        if logger:
+                            logger.info(f"裁剪第 {i+1} 页完成")
+                        log_message(f"裁剪第 {i+1} 页完成")
                     
-                    processed_files.append(final_page_path)
+                        processed_files.append(final_page_path)
+                        progress.advance("crop")
+                        page_stage = "barcode"
                     
-                    # 更新状态
-                    window.after(0, lambda msg=f"已完成 {file_name} 第 {i+1} 页的处理": status_label.config(text=msg))
-                    if logger:
-                        logger.info(f"调整大小完成: {final_page_name}")
-                    log_message(f"调整大小完成: {final_page_name}")
-                    
-                    # 步骤3: 重命名文件（如果启用）
-                    if enable_rename:
-                        window.after(0, lambda msg=f"检测条码并重命名 {final_page_name}...": status_label.config(text=msg))
-                        window.after(0, lambda: log_message(f"检测条码: {final_page_name}"))
-                        window.update_idletasks()
+                        # 更新状态
+                        set_status(f"已完成 {file_name} 第 {i+1} 页的处理")
                         if logger:
-                            logger.info(f"开始检测条码: {final_page_name}")
+                            logger.info(f"调整大小完成: {final_page_name}")
+                        log_message(f"调整大小完成: {final_page_name}")
+                    
+                        # 步骤3: 重命名文件（如果启用）
+                        if enable_rename:
+                            set_status(f"检测条码并重命名 {final_page_name}...")
+                            log_message(f"检测条码: {final_page_name}")
+                            if logger:
+                                logger.info(f"开始检测条码: {final_page_name}")
                         
-                        # 检测条码
-                        barcode = detect_barcode_in_pdf(final_page_path)
+                            # 检测条码
+                            barcode = detect_barcode_in_pdf(final_page_path, cache=cache, text_layer=text_layer)
                         
-                        if barcode:
-                            # 对条码内容进行特殊处理
-                            original_barcode = barcode  # 保存原始条码内容
-                            
-                            # 条码处理规则
-                            if barcode.startswith('4') and len(barcode) > 22:
-                                barcode = barcode[-22:]  # 截取后22位
-                            elif barcode.startswith('9') and len(barcode) > 22:
-                                barcode = barcode[-12:]  # 截取后12位
+                            if barcode:
+                                # 对条码内容进行特殊处理
+                                original_barcode = barcode  # 保存原始条码内容
                             
-                            # 创建安全的新文件名
-                            safe_barcode = ''.join(filter(str.isalnum, barcode))
+                                # 条码处理规则
+                                barcode = normalize_barcode(barcode)
                             
-                            # 确保文件名长度合理
-                            safe_barcode = safe_barcode[:50] if len(safe_barcode) > 50 else safe_barcode
+                                # 创建安全且不重复的新文件名（长度不超过50，重名时追加 _1、_2 ...，与批量处理引擎一致）
+                                new_file_path = barcode_output_path(output_folder, barcode)
                             
-                            if safe_barcode:
-                                # 创建唯一文件名
-                                new_filename = f"{safe_barcode}.pdf"
-                                new_file_path = os.path.join(output_folder, new_filename)
+                                if new_file_path:
+                                    new_filename = os.path.basename(new_file_path)
                                 
-                                # 重命名文件
-                                os.rename(final_page_path, new_file_path)
+                                    # 重命名文件
+                                    with stage("rename"):
+                                        os.rename(final_page_path, new_file_path)
                                 
-                                # 添加到报告
-                                report_data.append({
-                                    "原始文件名": file_name,
-                                    "页码": i+1,
-                                    "新文件名": new_filename,
-                                    "条码内容": barcode
-                                })
+                                    # 添加到报告
+                                    if report:
+                                        report.write({
+                                            "原始文件名": file_name,
+                                            "页码": i+1,
+                                            "新文件名": new_filename,
+                                            "条码内容": barcode
+                                        })
                                 
-                                window.after(0, lambda msg=f"已重命名为: {new_filename}": status_label.config(text=msg))
-                                log_message(f"重命名成功: {final_page_name} -> {new_filename}")
-                                if logger:
-                                    logger.info(f"重命名成功: {final_page_name} -> {new_filename} (条码: {barcode})")
+                                    set_status(f"已重命名为: {new_filename}")
+                                    log_message(f"重命名成功: {final_page_name} -> {new_filename}")
+                                    if logger:
+                                        logger.info(f"重命名成功: {final_page_name} -> {new_filename} (条码: {barcode})")
+                                else:
+                                    msg = f"条码内容无效: {barcode}"
+                                    set_status(msg)
+                                    log_message(msg, "warning")
+                                    if logger:
+                                        logger.warning(msg)
                             else:
-                                msg = f"条码内容无效: {barcode}"
-                                status_label.config(text=msg)
+                                msg = f"未检测到条码: {final_page_name}"
+                                set_status(msg)
                                 log_message(msg, "warning")
                                 if logger:
                                     logger.warning(msg)
-                        else:
-                            msg = f"未检测到条码: {final_page_name}"
-                            status_label.config(text=msg)
-                            log_message(msg, "warning")
-                            if logger:
-                                logger.warning(msg)
+                            progress.advance("barcode")
                     
-                    window.update_idletasks()
-                except Exception as e:
-                    msg = f"处理 {file_name} 第 {i+1} 页时发生错误: {str(e)}"
-                    messagebox.showwarning("警告", msg)
-                    status_label.config(text=f"处理 {file_name} 第 {i+1} 页时出错")
-                    log_message(msg, "error")
-                    if logger:
-                        logger.error(msg)
-                    window.update_idletasks()
+                    except Exception as e:
+                        msg = f"处理 {file_name} 第 {i+1} 页时发生错误: {str(e)}"
+                        ui_events.dialog("showwarning", "警告", msg)
+                        set_status(f"处理 {file_name} 第 {i+1} 页时出错")
+                        log_message(msg, "error")
+                        if logger:
+                            logger.error(msg)
+                        # 出错的页面其余阶段不再执行，计为已完成
+                        for stage_name in progress.stages[progress.stages.index(page_stage):]:
+                            progress.advance(stage_name)
+                metrics.observe_timings(page_timings)
+                ui_events.progress(progress.snapshot())
+            emit("file", "file", file_start_us, now_us() - file_start_us, {"file": file_name})
     
     except Exception as e:
         msg = "处理 PDF 文件时发生错误: " + str(e)
-        window.after(0, lambda: messagebox.showerror("错误", msg))
-        window.after(0, lambda: status_label.config(text="发生错误，停止处理：" + str(e)))
-        window.after(0, lambda: log_message(msg, "error"))
+        ui_events.dialog("showerror", "错误", msg)
+        set_status("发生错误，停止处理：" + str(e))
+        log_message(msg, "error")
         if logger:
             logger.error(msg)
     finally:
+        if trace_writer:
+            trace_writer.close()
+        if manifest:
+            manifest.close()
+        if report:
+            try:
+                report.close()
+            except Exception as e:
+                report_failed = True
+                log_message(f"保存重命名报告时出错: {str(e)}", "error")
+                if logger:
+                    logger.error(f"保存重命名报告时出错: {str(e)}")
+        
         # 清理临时文件
         if os.path.exists(temp_folder):
             try:
@@ -691,34 +733,53 @@ def process_pdf_files_thread(file_paths, border_width, output_folder, enable_ren
                 if logger:
                     logger.error(f"清理临时文件夹时出错: {str(e)}")
     
-    # 生成重命名报告（如果有数据）
-    if enable_rename and report_data:
-        report_generated = generate_rename_report(report_data, report_file_path)
-        if report_generated:
+    # 各阶段耗时统计：耗时最多的阶段写入日志，完整统计保存到日志文件夹
+    for line in metrics.summary_lines():
+        log_message(f"耗时 {line}")
+        if logger:
+            logger.info(f"耗时 {line}")
+    if logger:
+        try:
+            metrics.write_json(os.path.join(output_folder, "日志", f"处理耗时_{timestamp}.json"))
+        except OSError as e:
+            logger.error(f"无法写出耗时统计: {str(e)}")
+    
+    # 结果缓存统计
+    if cache_path:
+        if cache_stats is None:
+            cache_stats = (cache.hits - cache_before[0], cache.misses - cache_before[1])
+        msg = f"结果缓存: 命中 {cache_stats[0]} 次，未命中 {cache_stats[1]} 次"
+        log_message(msg)
+        if logger:
+            logger.info(msg)
+    
+    # 重命名报告（如果有数据）
+    if report_failed or (report and report.rows):
+        if not report_failed:
             report_msg = f"重命名报告已生成: {report_file_path}"
-            status_label.config(text=report_msg)
+            set_status(report_msg)
             log_message(report_msg)
             if logger:
                 logger.info(report_msg)
         else:
             report_msg = "重命名报告生成失败"
-            status_label.config(text=report_msg)
+            set_status(report_msg)
             log_message(report_msg, "error")
             if logger:
                 logger.error(report_msg)
     
     if processed_files:
         msg = f"处理完成，共处理 {len(processed_files)} 页"
-        status_label.config(text=msg)
+        set_status(msg)
         log_message(msg)
-        messagebox.showinfo("完成", f"PDF 文件处理成功\n共处理了 {len(processed_files)} 页\n所有页面调整为100x150mm")
+        ui_events.dialog("showinfo", "完成", f"PDF 文件处理成功\n共处理了 {len(processed_files)} 页\n所有页面调整为100x150mm")
         if logger:
             logger.info(msg)
     else:
         msg = "处理完成，但未生成任何文件"
-        status_label.config(text=msg)
+        set_status(msg)
         log_message(msg, "warning")
-        messagebox.showwarning("警告", msg)
+        ui_events.dialog("showwarning", "警告", msg)
         if logger:
             logger.warning(msg)
     
@@ -737,13 +798,13 @@ def process_pdf_files_thread(file_paths, border_width, output_folder, enable_ren
             else:  # 其他系统
                 subprocess.Popen(['open', os.path.abspath(output_folder)])
         except Exception as e:
-            messagebox.showerror("错误", "无法打开输出文件夹：" + str(e))
-            status_label.config(text="无法打开输出文件夹")
+            ui_events.dialog("showerror", "错误", "无法打开输出文件夹：" + str(e))
+            set_status("无法打开输出文件夹")
             log_message(f"无法打开输出文件夹: {str(e)}", "error")
         
         # 处理完成后启用按钮
-        window.after(0, lambda: process_button.config(state=tk.NORMAL))
-        window.after(0, lambda: status_label.config(text="处理完成"))
+        ui_events.call(process_button.config, {"state": tk.NORMAL})
+        set_status("处理完成")
         global is_processing
         is_processing = False
 
@@ -757,181 +818,265 @@ def check_thread_status(thread):
         global is_processing
         is_processing = False
 
-# ==================== 界面布局重构 ====================
-# 创建主框架
-main_frame = tk.Frame(window)
-main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-
-# 创建标签页容器
-notebook = ttk.Notebook(main_frame)
-notebook.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-
-# 创建文件处理标签页
-file_tab = ttk.Frame(notebook)
-notebook.add(file_tab, text="文件处理")
-
-# 创建日志标签页
-log_tab = ttk.Frame(notebook)
-notebook.add(log_tab, text="处理日志")
-
-# ==================== 文件处理标签页内容 ====================
-# 左侧面板（文件选择和设置）
-left_frame = ttk.Frame(file_tab)
-left_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 10))
-
-# PDF 文件选择框架
-input_frame = ttk.Labelframe(left_frame, text="选择 PDF 文件")
-input_frame.pack(fill=tk.X, padx=5, pady=5, ipadx=5, ipady=5)
-
-# PDF 文件列表框
-input_files_listbox = tk.Listbox(input_frame, height=6)
-input_files_listbox.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.BOTH, expand=True)
-
-# 文件选择按钮框架
-button_frame = ttk.Frame(input_frame)
-button_frame.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.Y)
-
-# PDF 文件选择按钮
-select_file_button = ttk.Button(button_frame, text="选择文件", command=select_pdf_files)
-select_file_button.pack(padx=5, pady=5, fill=tk.X)
-
-# 清除文件按钮
-clear_files_button = ttk.Button(button_frame, text="清除列表", command=lambda: input_files_listbox.delete(0, tk.END))
-clear_files_button.pack(padx=5, pady=5, fill=tk.X)
-
-# 输出设置框架
-output_frame = ttk.Labelframe(left_frame, text="输出设置")
-output_frame.pack(fill=tk.X, padx=5, pady=5, ipadx=5, ipady=5)
-
-# 输出文件夹
-output_folder_frame = ttk.Frame(output_frame)
-output_folder_frame.pack(fill=tk.X, padx=5, pady=5)
-ttk.Label(output_folder_frame, text="输出文件夹:").pack(side=tk.LEFT)
-output_folder_entry = ttk.Entry(output_folder_frame)
-output_folder_entry.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.X, expand=True)
-output_folder_entry.insert(0, "output")  # 默认输出文件夹
-# 初始化报告路径
-report_path.set(os.path.join(output_folder_entry.get(), "重命名报告.xlsx"))
-select_output_button = ttk.Button(output_folder_frame, text="浏览", command=select_output_folder)
-select_output_button.pack(side=tk.LEFT, padx=5, pady=5)
-
-# 边框宽度设置
-border_frame = ttk.Frame(output_frame)
-border_frame.pack(fill=tk.X, padx=5, pady=5)
-ttk.Label(border_frame, text="边框宽度(像素):").pack(side=tk.LEFT)
-border_width_entry = ttk.Entry(border_frame, width=5)
-border_width_entry.pack(side=tk.LEFT, padx=5, pady=5)
-border_width_entry.insert(0, "-400")  # 默认值
-
-# 重命名设置框架
-rename_frame = ttk.Labelframe(left_frame, text="文件重命名设置")
-rename_frame.pack(fill=tk.X, padx=5, pady=5, ipadx=5, ipady=5)
-
-# 启用重命名选项
-enable_rename_check = ttk.Checkbutton(rename_frame, text="启用文件重命名", variable=enable_rename_var)
-enable_rename_check.pack(anchor=tk.W, padx=5, pady=2)
-
-# 报告文件路径
-report_frame = ttk.Frame(rename_frame)
-report_frame.pack(fill=tk.X, padx=5, pady=5)
-ttk.Label(report_frame, text="报告文件:").pack(side=tk.LEFT)
-report_entry = ttk.Entry(report_frame, textvariable=report_path, state='readonly')  # 改为只读
-report_entry.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.X, expand=True)
-
-# 日志设置
-logging_frame = ttk.Frame(rename_frame)
-logging_frame.pack(fill=tk.X, padx=5, pady=5)
-enable_logging_check = ttk.Checkbutton(logging_frame, text="启用日志记录", variable=enable_logging_var)
-enable_logging_check.pack(side=tk.LEFT, padx=5, pady=5)
-
-# 处理按钮
-process_frame = ttk.Frame(left_frame)
-process_frame.pack(fill=tk.X, padx=5, pady=10)
-process_button = ttk.Button(process_frame, text="开始处理", command=process_pdf_files)
-process_button.pack(pady=5, ipadx=10, ipady=5)
-
-# 状态标签
-status_label = ttk.Label(left_frame, text="等待操作...", relief=tk.SUNKEN, anchor=tk.W)
-status_label.pack(fill=tk.X, padx=20, pady=5)
-
-# 尺寸信息标签
-size_info = ttk.Label(left_frame, text="所有页面将被调整为100mm x 150mm大小", relief=tk.FLAT, anchor=tk.CENTER)
-size_info.pack(fill=tk.X, padx=20, pady=5)
-
-# 尺寸信息标签下方添加依赖库路径标签
-dep_info = ttk.Label(left_frame, text="", relief=tk.FLAT, anchor=tk.CENTER)
-dep_info.pack(fill=tk.X, padx=20, pady=5)
-
-# 在文件处理标签页中添加路径设置框架
-path_frame = ttk.Labelframe(left_frame, text="依赖库路径设置")
-path_frame.pack(fill=tk.X, padx=5, pady=5, ipadx=5, ipady=5)
-
-# Poppler路径设置
-poppler_frame = ttk.Frame(path_frame)
-poppler_frame.pack(fill=tk.X, padx=5, pady=5)
-ttk.Label(poppler_frame, text="Poppler路径:").pack(side=tk.LEFT)
-poppler_entry = ttk.Entry(poppler_frame, textvariable=poppler_path)
-poppler_entry.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.X, expand=True)
-poppler_button = ttk.Button(poppler_frame, text="浏览", command=select_poppler_path)
-poppler_button.pack(side=tk.LEFT, padx=5, pady=5)
-
-# libiconv2.dll路径显示
-libiconv_frame = ttk.Frame(path_frame)
-libiconv_frame.pack(fill=tk.X, padx=5, pady=5)
-ttk.Label(libiconv_frame, text="libiconv2.dll路径:").pack(side=tk.LEFT)
-libiconv_label = ttk.Label(libiconv_frame, text=resource_path("libiconv2.dll"))
-libiconv_label.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.X, expand=True)
-
-# 检查路径按钮
-check_button = ttk.Button(path_frame, text="检查依赖库", command=check_dependencies)
-check_button.pack(pady=5)
-
-# ==================== 日志标签页内容 ====================
-# 日志框架
-log_frame = ttk.Frame(log_tab)
-log_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-
-# 日志搜索框
-search_frame = ttk.Frame(log_frame)
-search_frame.pack(fill=tk.X, padx=5, pady=5)
-ttk.Label(search_frame, text="搜索日志:").pack(side=tk.LEFT)
-search_entry = ttk.Entry(search_frame)
-search_entry.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.X, expand=True)
-search_button = ttk.Button(search_frame, text="搜索", command=search_log)
-search_button.pack(side=tk.LEFT, padx=5, pady=5)
-clear_button = ttk.Button(search_frame, text="清空日志", command=clear_log)
-clear_button.pack(side=tk.LEFT, padx=5, pady=5)
-
-# 日志文本框（带滚动条）
-log_scroll = ttk.Scrollbar(log_frame)
-log_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-
-log_text = tk.Text(
-    log_frame, 
-    wrap=tk.WORD, 
-    yscrollcommand=log_scroll.set,
-    state='disabled',
-    width=100,
-    background='white',  # 添加标准样式
-    foreground='black'
-)
-log_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-log_scroll.config(command=log_text.yview)
-
-# 配置搜索结果的标记样式
-log_text.tag_config("found", background="yellow", foreground="black")
-
-# 检查poppler是否安装
-if not check_poppler_installed() and not is_frozen:
-    log_message("警告: Poppler未安装，条码检测功能可能无法正常工作！", "warning")
-    log_message("请安装Poppler: https://github.com/oschwartz10612/poppler-windows/releases/", "warning")
-
-# 程序启动时检查依赖库路径
-check_dependencies()
-
-# 在程序启动时检查DLL
-if not check_dll_files():
-    log_message("警告: 部分依赖库缺失，功能可能受限", "warning")
-
-# 运行 GUI 窗口
-window.mainloop()
+def create_main_window():
+    """创建主窗口及界面使用的 Tk 变量"""
+    global window, enable_rename_var, enable_logging_var, enable_pipeline_var, report_path
+    global poppler_path, barcode_backend_var, workers_var, enable_cache_var, enable_resume_var, enable_trace_var
+    global vector_crop_var, cropbox_page_var, text_layer_var, learn_rois_var
+    
+    # 创建主窗口 - 改为标准tkinter样式
+    window = tk.Tk()
+    window.title("PDF 自动裁剪与重命名工具")
+    window.resizable(False, False)  # 固定窗口大小
+    window_width = 1200
+    window_height = 1000
+    window.geometry(f"{window_width}x{window_height}")
+
+    # 检查并设置程序图标
+    icon_path = os.path.join(os.path.dirname(__file__), "PDF裁剪扫码.ico")
+    if os.path.exists(icon_path):
+        try:
+            window.iconbitmap(icon_path)
+        except Exception as e:
+            log_message(f"设置图标失败: {str(e)}", "warning")
+
+    enable_rename_var = tk.BooleanVar(value=True)
+    enable_logging_var = tk.BooleanVar(value=True)
+    enable_pipeline_var = tk.BooleanVar(value=True)
+    report_path = tk.StringVar()
+    poppler_path = tk.StringVar(value="poppler/bin")  # 修改为默认相对路径
+    barcode_backend_var = tk.StringVar(value="pymupdf")
+    workers_var = tk.StringVar(value=str(default_workers()))
+    enable_cache_var = tk.BooleanVar(value=True)
+    enable_resume_var = tk.BooleanVar(value=False)
+    enable_trace_var = tk.BooleanVar(value=False)
+    vector_crop_var = tk.BooleanVar(value=False)
+    cropbox_page_var = tk.BooleanVar(value=False)
+    text_layer_var = tk.BooleanVar(value=False)
+    learn_rois_var = tk.BooleanVar(value=False)
+
+def build_ui():
+    """创建界面布局"""
+    global input_files_listbox, output_folder_entry, border_width_entry, process_button
+    global status_label, search_entry, log_text, progress_bar, progress_label
+    
+    # ==================== 界面布局重构 ====================
+    # 创建主框架
+    main_frame = tk.Frame(window)
+    main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    # 创建标签页容器
+    notebook = ttk.Notebook(main_frame)
+    notebook.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+    # 创建文件处理标签页
+    file_tab = ttk.Frame(notebook)
+    notebook.add(file_tab, text="文件处理")
+
+    # 创建日志标签页
+    log_tab = ttk.Frame(notebook)
+    notebook.add(log_tab, text="处理日志")
+
+    # ==================== 文件处理标签页内容 ====================
+    # 左侧面板（文件选择和设置）
+    left_frame = ttk.Frame(file_tab)
+    left_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 10))
+
+    # PDF 文件选择框架
+    input_frame = ttk.Labelframe(left_frame, text="选择 PDF 文件")
+    input_frame.pack(fill=tk.X, padx=5, pady=5, ipadx=5, ipady=5)
+
+    # PDF 文件列表框
+    input_files_listbox = tk.Listbox(input_frame, height=6)
+    input_files_listbox.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.BOTH, expand=True)
+
+    # 文件选择按钮框架
+    button_frame = ttk.Frame(input_frame)
+    button_frame.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.Y)
+
+    # PDF 文件选择按钮
+    select_file_button = ttk.Button(button_frame, text="选择文件", command=select_pdf_files)
+    select_file_button.pack(padx=5, pady=5, fill=tk.X)
+
+    # 清除文件按钮
+    clear_files_button = ttk.Button(button_frame, text="清除列表", command=lambda: input_files_listbox.delete(0, tk.END))
+    clear_files_button.pack(padx=5, pady=5, fill=tk.X)
+
+    # 输出设置框架
+    output_frame = ttk.Labelframe(left_frame, text="输出设置")
+    output_frame.pack(fill=tk.X, padx=5, pady=5, ipadx=5, ipady=5)
+
+    # 输出文件夹
+    output_folder_frame = ttk.Frame(output_frame)
+    output_folder_frame.pack(fill=tk.X, padx=5, pady=5)
+    ttk.Label(output_folder_frame, text="输出文件夹:").pack(side=tk.LEFT)
+    output_folder_entry = ttk.Entry(output_folder_frame)
+    output_folder_entry.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.X, expand=True)
+    output_folder_entry.insert(0, "output")  # 默认输出文件夹
+    # 初始化报告路径
+    report_path.set(os.path.join(output_folder_entry.get(), "重命名报告.xlsx"))
+    select_output_button = ttk.Button(output_folder_frame, text="浏览", command=select_output_folder)
+    select_output_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+    # 边框宽度设置
+    border_frame = ttk.Frame(output_frame)
+    border_frame.pack(fill=tk.X, padx=5, pady=5)
+    ttk.Label(border_frame, text="边框宽度(像素):").pack(side=tk.LEFT)
+    border_width_entry = ttk.Entry(border_frame, width=5)
+    border_width_entry.pack(side=tk.LEFT, padx=5, pady=5)
+    border_width_entry.insert(0, "-400")  # 默认值
+    vector_crop_check = ttk.Checkbutton(border_frame, text="矢量裁剪（不渲染页面，扫描页自动改用渲染）",
+                                        variable=vector_crop_var)
+    vector_crop_check.pack(side=tk.LEFT, padx=10)
+    cropbox_page_check = ttk.Checkbutton(border_frame, text="改写页面框（不嵌入，文件更小）",
+                                         variable=cropbox_page_var)
+    cropbox_page_check.pack(side=tk.LEFT, padx=5)
+
+    # 重命名设置框架
+    rename_frame = ttk.Labelframe(left_frame, text="文件重命名设置")
+    rename_frame.pack(fill=tk.X, padx=5, pady=5, ipadx=5, ipady=5)
+
+    # 启用重命名选项
+    enable_rename_check = ttk.Checkbutton(rename_frame, text="启用文件重命名", variable=enable_rename_var)
+    enable_rename_check.pack(anchor=tk.W, padx=5, pady=2)
+    text_layer_check = ttk.Checkbutton(rename_frame, text="优先读取文字层运单号（未找到时再识别条码）",
+                                       variable=text_layer_var)
+    text_layer_check.pack(anchor=tk.W, padx=5, pady=2)
+    learn_rois_check = ttk.Checkbutton(rename_frame, text="学习条码位置（同一版式的面单先在学到的位置识别，需内存流水线模式）",
+                                       variable=learn_rois_var)
+    learn_rois_check.pack(anchor=tk.W, padx=5, pady=2)
+
+    # 报告文件路径
+    report_frame = ttk.Frame(rename_frame)
+    report_frame.pack(fill=tk.X, padx=5, pady=5)
+    ttk.Label(report_frame, text="报告文件:").pack(side=tk.LEFT)
+    report_entry = ttk.Entry(report_frame, textvariable=report_path, state='readonly')  # 改为只读
+    report_entry.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.X, expand=True)
+
+    # 内存流水线模式
+    pipeline_frame = ttk.Frame(output_frame)
+    pipeline_frame.pack(fill=tk.X, padx=5, pady=5)
+    enable_pipeline_check = ttk.Checkbutton(pipeline_frame, text="内存流水线模式（不写临时文件）", variable=enable_pipeline_var)
+    enable_pipeline_check.pack(side=tk.LEFT)
+    ttk.Label(pipeline_frame, text="工作进程数:").pack(side=tk.LEFT, padx=(10, 0))
+    workers_entry = ttk.Entry(pipeline_frame, textvariable=workers_var, width=5)
+    workers_entry.pack(side=tk.LEFT, padx=5)
+    enable_cache_check = ttk.Checkbutton(pipeline_frame, text="启用结果缓存", variable=enable_cache_var)
+    enable_cache_check.pack(side=tk.LEFT, padx=5)
+    enable_resume_check = ttk.Checkbutton(pipeline_frame, text="断点续传", variable=enable_resume_var)
+    enable_resume_check.pack(side=tk.LEFT, padx=5)
+    enable_trace_check = ttk.Checkbutton(pipeline_frame, text="记录跟踪", variable=enable_trace_var)
+    enable_trace_check.pack(side=tk.LEFT, padx=5)
+
+    # 日志设置
+    logging_frame = ttk.Frame(rename_frame)
+    logging_frame.pack(fill=tk.X, padx=5, pady=5)
+    enable_logging_check = ttk.Checkbutton(logging_frame, text="启用日志记录", variable=enable_logging_var)
+    enable_logging_check.pack(side=tk.LEFT, padx=5, pady=5)
+
+    # 处理按钮
+    process_frame = ttk.Frame(left_frame)
+    process_frame.pack(fill=tk.X, padx=5, pady=10)
+    process_button = ttk.Button(process_frame, text="开始处理", command=process_pdf_files)
+    process_button.pack(pady=5, ipadx=10, ipady=5)
+
+    # 状态标签
+    status_label = ttk.Label(left_frame, text="等待操作...", relief=tk.SUNKEN, anchor=tk.W)
+    status_label.pack(fill=tk.X, padx=20, pady=5)
+
+    # 进度条与吞吐量/剩余时间
+    progress_bar = ttk.Progressbar(left_frame, mode="determinate", maximum=100)
+    progress_bar.pack(fill=tk.X, padx=20, pady=(5, 0))
+    progress_label = ttk.Label(left_frame, text="", anchor=tk.W)
+    progress_label.pack(fill=tk.X, padx=20, pady=(0, 5))
+
+    # 尺寸信息标签
+    size_info = ttk.Label(left_frame, text="所有页面将被调整为100mm x 150mm大小", relief=tk.FLAT, anchor=tk.CENTER)
+    size_info.pack(fill=tk.X, padx=20, pady=5)
+
+    # 尺寸信息标签下方添加依赖库路径标签
+    dep_info = ttk.Label(left_frame, text="", relief=tk.FLAT, anchor=tk.CENTER)
+    dep_info.pack(fill=tk.X, padx=20, pady=5)
+
+    # 在文件处理标签页中添加路径设置框架
+    path_frame = ttk.Labelframe(left_frame, text="依赖库路径设置")
+    path_frame.pack(fill=tk.X, padx=5, pady=5, ipadx=5, ipady=5)
+
+    # Poppler路径设置
+    poppler_frame = ttk.Frame(path_frame)
+    poppler_frame.pack(fill=tk.X, padx=5, pady=5)
+    ttk.Label(poppler_frame, text="Poppler路径:").pack(side=tk.LEFT)
+    poppler_entry = ttk.Entry(poppler_frame, textvariable=poppler_path)
+    poppler_entry.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.X, expand=True)
+    poppler_button = ttk.Button(poppler_frame, text="浏览", command=select_poppler_path)
+    poppler_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+    # 条码识别后端选择
+    backend_frame = ttk.Frame(path_frame)
+    backend_frame.pack(fill=tk.X, padx=5, pady=5)
+    ttk.Label(backend_frame, text="条码渲染后端:").pack(side=tk.LEFT)
+    backend_combo = ttk.Combobox(backend_frame, textvariable=barcode_backend_var, values=BARCODE_BACKENDS,
+                                 state='readonly', width=10)
+    backend_combo.pack(side=tk.LEFT, padx=5, pady=5)
+    backend_combo.bind("<<ComboboxSelected>>", on_barcode_backend_changed)
+
+    # libiconv2.dll路径显示
+    libiconv_frame = ttk.Frame(path_frame)
+    libiconv_frame.pack(fill=tk.X, padx=5, pady=5)
+    ttk.Label(libiconv_frame, text="libiconv2.dll路径:").pack(side=tk.LEFT)
+    libiconv_label = ttk.Label(libiconv_frame, text=resource_path("libiconv2.dll"))
+    libiconv_label.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.X, expand=True)
+
+    # 检查路径按钮
+    check_button = ttk.Button(path_frame, text="检查依赖库", command=lambda: check_dependencies(refresh=True))
+    check_button.pack(pady=5)
+
+    # ==================== 日志标签页内容 ====================
+    # 日志框架
+    log_frame = ttk.Frame(log_tab)
+    log_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    # 日志搜索框
+    search_frame = ttk.Frame(log_frame)
+    search_frame.pack(fill=tk.X, padx=5, pady=5)
+    ttk.Label(search_frame, text="搜索日志:").pack(side=tk.LEFT)
+    search_entry = ttk.Entry(search_frame)
+    search_entry.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.X, expand=True)
+    search_button = ttk.Button(search_frame, text="搜索", command=search_log)
+    search_button.pack(side=tk.LEFT, padx=5, pady=5)
+    clear_button = ttk.Button(search_frame, text="清空日志", command=clear_log)
+    clear_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+    # 日志文本框（带滚动条）
+    log_scroll = ttk.Scrollbar(log_frame)
+    log_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+    log_text = tk.Text(
+        log_frame, 
+        wrap=tk.WORD, 
+        yscrollcommand=log_scroll.set,
+        state='disabled',
+        width=100,
+        background='white',  # 添加标准样式
+        foreground='black'
+    )
+    log_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+    log_scroll.config(command=log_text.yview)
+
+    # 配置搜索结果的标记样式
+    log_text.tag_config("found", background="yellow", foreground="black")
+
+
+if __name__ == "__main__":
+    # 打包环境下的多进程支持
+    multiprocessing.freeze_support()
+    
+    create_main_window()
+    build_ui()
+    start_pump(window, ui_events, apply_ui_events, UI_UPDATES_PER_SECOND)
+    
+    # 程序启动时检查依赖库路径
+    check_dependencies()
+
+    # 运行 GUI 窗口
+    window.mainloop()
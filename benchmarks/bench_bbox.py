@@ -0,0 +1,86 @@
+"""
+内容边界框检测基准测试：原逐像素循环 vs NumPy 向量化实现
+
+用法:
+    python benchmarks/bench_bbox.py [PDF文件 ...]
+
+未指定PDF文件时使用内置生成的 100x150mm 示例面单页。
+"""
+import os
+import sys
+import time
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdfclip.bbox import content_rect  # noqa: E402
+from pdfclip.raster import render_luminance  # noqa: E402
+
+DPI_LIST = (72, 150, 300)
+BORDER_WIDTH = 5
+
+
+def legacy_content_rect(image_array, border_width):
+    """原 auto_crop_pdf 中的逐像素循环（用于对照）"""
+    height, width = image_array.shape
+    left, top, right, bottom = width, height, 0, 0
+
+    def is_border_pixel(x, y):
+        return x < border_width or y < border_width or x >= width - border_width or y >= height - border_width
+
+    for y in range(height):
+        for x in range(width):
+            if not is_border_pixel(x, y) and image_array[y, x] < 255:
+                left = min(left, x)
+                right = max(right, x)
+                top = min(top, y)
+                bottom = max(bottom, y)
+
+    if left == width and top == height and right == 0 and bottom == 0:
+        return None
+    return fitz.Rect(left, top, right + 1, bottom + 1)
+
+
+def make_sample_document():
+    """生成一个带文字、线框和条形的示例面单页"""
+    doc = fitz.open()
+    page = doc.new_page(width=100 * 2.83465, height=150 * 2.83465)
+    page.draw_rect(fitz.Rect(20, 30, 260, 400), color=(0, 0, 0), width=1)
+    page.insert_text((30, 60), "SAMPLE LABEL 1234567890", fontsize=10)
+    for i in range(40):
+        x = 160 + i * 2.2
+        page.draw_rect(fitz.Rect(x, 80, x + (1.2 if i % 3 else 0.6), 130), color=None, fill=(0, 0, 0))
+    return doc
+
+
+def best_of(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(paths):
+    documents = [(os.path.basename(p), fitz.open(p)) for p in paths] or [("sample", make_sample_document())]
+
+    print(f"{'文件':<20}{'DPI':>5}{'像素':>12}{'原循环(s)':>12}{'向量化(ms)':>12}{'粗到细(ms)':>12}{'加速比':>10}  一致")
+    for name, doc in documents:
+        page = doc[0]
+        for dpi in DPI_LIST:
+            gray = render_luminance(page, dpi)
+            legacy_time, legacy_rect = best_of(lambda: legacy_content_rect(gray, BORDER_WIDTH), 1)
+            fast_time, fast_rect = best_of(lambda: content_rect(gray, BORDER_WIDTH), 20)
+            coarse_time, coarse_rect = best_of(lambda: content_rect(gray, BORDER_WIDTH, coarse_factor=8), 20)
+            same = legacy_rect == fast_rect == coarse_rect
+            print(f"{name[:19]:<20}{dpi:>5}{gray.size:>12}{legacy_time:>12.3f}"
+                  f"{fast_time * 1000:>12.2f}{coarse_time * 1000:>12.2f}"
+                  f"{legacy_time / min(fast_time, coarse_time):>10.0f}  {'是' if same else '否'}")
+        doc.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
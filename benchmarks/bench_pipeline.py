@@ -0,0 +1,188 @@
+"""
+处理流程基准测试：分页、裁剪(渲染/矢量)、尺寸调整、一次裁剪缩放、条码识别(渲染/文字层)和完整流水线
+
+使用 labels.py 生成的合成面单(1/100/10000 页，含矢量条码、二维码、扫描图像、旋转页和空白页)，
+统计每秒页数、峰值内存(RSS)、输出文件大小和条码识别的召回率(与生成时记录的真值比较)，
+完整流水线另统计条码由哪一级识别得到(用于调整识别阶梯的顺序)。
+多进程流水线的峰值内存按 主进程 + 工作进程数 x 单个工作进程峰值 估算。
+每项测试在独立的子进程中运行，峰值内存互不影响；不需要网络。
+
+用法:
+    python benchmarks/bench_pipeline.py [--sizes 1,100,10000] [--workers 1,4] [--json 结果.json]
+
+生成的面单缓存在 --workdir(默认为系统临时目录下的 pdfclip-bench)中，再次运行时直接复用。
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from labels import generate_labels  # noqa: E402
+
+CASES = ("split", "crop", "crop_vector", "resize", "transform", "transform_cropbox", "detect", "detect_text",
+         "pipeline")
+
+
+def recall_stats(truth, detected):
+    """
+    与真值比较识别结果
+
+    detected 为 {页码: 识别结果}。返回召回率(有条码的页中识别正确的比例)、
+    错误识别数(识别结果与真值不同，包括空白页识别出内容)以及按页面类型的召回率。
+    """
+    by_kind = {}
+    found = expected = wrong = 0
+    for page in truth:
+        if page["page"] not in detected:
+            continue
+        result = detected[page["page"]]
+        if page["barcode"] is None:
+            wrong += result is not None
+            continue
+        kind = by_kind.setdefault(page["kind"], [0, 0])
+        kind[1] += 1
+        expected += 1
+        if result == page["barcode"]:
+            found += 1
+            kind[0] += 1
+        elif result is not None:
+            wrong += 1
+    return {
+        "recall": round(found / expected, 4) if expected else None,
+        "wrong": wrong,
+        "recall_by_kind": {name: round(hit / total, 4) for name, (hit, total) in sorted(by_kind.items())},
+    }
+
+
+def run_case(case, pdf_path, truth, work_dir, workers, detect_limit):
+    """在子进程中运行一项测试，返回耗时、页数、峰值内存和召回率"""
+    import logging
+
+    from pdfclip import engine
+
+    logging.basicConfig(level=logging.ERROR)
+    out_dir = tempfile.mkdtemp(prefix=f"{case}-", dir=work_dir)
+    output_pdf = os.path.join(out_dir, "out.pdf")
+    result = {"pages": len(truth)}
+    try:
+        if case == "split":
+            start = time.perf_counter()
+            engine.split_pdf_to_single_pages(pdf_path, out_dir)
+        elif case == "crop":
+            start = time.perf_counter()
+            engine.auto_crop_pdf(pdf_path, output_pdf)
+        elif case == "crop_vector":
+            start = time.perf_counter()
+            engine.auto_crop_pdf(pdf_path, output_pdf, crop_mode="vector")
+        elif case == "resize":
+            start = time.perf_counter()
+            engine.resize_pdf_page(pdf_path, output_pdf)
+        elif case in ("transform", "transform_cropbox"):
+            start = time.perf_counter()
+            engine.crop_and_resize_pdf(pdf_path, output_pdf,
+                                       page_mode="cropbox" if case == "transform_cropbox" else "xobject")
+        elif case in ("detect", "detect_text"):
+            # 与传统流程一致，逐个识别拆分后的单页文件；分页不计入耗时
+            page_files = engine.split_pdf_to_single_pages(pdf_path, out_dir)[:detect_limit]
+            result["pages"] = len(page_files)
+            text_layer = "first" if case == "detect_text" else "off"
+            start = time.perf_counter()
+            detected = {index + 1: engine.detect_barcode_in_pdf(path, text_layer=text_layer)
+                        for index, path in enumerate(page_files)}
+            result.update(recall_stats(truth, detected))
+        else:
+            start = time.perf_counter()
+            pages = list(engine.process_files([pdf_path], out_dir, workers=workers))
+            result.update(recall_stats(truth, {page.page_number: page.raw_barcode for page in pages}))
+            sources = {}
+            for page in pages:
+                if page.barcode_source:
+                    sources[page.barcode_source] = sources.get(page.barcode_source, 0) + 1
+            result["barcode_sources"] = sources
+        result["seconds"] = time.perf_counter() - start
+        if os.path.exists(output_pdf):
+            result["output_kb"] = round(os.path.getsize(output_pdf) / 1024, 1)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    # Linux 上 ru_maxrss 的单位为 KB
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if children_rss:
+        result["worker_peak_rss_mb"] = round(children_rss / 1024, 1)
+    return result
+
+
+def run_isolated(func, *args):
+    """
+    在全新的子进程中运行，峰值内存只反映这一项测试
+
+    Linux 的 ru_maxrss 在 exec 后保留，所以主进程自身(包括生成面单)也不做占用内存的工作。
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(func, *args).result()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="PDF处理流程基准测试")
+    parser.add_argument("--sizes", default="1,100,10000", help="测试文件的页数，逗号分隔")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"测试项，逗号分隔（{', '.join(CASES)}）")
+    parser.add_argument("--workers", default="1", help="完整流水线的工作进程数，逗号分隔，如 1,4")
+    parser.add_argument("--detect-limit", type=int, default=1000, help="逐页条码识别最多测试的页数")
+    parser.add_argument("--seed", type=int, default=0, help="生成面单的随机种子")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "pdfclip-bench"),
+                        help="生成的面单和临时输出所在目录")
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    sizes = [int(value) for value in args.sizes.split(",")]
+    cases = [value for value in args.cases.split(",") if value]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        print(f"未知的测试项: {', '.join(sorted(unknown))}")
+        return 2
+    os.makedirs(args.workdir, exist_ok=True)
+
+    results = []
+    print(f"{'测试项':<18}{'页数':>7}{'耗时(s)':>10}{'页/秒':>10}{'峰值RSS(MB)':>13}{'召回率':>8}{'误识':>6}{'输出(KB)':>10}")
+    for size in sizes:
+        pdf_path = os.path.join(args.workdir, f"labels_{size}_s{args.seed}.pdf")
+        start = time.perf_counter()
+        truth = run_isolated(generate_labels, pdf_path, size, args.seed)
+        print(f"# {os.path.basename(pdf_path)}（准备 {time.perf_counter() - start:.1f} 秒）")
+        for case in cases:
+            for workers in ([int(value) for value in args.workers.split(",")] if case == "pipeline" else [1]):
+                name = f"{case}(x{workers})" if case == "pipeline" else case
+                result = run_isolated(run_case, case, pdf_path, truth, args.workdir, workers, args.detect_limit)
+                result.update(case=case, workers=workers, file_pages=size,
+                              pages_per_second=round(result["pages"] / result["seconds"], 2))
+                results.append(result)
+                rss = result["peak_rss_mb"] + result.get("worker_peak_rss_mb", 0) * (workers if workers > 1 else 0)
+                recall = f"{result['recall']:.1%}" if result.get("recall") is not None else "-"
+                print(f"{name:<18}{result['pages']:>7}{result['seconds']:>10.2f}{result['pages_per_second']:>10.1f}"
+                      f"{rss:>13.1f}{recall:>8}{result.get('wrong', '-'):>6}{result.get('output_kb', '-'):>10}")
+                if result.get("recall_by_kind"):
+                    print("    " + "，".join(f"{kind} {value:.0%}" for kind, value in result["recall_by_kind"].items()))
+                if result.get("barcode_sources"):
+                    print("    条码来源: " + "，".join(f"{source} {count}" for source, count in
+                                                  sorted(result["barcode_sources"].items(), key=lambda item: -item[1])))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,219 @@
+"""
+合成快递面单PDF生成器(基准测试用)
+
+生成 100x150mm 面单内容的页面(四周留白，供自动裁剪)，条码位于 detect_barcode_in_pdf 识别的右上角区域。
+页面类型按固定随机种子轮换，同样的参数总是生成同样的文件：
+    code128  矢量 Code128 条码
+    qr       矢量二维码
+    scan     整页为扫描图像(轻微倾斜、噪点、JPEG 压缩)
+    rotated  矢量 Code128 条码，页面旋转 90 度
+    blank    空白页(无条码)
+每个PDF旁边写出同名 .json 文件，记录每页的类型和条码内容(真值)。
+
+用法:
+    python benchmarks/labels.py 输出目录 [页数 ...]
+"""
+import json
+import os
+import random
+import sys
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdfclip.vectorbarcode import (CODE128_PATTERNS, CODE128_START_B as START_B,  # noqa: E402
+                                   CODE128_START_C as START_C, CODE128_STOP as STOP)
+
+MM_TO_PT = 2.83465
+
+# 面单尺寸与页面四周留白(毫米)
+LABEL_SIZE_MM = (100, 150)
+MARGIN_MM = 5
+
+# 页面类型及其出现权重
+PAGE_KINDS = (("code128", 45), ("qr", 15), ("scan", 15), ("rotated", 10), ("blank", 15))
+
+# 条码在面单中的位置(占面单宽高的比例)，位于 pdfclip.barcode.BARCODE_ROI 内部
+CODE128_RECT = (0.63, 0.15, 0.92, 0.27)
+QR_RECT = (0.68, 0.14, 0.88, 0.34)
+
+
+def code128_modules(text):
+    """
+    将文本编码为 Code128 的条/空宽度序列(从条开始交替)
+
+    偶数位纯数字使用 C 字符集(两位一个符号，条码更短)，否则使用 B 字符集。
+    """
+    if text.isdigit() and len(text) % 2 == 0:
+        codes = [START_C] + [int(text[i:i + 2]) for i in range(0, len(text), 2)]
+    else:
+        if any(not 32 <= ord(char) < 127 for char in text):
+            raise ValueError(f"Code128 B 字符集不支持: {text!r}")
+        codes = [START_B] + [ord(char) - 32 for char in text]
+    checksum = (codes[0] + sum(index * code for index, code in enumerate(codes[1:], 1))) % 103
+    widths = []
+    for code in codes + [checksum, STOP]:
+        widths.extend(int(width) for width in CODE128_PATTERNS[code])
+    return widths
+
+
+def draw_code128(page, rect, text):
+    """在 rect 中以矢量矩形绘制 Code128 条码(左右各留 10 模块静区)"""
+    widths = code128_modules(text)
+    module = rect.width / (sum(widths) + 20)
+    shape = page.new_shape()
+    x = rect.x0 + module * 10
+    for index, width in enumerate(widths):
+        if index % 2 == 0:
+            shape.draw_rect(fitz.Rect(x, rect.y0, x + width * module, rect.y1))
+        x += width * module
+    shape.finish(color=None, fill=(0, 0, 0), width=0)
+    shape.commit()
+
+
+def draw_qr(page, rect, text):
+    """在 rect 中以矢量矩形绘制二维码(使用 OpenCV 的二维码编码器生成模块矩阵)"""
+    import cv2
+
+    modules = cv2.QRCodeEncoder.create().encode(text)  # 255 为白，0 为黑，已含静区
+    size = min(rect.width, rect.height) / modules.shape[0]
+    shape = page.new_shape()
+    for row, line in enumerate(modules == 0):
+        # 同一行中连续的黑色模块合并为一个矩形
+        col = 0
+        while col < len(line):
+            if not line[col]:
+                col += 1
+                continue
+            end = col
+            while end < len(line) and line[end]:
+                end += 1
+            y = rect.y0 + row * size
+            shape.draw_rect(fitz.Rect(rect.x0 + col * size, y, rect.x0 + end * size, y + size))
+            col = end
+    shape.finish(color=None, fill=(0, 0, 0), width=0)
+    shape.commit()
+
+
+def tracking_number(rng, kind):
+    """生成一个运单号：Code128 使用 12 位数字，二维码使用字母加数字"""
+    if kind == "qr":
+        return "YT" + "".join(rng.choice("0123456789") for _ in range(13))
+    return str(rng.randint(1, 9)) + "".join(rng.choice("0123456789") for _ in range(11))
+
+
+def draw_label(page, rng, kind, barcode):
+    """在页面上(四周留白内)绘制一张面单"""
+    margin = MARGIN_MM * MM_TO_PT
+    width, height = LABEL_SIZE_MM[0] * MM_TO_PT, LABEL_SIZE_MM[1] * MM_TO_PT
+    label = fitz.Rect(margin, margin, margin + width, margin + height)
+
+    def area(fractions):
+        return fitz.Rect(label.x0 + width * fractions[0], label.y0 + height * fractions[1],
+                         label.x0 + width * fractions[2], label.y0 + height * fractions[3])
+
+    page.draw_rect(label, color=(0, 0, 0), width=1)
+    page.insert_text((label.x0 + 8, label.y0 + 20), "EXPRESS", fontsize=14)
+    page.insert_text((label.x0 + 8, label.y0 + 36), f"No. {barcode}", fontsize=7)
+    page.draw_line(fitz.Point(label.x0, label.y0 + height * 0.42), fitz.Point(label.x1, label.y0 + height * 0.42))
+    lines = [f"TO: Customer {rng.randint(1000, 9999)}",
+             f"{rng.randint(1, 999)} Example Road, Building {rng.randint(1, 30)}",
+             f"Tel: 1{rng.randint(3, 9)}{rng.randint(0, 99999999):08d}",
+             "",
+             f"FROM: Warehouse {rng.choice('ABCDEFGH')}{rng.randint(1, 99)}",
+             f"Weight: {rng.uniform(0.1, 20):.2f} kg"]
+    page.insert_text((label.x0 + 10, label.y0 + height * 0.48), lines, fontsize=9, lineheight=1.55)
+    if kind == "qr":
+        draw_qr(page, area(QR_RECT), barcode)
+    else:
+        draw_code128(page, area(CODE128_RECT), barcode)
+        page.insert_text((area(CODE128_RECT).x0 + 6, area(CODE128_RECT).y1 + 10), barcode, fontsize=7)
+
+
+def page_size():
+    return ((LABEL_SIZE_MM[0] + 2 * MARGIN_MM) * MM_TO_PT, (LABEL_SIZE_MM[1] + 2 * MARGIN_MM) * MM_TO_PT)
+
+
+def scanned_image(rng, barcode, dpi=150):
+    """将矢量面单渲染为灰度图像，加入轻微倾斜和噪点，返回 JPEG 数据"""
+    import cv2
+    import numpy as np
+
+    with fitz.open() as doc:
+        page = doc.new_page(width=page_size()[0], height=page_size()[1])
+        draw_label(page, rng, "code128", barcode)
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+
+    matrix = cv2.getRotationMatrix2D((pix.width / 2, pix.height / 2), rng.uniform(-1.5, 1.5), 1.0)
+    gray = cv2.warpAffine(gray, matrix, (pix.width, pix.height), borderValue=255)
+    noise = np.random.default_rng(rng.randint(0, 2 ** 32 - 1)).normal(0, 8, gray.shape)
+    gray = np.clip(gray.astype(np.float32) * 0.92 + 12 + noise, 0, 255).astype(np.uint8)
+    return cv2.imencode(".jpg", gray, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+
+
+def add_label_page(doc, rng, kind):
+    """添加一页指定类型的面单，返回该页的真值条码(空白页为 None)"""
+    page = doc.new_page(width=page_size()[0], height=page_size()[1])
+    if kind == "blank":
+        return None
+    barcode = tracking_number(rng, kind)
+    if kind == "scan":
+        page.insert_image(page.rect, stream=scanned_image(rng, barcode))
+    else:
+        draw_label(page, rng, kind, barcode)
+        if kind == "rotated":
+            page.set_rotation(90)
+    return barcode
+
+
+def generate_labels(path, page_count, seed=0):
+    """
+    生成 page_count 页的合成面单PDF，并在同名 .json 中写出真值
+
+    文件已存在且参数相同时直接复用。返回真值列表 [{"page", "kind", "barcode"}, ...]。
+    """
+    truth_path = os.path.splitext(path)[0] + ".json"
+    if os.path.exists(path) and os.path.exists(truth_path):
+        with open(truth_path, encoding="utf-8") as f:
+            truth = json.load(f)
+        if truth.get("seed") == seed and len(truth.get("pages", ())) == page_count:
+            return truth["pages"]
+
+    rng = random.Random(seed)
+    kinds = [kind for kind, _ in PAGE_KINDS]
+    weights = [weight for _, weight in PAGE_KINDS]
+    pages = []
+    with fitz.open() as doc:
+        for index in range(page_count):
+            # 单页文件总是带条码
+            kind = "code128" if page_count == 1 else rng.choices(kinds, weights)[0]
+            pages.append({"page": index + 1, "kind": kind, "barcode": add_label_page(doc, rng, kind)})
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 页数很多时 garbage 清理的耗时增长很快，生成的文件本身没有冗余对象
+        doc.save(path, deflate=True)
+
+    with open(truth_path, "w", encoding="utf-8") as f:
+        json.dump({"seed": seed, "pages": pages}, f, ensure_ascii=False, indent=1)
+    return pages
+
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        return 1
+    output_dir = argv[0]
+    for page_count in [int(value) for value in argv[1:]] or [1, 100]:
+        path = os.path.join(output_dir, f"labels_{page_count}.pdf")
+        pages = generate_labels(path, page_count)
+        kinds = {}
+        for page in pages:
+            kinds[page["kind"]] = kinds.get(page["kind"], 0) + 1
+        print(f"{path}: {page_count} 页 {kinds}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -11,6 +11,12 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import customtkinter as ctk
 from enhanced_barcode_processor import EnhancedPDFProcessor
+from pdfclip.progress import ProgressTracker, count_pages
+from pdfclip.trace import TraceWriter, span
+from pdfclip.uiqueue import UIEventQueue, run_actions, start_pump, trim_text
+
+UI_UPDATES_PER_SECOND = 10  # 界面每秒最多刷新次数
+MAX_LOG_LINES = 5000  # 日志框最多保留的行数
 
 # 设置CustomTkinter的外观模式和颜色主题
 ctk.set_appearance_mode("System")  # 系统模式，自动适应系统主题
@@ -28,8 +34,13 @@ class ScrollableTextFrame(ctk.CTkFrame):
 
     def insert_text(self, text):
         """插入文本并自动滚动到底部"""
+        self.insert_lines([text])
+
+    def insert_lines(self, lines):
+        """一次插入多行文本，只保留最后 MAX_LOG_LINES 行"""
         self.text.configure(state="normal")
-        self.text.insert("end", text + "\n")
+        self.text.insert("end", "\n".join(lines) + "\n")
+        trim_text(self.text, MAX_LOG_LINES)
         self.text.configure(state="disabled")
         self.text.see("end")
 
@@ -40,10 +51,10 @@ class ScrollableTextFrame(ctk.CTkFrame):
         self.text.configure(state="disabled")
 
 class LogRedirector:
-    """重定向日志输出到文本框"""
+    """重定向日志输出到界面事件队列，由主线程批量写入文本框"""
 
-    def __init__(self, text_widget):
-        self.text_widget = text_widget
+    def __init__(self, events):
+        self.events = events
         self.buffer = ""
 
     def write(self, string):
@@ -52,12 +63,12 @@ class LogRedirector:
             lines = self.buffer.split("\n")
             for line in lines[:-1]:
                 if line:  # 跳过空行
-                    self.text_widget.insert_text(line)
+                    self.events.log(line)
             self.buffer = lines[-1]
 
     def flush(self):
         if self.buffer:
-            self.text_widget.insert_text(self.buffer)
+            self.events.log(self.buffer)
             self.buffer = ""
 
 class EnhancedPDFProcessorUI(ctk.CTk):
@@ -80,6 +91,7 @@ class EnhancedPDFProcessorUI(ctk.CTk):
         # 初始化处理状态
         self.processing = False
         self.current_log_file = None
+        self.progress = None  # 分阶段进度统计(ProgressTracker)
 
     def create_widgets(self):
         """创建界面组件"""
@@ -169,6 +181,11 @@ class EnhancedPDFProcessorUI(ctk.CTk):
         self.step3_check = ctk.CTkCheckBox(self.steps_frame, text="条码识别重命名", variable=self.step3_var)
         self.step3_check.grid(row=0, column=2, padx=5, pady=5)
 
+        # 记录每个文件、每个步骤的时间段，写出 Chrome trace JSON(可在 Perfetto 中打开)
+        self.trace_var = ctk.BooleanVar(value=False)
+        self.trace_check = ctk.CTkCheckBox(self.steps_frame, text="记录跟踪", variable=self.trace_var)
+        self.trace_check.grid(row=0, column=3, padx=5, pady=5)
+
         # 配置参数框架的网格
         self.params_frame.grid_columnconfigure(1, weight=1)
 
@@ -183,6 +200,10 @@ class EnhancedPDFProcessorUI(ctk.CTk):
         self.progress_bar.grid(row=0, column=1, sticky="ew", padx=10, pady=10)
         self.progress_bar.set(0)
 
+        # 已完成页数、吞吐量和预计剩余时间
+        self.progress_info = ctk.CTkLabel(self.progress_frame, text="")
+        self.progress_info.grid(row=1, column=0, columnspan=2, sticky="w", padx=10, pady=(0, 10))
+
         # 配置进度框架的网格
         self.progress_frame.grid_columnconfigure(1, weight=1)
 
@@ -193,8 +214,10 @@ class EnhancedPDFProcessorUI(ctk.CTk):
         self.log_frame = ScrollableTextFrame(self.main_frame)
         self.log_frame.grid(row=4, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
 
-        # 重定向标准输出到日志框
-        self.log_redirector = LogRedirector(self.log_frame)
+        # 重定向标准输出到界面事件队列，主线程定时批量更新日志框
+        self.ui_events = UIEventQueue()
+        self.log_redirector = LogRedirector(self.ui_events)
+        start_pump(self, self.ui_events, self.apply_ui_events, UI_UPDATES_PER_SECOND)
 
         # ===== 操作按钮 =====
         self.button_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
@@ -275,6 +298,16 @@ class EnhancedPDFProcessorUI(ctk.CTk):
         else:  # Linux
             os.system(f'xdg-open "{output_folder}"')
 
+    def apply_ui_events(self, batch):
+        """在主线程中合并应用一批界面事件"""
+        with span("ui_update", cat="ui", logs=len(batch.logs), dropped=batch.dropped):
+            if batch.logs or batch.dropped:
+                lines = [text for text, _ in batch.logs]
+                if batch.dropped:
+                    lines.insert(0, f"...（省略 {batch.dropped} 条日志，完整内容见日志文件）")
+                self.log_frame.insert_lines(lines)
+            run_actions(batch, messagebox)
+
     def clear_log(self):
         """清除日志框内容"""
         self.log_frame.clear()
@@ -314,6 +347,8 @@ class EnhancedPDFProcessorUI(ctk.CTk):
 
         # 设置处理状态
         self.processing = True
+        self.progress = None
+        self.progress_bar.set(0)
         self.start_button.configure(state="disabled")
         self.stop_button.configure(state="normal")
 
@@ -355,7 +390,7 @@ class EnhancedPDFProcessorUI(ctk.CTk):
         # 在单独的线程中处理
         self.processing_thread = threading.Thread(
             target=self.process_files_thread,
-            args=(input_folder, output_folder, border_width, dpi, steps)
+            args=(input_folder, output_folder, border_width, dpi, steps, self.trace_var.get())
         )
         self.processing_thread.daemon = True
         self.processing_thread.start()
@@ -363,12 +398,23 @@ class EnhancedPDFProcessorUI(ctk.CTk):
         # 启动进度监控
         self.after(100, self.check_progress)
 
-    def process_files_thread(self, input_folder, output_folder, border_width, dpi, steps):
+    def process_files_thread(self, input_folder, output_folder, border_width, dpi, steps, trace=False):
         """在线程中处理文件"""
+        trace_writer = None
         try:
+            if trace:
+                trace_path = os.path.join(output_folder, f"处理跟踪_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+                trace_writer = TraceWriter(trace_path).activate()
+                print(f"记录跟踪: {trace_path}")
+
             # 设置处理器DPI
             self.processor = EnhancedPDFProcessor(dpi=dpi)
 
+            # 快速统计总页数，用于显示进度、吞吐量和剩余时间
+            input_files = [os.path.join(input_folder, f) for f in os.listdir(input_folder) if f.lower().endswith('.pdf')]
+            page_counts = count_pages(input_files) if "split" in steps else {}
+            self.progress = ProgressTracker(sum(page_counts.values()) if "split" in steps else len(input_files), steps)
+
             # 创建必要的文件夹
             single_page_folder = os.path.join(output_folder, "单页PDF文件夹")
             cropped_folder = os.path.join(output_folder, "空白裁剪文件夹")
@@ -396,10 +442,12 @@ class EnhancedPDFProcessorUI(ctk.CTk):
 
                     try:
                         # 分割PDF为单页
-                        split_pages = self.processor.split_pdf_to_single_pages(input_path, single_page_folder)
+                        with span("split", cat="file", file=pdf_file):
+                            split_pages = self.processor.split_pdf_to_single_pages(input_path, single_page_folder)
                         print(f"  成功分割为 {len(split_pages)} 页")
                     except Exception as e:
                         print(f"  分割失败: {str(e)}")
+                    self.progress.advance("split", page_counts.get(input_path, 0))
 
             # 处理步骤2: 空白裁剪
             if "crop" in steps:
@@ -413,6 +461,7 @@ class EnhancedPDFProcessorUI(ctk.CTk):
                 else:
                     single_page_files = [f for f in os.listdir(source_folder) if f.lower().endswith('.pdf')]
                     print(f"找到 {len(single_page_files)} 个PDF文件")
+                    self.progress.set_total("crop", len(single_page_files))
 
                     for i, pdf_file in enumerate(single_page_files):
                         if not self.processing:
@@ -424,10 +473,12 @@ class EnhancedPDFProcessorUI(ctk.CTk):
 
                         try:
                             # 裁剪空白区域
-                            self.processor.auto_crop_pdf(input_path, output_path, border_width)
+                            with span("crop", cat="page", file=pdf_file):
+                                self.processor.auto_crop_pdf(input_path, output_path, border_width)
                             print(f"  裁剪成功: {pdf_file}")
                         except Exception as e:
                             print(f"  裁剪失败: {str(e)}")
+                        self.progress.advance("crop")
 
             # 处理步骤3: 条码识别重命名
             if "barcode" in steps:
@@ -446,6 +497,7 @@ class EnhancedPDFProcessorUI(ctk.CTk):
                 else:
                     source_files = [f for f in os.listdir(source_folder) if f.lower().endswith('.pdf')]
                     print(f"找到 {len(source_files)} 个PDF文件")
+                    self.progress.set_total("barcode", len(source_files))
 
                     for i, pdf_file in enumerate(source_files):
                         if not self.processing:
@@ -456,7 +508,8 @@ class EnhancedPDFProcessorUI(ctk.CTk):
 
                         try:
                             # 提取条码
-                            barcode = self.processor.extract_barcode_from_pdf(input_path)
+                            with span("barcode", cat="page", file=pdf_file):
+                                barcode = self.processor.extract_barcode_from_pdf(input_path)
 
                             # 创建新文件名
                             if barcode and barcode != "未找到条码" and barcode != "条码提取错误":
@@ -481,6 +534,7 @@ class EnhancedPDFProcessorUI(ctk.CTk):
                             print(f"  已重命名为: {new_filename}")
                         except Exception as e:
                             print(f"  识别或重命名失败: {str(e)}")
+                        self.progress.advance("barcode")
 
             print("===== 处理完成 =====")
 
@@ -488,14 +542,17 @@ class EnhancedPDFProcessorUI(ctk.CTk):
             print(f"处理过程中发生错误: {str(e)}")
 
         finally:
+            if trace_writer:
+                trace_writer.close()
+
             # 恢复标准输出
             sys.stdout = sys.__stdout__
 
             # 处理完成
             self.processing = False
 
-            # 更新UI状态(在主线程中)
-            self.after(0, self.update_ui_after_processing)
+            # 更新UI状态(由主线程执行)
+            self.ui_events.call(self.update_ui_after_processing)
 
     def update_ui_after_processing(self):
         """处理完成后更新UI状态"""
@@ -518,16 +575,19 @@ class EnhancedPDFProcessorUI(ctk.CTk):
     def check_progress(self):
         """检查处理进度"""
         if self.processing:
-            # 更新进度条(模拟进度)
-            current = self.progress_bar.get()
-            if current < 0.95:  # 保留最后5%，等待实际完成
-                self.progress_bar.set(current + 0.01)
+            # 根据各阶段实际完成的工作量更新进度条
+            if self.progress:
+                snapshot = self.progress.snapshot()
+                self.progress_bar.set(snapshot.fraction)
+                self.progress_info.configure(text=snapshot.describe())
 
             # 继续检查
             self.after(100, self.check_progress)
         else:
             # 处理已停止或完成
             self.progress_bar.set(1)
+            if self.progress:
+                self.progress_info.configure(text=self.progress.snapshot().describe())
 
 def main():
     app = EnhancedPDFProcessorUI()
@@ -0,0 +1,10 @@
+"""PDF 自动裁剪与重命名工具的处理引擎（不依赖图形界面）
+
+重量级依赖(PyMuPDF、OpenCV、pyzbar、openpyxl 等)只在首次用到对应处理步骤时才导入。
+"""
+import os
+
+
+def default_workers():
+    """默认工作进程数：CPU 核心数"""
+    return os.cpu_count() or 1
@@ -0,0 +1,547 @@
+"""条码识别与条码内容处理"""
+import contextvars
+import logging
+import time
+
+from pdfclip.metrics import note_barcode_source, stage
+from pdfclip.modes import BARCODE_BACKENDS, DECODE_RUNGS, DEFAULT_DECODE_LADDER, DecodeLadder  # noqa: F401
+from pdfclip.profiles import DEFAULT_PROFILE, DEFAULT_ROI
+
+logger = logging.getLogger("pdfclip")
+
+# 默认配置的条码区域(快递面单的条码通常在右上角)，各快递公司的条码区域见 pdfclip.profiles
+BARCODE_ROI = DEFAULT_ROI
+
+# 嵌入图像覆盖页面面积超过该比例时视为扫描页，条码区域未识别到时识别整幅图像(代替整页渲染)
+FULL_PAGE_IMAGE_FRACTION = 0.5
+
+# 图像中与条码区域重叠的部分小于该像素数时不识别
+MIN_IMAGE_ROI_PIXELS = 32
+
+# roi_low 的渲染分辨率
+LOW_DPI = 100
+
+# roi_rotated 的旋转角度(度)：zbar 能容忍约 15 度的倾斜，这几个角度覆盖其余方向
+ROTATION_ANGLES = (30, -30, 60, -60)
+
+# zbar 不做校验(没有或不强制校验位)的码制，低分辨率一级识别到时不直接采用
+UNCHECKED_SYMBOLOGIES = frozenset(("CODE39", "I25", "CODABAR"))
+
+
+# 识别阶梯因时间预算跳过了某些处理时，向当前列表追加跳过的级(见 detect_barcode_in_document，这样的未命中结果不缓存)
+_skipped_rungs = contextvars.ContextVar("pdfclip_skipped_rungs", default=None)
+
+# 条码的来源(PageResult.barcode_source)：缓存、文字层、矢量绘制、嵌入图像、poppler 渲染或识别阶梯的某一级
+BARCODE_SOURCES = ("cache", "text_layer", "vector", "image", "poppler") + DECODE_RUNGS
+
+# 额外的条码区域(如学到的区域)有该比例以上的面积落在配置的某个条码区域内时不再单独尝试
+COVERED_FRACTION = 0.9
+
+# 额外的条码区域计入缓存键时的取整步长(页面宽高的比例)
+ROI_KEY_STEP = 0.02
+
+# 共享图像相对输出页面的等效分辨率不低于识别分辨率的该比例时才直接使用(输出页面放大不超过约 1.4 倍)
+SHARED_MIN_DPI_RATIO = 0.75
+
+
+def barcode_text(barcode):
+    """将 pyzbar 识别结果解码为字符串，无法解码时返回 None"""
+    try:
+        return barcode.data.decode("utf-8") or None
+    except UnicodeDecodeError:
+        try:
+            return barcode.data.decode("latin-1") or None
+        except Exception:
+            return None
+
+
+def _first_barcode(barcodes, checked_only=False, profile=DEFAULT_PROFILE):
+    """
+    返回第一个可解码且符合配置格式的 (条码内容, pyzbar 结果)，没有时返回 (None, None)
+
+    checked_only 为 True 时跳过 zbar 不做校验的码制；不符合 profile.pattern 的内容(如面单上的其他条码)也跳过。
+    """
+    for barcode in barcodes:
+        if checked_only and barcode.type in UNCHECKED_SYMBOLOGIES:
+            continue
+        barcode_data = barcode_text(barcode)
+        if barcode_data and profile.accepts(barcode_data):
+            return barcode_data, barcode
+    return None, None
+
+
+def _first_text(barcodes, checked_only=False, profile=DEFAULT_PROFILE):
+    """返回第一个可解码且符合配置格式的条码内容，见 _first_barcode"""
+    return _first_barcode(barcodes, checked_only, profile)[0]
+
+
+def _barcode_rect(barcode, shape, bounds):
+    """
+    pyzbar 结果在页面上的位置
+
+    图像(行列与页面方向一致)覆盖页面上的 bounds 矩形；结果没有位置信息时返回整个 bounds。
+    """
+    import fitz  # PyMuPDF
+
+    rect = getattr(barcode, "rect", None)
+    height, width = shape[:2]
+    if not rect or not width or not height:
+        return fitz.Rect(bounds)
+    scale_x, scale_y = bounds.width / width, bounds.height / height
+    return fitz.Rect(bounds.x0 + rect.left * scale_x, bounds.y0 + rect.top * scale_y,
+                     bounds.x0 + (rect.left + rect.width) * scale_x, bounds.y0 + (rect.top + rect.height) * scale_y)
+
+
+def _decode(image, profile=DEFAULT_PROFILE):
+    """pyzbar 识别；配置限定了码制时只扫描这些码制"""
+    from pyzbar.pyzbar import ZBarSymbol, decode
+
+    if profile.symbologies:
+        return decode(image, symbols=[getattr(ZBarSymbol, name) for name in profile.symbologies])
+    return decode(image)
+
+
+def _covered(roi, rois):
+    """roi 是否大部分(COVERED_FRACTION)落在 rois 的某一个之内"""
+    area = (roi[2] - roi[0]) * (roi[3] - roi[1])
+    for other in rois:
+        width = min(roi[2], other[2]) - max(roi[0], other[0])
+        height = min(roi[3], other[3]) - max(roi[1], other[1])
+        if width > 0 and height > 0 and width * height >= area * COVERED_FRACTION:
+            return True
+    return False
+
+
+def _enhance(gray):
+    import cv2
+
+    # 增强对比度（黑白图像特别有效）
+    return cv2.convertScaleAbs(gray, alpha=1.8, beta=40)
+
+
+def decode_roi_image(gray_roi, profile=DEFAULT_PROFILE):
+    """在条码区域图像中增强对比度后识别条码"""
+    return _first_text(_decode(_enhance(gray_roi), profile), profile=profile)
+
+
+def decode_full_image(gray, profile=DEFAULT_PROFILE):
+    """在整页图像中识别条码"""
+    return _first_text(_decode(gray, profile), profile=profile)
+
+
+def decode_barcode_image(gray, profile=DEFAULT_PROFILE):
+    """
+    在灰度图像(numpy数组)中识别条码
+
+    先依次在配置的条码区域(默认为右上角)增强对比度后识别，未检测到时再尝试整个页面。
+    返回第一个可解码的条码内容，未找到时返回 None。
+    """
+    height, width = gray.shape[:2]
+    barcode_data = None
+    for roi in profile.rois:
+        start_x = int(width * roi[0])
+        start_y = int(height * roi[1])
+        end_x = int(width * roi[2])
+        end_y = int(height * roi[3])
+
+        with stage("decode_roi"):
+            barcode_data = decode_roi_image(gray[start_y:end_y, start_x:end_x], profile)
+        if barcode_data:
+            break
+
+    # 如果未检测到，尝试整个页面
+    if not barcode_data:
+        with stage("decode_full"):
+            barcode_data = decode_full_image(gray, profile)
+    return barcode_data
+
+
+def _upright(gray, matrix):
+    """按图像到页面的变换矩阵，把图像像素(数组视图)转为页面上的方向"""
+    if abs(matrix.a) < abs(matrix.b):
+        # 图像的行列与页面的横纵方向互换
+        gray = gray.T
+        flip_x, flip_y = matrix.c < 0, matrix.b < 0
+    else:
+        flip_x, flip_y = matrix.a < 0, matrix.d < 0
+    if flip_x:
+        gray = gray[:, ::-1]
+    if flip_y:
+        gray = gray[::-1, :]
+    return gray
+
+
+def find_barcode_in_images(page, profile=DEFAULT_PROFILE):
+    """
+    直接识别页面中与条码区域重叠的嵌入图像(扫描件、图片面单)
+
+    按图像的原始分辨率解码像素，只截取与条码区域(profile.rois)重叠的部分，不渲染页面；
+    条码区域未识别到时，再识别覆盖大半页面的图像整体。
+
+    Returns:
+        (条码内容, 条码在页面坐标中的 fitz.Rect)；未找到时返回 (None, None)
+    """
+    import fitz  # PyMuPDF
+
+    from pdfclip.raster import image_gray, relative_rect
+
+    rois = [relative_rect(page.rect, roi) for roi in profile.rois]
+    page_area = abs(page.rect) or 1
+    full_page_images = []
+    seen = set()
+    for info in page.get_image_info(xrefs=True):
+        # 内联图像没有 xref，交给渲染识别
+        xref, width, height = info["xref"], info["width"], info["height"]
+        if not xref or xref in seen or not width or not height:
+            continue
+        seen.add(xref)
+        # 像素坐标 -> 单位正方形 -> 未旋转的页面坐标 -> 页面(渲染方向)坐标
+        to_page = fitz.Matrix(1 / width, 0, 0, 1 / height, 0, 0) * fitz.Matrix(info["transform"]) \
+            * page.rotation_matrix
+        bbox = fitz.Rect(0, 0, width, height) * to_page
+        overlaps = [roi & bbox for roi in rois if not (roi & bbox).is_empty]
+        if not overlaps or abs(to_page.a * to_page.d - to_page.b * to_page.c) < 1e-9:
+            continue
+        with stage("decode_image"):
+            gray = image_gray(page.parent, xref)
+            if gray is None:
+                continue
+            for overlap in overlaps:
+                clip = (overlap * ~to_page).irect & fitz.IRect(0, 0, width, height)
+                if clip.width >= MIN_IMAGE_ROI_PIXELS and clip.height >= MIN_IMAGE_ROI_PIXELS:
+                    crop = _upright(gray[clip.y0:clip.y1, clip.x0:clip.x1], to_page)
+                    barcode_data, barcode = _first_barcode(_decode(_enhance(crop), profile), profile=profile)
+                    if barcode_data:
+                        return barcode_data, _barcode_rect(barcode, crop.shape, fitz.Rect(clip) * to_page)
+        if abs(bbox & page.rect) >= page_area * FULL_PAGE_IMAGE_FRACTION:
+            full_page_images.append((_upright(gray, to_page), bbox))
+
+    for gray, bbox in full_page_images:
+        with stage("decode_image"):
+            barcode_data, barcode = _first_barcode(_decode(gray, profile), profile=profile)
+        if barcode_data:
+            return barcode_data, _barcode_rect(barcode, gray.shape, bbox)
+    return None, None
+
+
+def detect_barcode_in_images(page, profile=DEFAULT_PROFILE):
+    """同 find_barcode_in_images，只返回条码内容，未找到时返回 None"""
+    return find_barcode_in_images(page, profile)[0]
+
+
+def detect_barcode_in_page(page, dpi=200, raster=None, ladder=DEFAULT_DECODE_LADDER, profile=DEFAULT_PROFILE):
+    """
+    使用 PyMuPDF 直接渲染已打开的页面并识别条码
+
+    先从矢量绘制命令还原一维条码，再识别条码区域内的嵌入图像(都不渲染)，
+    然后按识别阶梯 ladder(见 decode_ladder)由低分辨率的条码区域逐级识别到整页，不启动任何外部进程。
+    raster 为生成该页的源页面的共享图像(pdfclip.raster.PageRaster)时，直接从中截取对应区域，不再渲染；
+    输出页面放大较多、共享图像的等效分辨率不足 dpi 的 SHARED_MIN_DPI_RATIO 时仍单独渲染。
+    profile 为该页的快递公司配置(pdfclip.profiles.CarrierProfile)，决定条码区域、码制和内容格式。
+    识别到的条码来源和位置用 note_barcode_source 记录。
+    """
+    from pdfclip.raster import rect_ratio, relative_rect
+    from pdfclip.vectorbarcode import find_vector_barcode
+
+    barcode_data, rect = find_vector_barcode(page, [relative_rect(page.rect, roi) for roi in profile.rois],
+                                             profile.symbologies, profile.accepts)
+    if barcode_data:
+        note_barcode_source("vector", rect_ratio(page.rect, rect))
+        return barcode_data
+    barcode_data, rect = find_barcode_in_images(page, profile)
+    if barcode_data:
+        note_barcode_source("image", rect_ratio(page.rect, rect))
+        return barcode_data
+    return decode_ladder(page, dpi, raster, ladder, profile)
+
+
+class _LadderImages:
+    """识别阶梯中各级共用的图像：同一区域和分辨率只渲染一次，同一图像的同一种处理只识别一次"""
+
+    def __init__(self, page, raster, profile):
+        from pdfclip.raster import relative_rect
+
+        self.page = page
+        self.raster = raster
+        self.profile = profile
+        self.rois = [relative_rect(page.rect, roi) for roi in profile.rois]
+        self.images = {}
+        self.bounds = {}  # 图像键 -> 图像覆盖的页面区域
+        self.decoded = set()
+        self.hit = None   # 最近一次有结果的 (图像键, 处理方式)
+        self.truncated = False  # 是否因时间预算跳过了某一级内的部分处理
+
+    def get(self, region, dpi):
+        """
+        渲染 region(条码区域的序号或 "page" 整页)，返回 (图像键, 灰度图像)
+
+        共享图像(见 detect_barcode_in_page)的分辨率足够时直接截取，各分辨率得到的是同一幅图像，键也相同。
+        """
+        from pdfclip.raster import render_gray
+
+        clip = None if region == "page" else self.rois[region]
+        raster = self.raster
+        if (raster is not None and raster.enabled and raster.placed is not None and
+                raster.placed_dpi() >= dpi * SHARED_MIN_DPI_RATIO):
+            key = (region, "shared")
+            if key not in self.images:
+                with stage("render_barcode"):
+                    self.images[key] = raster.region(clip if clip is not None else self.page.rect)
+                self.bounds[key] = (clip if clip is not None else self.page.rect) & raster.placed
+            if self.images[key] is not None:
+                return key, self.images[key]
+        key = (region, dpi)
+        if key not in self.images:
+            with stage("render_barcode"):
+                self.images[key] = render_gray(self.page, dpi, clip=clip)
+            self.bounds[key] = clip if clip is not None else self.page.rect
+        return key, self.images[key]
+
+    def decode(self, key, variant, prepare=None):
+        """识别 key 对应图像经 prepare 处理后的结果(pyzbar 结果列表)，已识别过的组合返回空列表"""
+        if (key, variant) in self.decoded:
+            return []
+        self.decoded.add((key, variant))
+        with stage("decode_full" if key[0] == "page" else "decode_roi"):
+            image = self.images[key]
+            barcodes = _decode(prepare(image) if prepare else image, self.profile)
+        if barcodes:
+            self.hit = (key, variant)
+        return barcodes
+
+    def locate(self, barcode):
+        """最近一次有结果的识别中 barcode 在页面上的位置(比例)；旋转后识别的取整个图像区域"""
+        from pdfclip.raster import rect_ratio
+
+        key, variant = self.hit
+        if variant.startswith("rotate"):
+            rect = self.bounds[key]
+        else:
+            rect = _barcode_rect(barcode, self.images[key].shape, self.bounds[key])
+        return rect_ratio(self.page.rect, rect)
+
+    def decode_rois(self, dpi, variant, prepare=None):
+        """依次识别各条码区域，返回第一个有结果的区域的 pyzbar 结果"""
+        for index in range(len(self.rois)):
+            key, _ = self.get(index, dpi)
+            barcodes = self.decode(key, variant, prepare)
+            if barcodes:
+                return barcodes
+        return []
+
+
+def _otsu(gray):
+    import cv2
+
+    return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def _adaptive(gray):
+    import cv2
+
+    # 窗口约为图像短边的 1/8(奇数)，比单个条码模块宽得多
+    block = max(15, min(gray.shape[:2]) // 8 | 1)
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block, 10)
+
+
+def _rotate(gray, angle):
+    """按 angle 度旋转并扩大画布，空白处填白色"""
+    import cv2
+
+    height, width = gray.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    new_width, new_height = int(height * sin + width * cos), int(height * cos + width * sin)
+    matrix[0, 2] += (new_width - width) / 2
+    matrix[1, 2] += (new_height - height) / 2
+    return cv2.warpAffine(gray, matrix, (new_width, new_height), borderValue=255)
+
+
+def _rung_roi_low(images, dpi, deadline):
+    return images.decode_rois(min(dpi, LOW_DPI), "enhance", _enhance)
+
+
+def _rung_roi(images, dpi, deadline):
+    return images.decode_rois(dpi, "enhance", _enhance)
+
+
+def _rung_roi_binary(images, dpi, deadline):
+    return images.decode_rois(dpi, "otsu", _otsu) or images.decode_rois(dpi, "adaptive", _adaptive)
+
+
+def _rung_roi_rotated(images, dpi, deadline):
+    for angle in ROTATION_ANGLES:
+        if time.perf_counter() > deadline:
+            images.truncated = True
+            break
+        barcodes = images.decode_rois(dpi, f"rotate{angle}", lambda gray: _rotate(_enhance(gray), angle))
+        if barcodes:
+            return barcodes
+    return []
+
+
+def _rung_full(images, dpi, deadline):
+    key, _ = images.get("page", dpi)
+    return images.decode(key, "plain")
+
+
+_RUNG_DECODERS = {
+    "roi_low": _rung_roi_low,
+    "roi": _rung_roi,
+    "roi_binary": _rung_roi_binary,
+    "roi_rotated": _rung_roi_rotated,
+    "full": _rung_full,
+}
+
+
+def decode_ladder(page, dpi=200, raster=None, ladder=DEFAULT_DECODE_LADDER, profile=DEFAULT_PROFILE):
+    """
+    按识别阶梯(DecodeLadder)逐级渲染并识别页面的条码
+
+    每一级识别到通过校验的条码即停止，并记录条码来源和位置(见 pdfclip.metrics.note_barcode_source)；
+    低分辨率一级只识别到不带校验的码制(UNCHECKED_SYMBOLOGIES)时继续尝试后面各级，都未找到时才采用。
+    时间预算用完后跳过后面的各级，但整页识别(full，若在阶梯中)总会尝试一次，条码不在条码区域内的慢页面不会漏识别；
+    跳过的级记录下来，未找到时的结果不写入缓存。条码区域、码制和内容格式由 profile 决定。未找到时返回 None。
+    """
+    images = _LadderImages(page, raster, profile)
+    deadline = time.perf_counter() + ladder.budget
+    unchecked = unchecked_source = unchecked_region = None
+    skipped = []
+    for index, rung in enumerate(ladder.rungs):
+        if index and rung != "full" and time.perf_counter() > deadline:
+            skipped.append(rung)
+            continue
+        barcodes = _RUNG_DECODERS[rung](images, dpi, deadline)
+        barcode_data, barcode = _first_barcode(barcodes, rung == "roi_low", profile)
+        if barcode_data:
+            note_barcode_source(rung, images.locate(barcode))
+            return barcode_data
+        if unchecked is None:
+            unchecked, barcode = _first_barcode(barcodes, profile=profile)
+            if unchecked:
+                unchecked_source, unchecked_region = rung, images.locate(barcode)
+    if skipped:
+        logger.debug(f"条码识别超出时间预算 {ladder.budget} 秒，跳过了 {', '.join(skipped)}")
+    if skipped or images.truncated:
+        truncated = _skipped_rungs.get()
+        if truncated is not None:
+            truncated.extend(skipped or ["roi_rotated"])
+    if unchecked:
+        note_barcode_source(unchecked_source, unchecked_region)
+    return unchecked
+
+
+def detect_barcode_in_document(doc, dpi=200, backend="pymupdf", poppler_path=None, cache=None, text_layer="off",
+                               raster=None, ladder=DEFAULT_DECODE_LADDER, profile=DEFAULT_PROFILE, rois=()):
+    """
+    识别内存中 PDF 文档的条码
+
+    Args:
+        doc: 已打开的 fitz.Document
+        dpi: 渲染分辨率
+        backend: "pymupdf"(默认，直接渲染) 或 "poppler"(通过 pdf2image 调用 pdftoppm)
+        poppler_path: poppler 可执行文件目录，仅 poppler 后端使用
+        cache: 结果缓存(ResultCache)，命中时不再渲染和识别
+        text_layer: 是否先从文字层读取运单号(见 pdfclip.textlayer.TEXT_LAYER_MODES)
+        raster: 生成单页 doc 的源页面的共享图像(pdfclip.raster.PageRaster)，渲染识别时直接截取，不再渲染
+        ladder: 渲染识别的阶梯(DecodeLadder)，仅 pymupdf 后端使用
+        profile: 快递公司配置(pdfclip.profiles.CarrierProfile)，决定条码区域、码制和内容格式
+        rois: 在配置的条码区域之前先尝试的区域(如 pdfclip.roimemory 学到的区域)，按 ROI_KEY_STEP 取整后计入缓存键；
+            已被配置的条码区域覆盖的不再尝试(未命中时每一级都要多识别一次)
+    """
+    rois = tuple(roi for roi in rois if not _covered(roi, profile.rois))
+    search_profile = profile._replace(rois=rois + tuple(profile.rois)) if rois else profile
+    if cache is None:
+        return _detect_barcode_in_document(doc, dpi, backend, poppler_path, text_layer, raster, ladder,
+                                           search_profile)
+
+    from pdfclip.resultcache import MISS, document_fingerprint, make_key
+
+    # 文字层的结果可能与条码内容不同(例如条码带有前缀)，分开缓存；
+    # 只启用部分识别阶梯时可能识别不到，也分开缓存。时间预算不影响缓存键：预算用完跳过了某些级时，
+    # 未找到的结果不写入缓存，放宽预算后会重新识别
+    extra = {"text_layer": text_layer} if text_layer != "off" else {}
+    if backend == "pymupdf" and tuple(ladder.rungs) != DECODE_RUNGS:
+        extra["rungs"] = tuple(ladder.rungs)
+    # 默认配置沿用原有的缓存键；其他配置以其全部内容为键，修改配置文件后不会用到旧结果
+    if profile != DEFAULT_PROFILE:
+        extra["profile"] = tuple(profile)
+    # 额外的区域改变识别的范围和顺序(可能识别到另一个条码，或在原配置下识别不到)；
+    # 学习时区域的微小移动不应使缓存失效，取整后再计入
+    if rois:
+        extra["rois"] = tuple(tuple(round(value / ROI_KEY_STEP) for value in roi) for roi in rois)
+    key = make_key("barcode", document_fingerprint(doc), dpi=dpi, roi=BARCODE_ROI, backend=backend, **extra)
+    barcode_data = cache.get(key)
+    if barcode_data is MISS:
+        skipped = []
+        token = _skipped_rungs.set(skipped)
+        try:
+            barcode_data = _detect_barcode_in_document(doc, dpi, backend, poppler_path, text_layer, raster, ladder,
+                                                       search_profile)
+        finally:
+            _skipped_rungs.reset(token)
+        if barcode_data or not skipped:
+            cache.put(key, barcode_data)
+    elif barcode_data:
+        note_barcode_source("cache")
+    return barcode_data
+
+
+def _detect_barcode_in_document(doc, dpi, backend, poppler_path, text_layer="off", raster=None,
+                                ladder=DEFAULT_DECODE_LADDER, profile=DEFAULT_PROFILE):
+    if text_layer != "off":
+        from pdfclip.textlayer import sampled_for_verify, tracking_number_from_page
+
+        for page in doc:
+            number, carrier = tracking_number_from_page(page)
+            # 不符合快递公司配置格式的号码不采用
+            if not number or not profile.accepts(number):
+                continue
+            if text_layer == "verify" and sampled_for_verify(number):
+                barcode_data = _render_and_detect(doc, dpi, backend, poppler_path, raster, ladder, profile)
+                if barcode_data and barcode_data != number:
+                    logger.warning(f"文字层运单号 {number}({carrier}) 与条码 {barcode_data} 不一致，使用条码")
+                    return barcode_data
+            note_barcode_source("text_layer")
+            return number
+    return _render_and_detect(doc, dpi, backend, poppler_path, raster, ladder, profile)
+
+
+def _render_and_detect(doc, dpi, backend, poppler_path, raster=None, ladder=DEFAULT_DECODE_LADDER,
+                       profile=DEFAULT_PROFILE):
+    if backend == "poppler":
+        import numpy as np
+        from pdf2image import convert_from_bytes
+
+        with stage("render_barcode"):
+            images = convert_from_bytes(doc.tobytes(), dpi=dpi, grayscale=True, poppler_path=poppler_path)
+        for img in images:
+            barcode_data = decode_barcode_image(np.array(img), profile)
+            if barcode_data:
+                note_barcode_source("poppler")
+                return barcode_data
+        return None
+
+    # 共享图像只对应单页文档的那一页
+    if doc.page_count != 1:
+        raster = None
+    for page in doc:
+        barcode_data = detect_barcode_in_page(page, dpi, raster, ladder, profile)
+        if barcode_data:
+            return barcode_data
+    return None
+
+
+def normalize_barcode(barcode, profile=DEFAULT_PROFILE):
+    """
+    按快递公司配置的命名规则处理条码内容，返回用于命名的条码
+
+    默认配置：以 4 开头且超过 22 位的截取后 22 位，以 9 开头且超过 22 位的截取后 12 位。
+    """
+    return profile.normalized(barcode)
+
+
+def safe_file_stem(barcode):
+    """由条码生成安全的文件名（不含扩展名），只保留字母数字，最长50个字符"""
+    safe_barcode = ''.join(filter(str.isalnum, barcode))
+    return safe_barcode[:50]
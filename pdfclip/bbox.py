@@ -0,0 +1,113 @@
+"""基于 NumPy 的内容边界框检测
+
+用于替代 auto_crop_pdf 中逐像素的 Python 双重循环：
+先去掉边框区域，再对行/列做 any + argmax 归约得到内容边界。
+"""
+import numpy as np
+
+
+def _inner_region(gray, border_width):
+    """返回去掉边框后的内部区域及其在原图中的偏移量"""
+    height, width = gray.shape
+    # 负数边框等价于不排除任何像素（与原循环语义一致）
+    bw = max(0, int(border_width))
+    if 2 * bw >= height or 2 * bw >= width:
+        return None, bw
+    return gray[bw:height - bw, bw:width - bw], bw
+
+
+def _edges(mask):
+    """对布尔掩码做行/列归约，返回 (left, top, right, bottom)，没有内容时返回 None"""
+    rows = mask.any(axis=1)
+    if not rows.any():
+        return None
+    cols = mask.any(axis=0)
+    top = int(rows.argmax())
+    bottom = len(rows) - 1 - int(rows[::-1].argmax())
+    left = int(cols.argmax())
+    right = len(cols) - 1 - int(cols[::-1].argmax())
+    return left, top, right, bottom
+
+
+def min_pool(gray, factor):
+    """按 factor x factor 块取最小值降采样，块内有任意非白像素时结果小于 255"""
+    height, width = gray.shape
+    full_h = height - height % factor
+    full_w = width - width % factor
+    # 行方向：连续内存上的 reshape + min
+    rows = gray[:full_h].reshape(full_h // factor, factor, width).min(axis=1)
+    if full_h < height:
+        rows = np.vstack([rows, gray[full_h:].min(axis=0, keepdims=True)])
+    # 列方向：对已缩小的图像做步进切片取最小值
+    blocks = rows[:, 0:full_w:factor]
+    for offset in range(1, factor):
+        blocks = np.minimum(blocks, rows[:, offset:full_w:factor])
+    if full_w < width:
+        blocks = np.hstack([blocks, rows[:, full_w:].min(axis=1, keepdims=True)])
+    return blocks
+
+
+def _coarse_edges(inner, factor):
+    """在降采样图像上寻找边界，再仅在边缘条带内以全分辨率精确定位"""
+    height, width = inner.shape
+    blocks = min_pool(inner, factor)
+    coarse = _edges(blocks < 255)
+    if coarse is None:
+        return None
+    c_left, c_top, c_right, c_bottom = coarse
+
+    # 粗框对应的全分辨率范围，所有内容像素都在其中
+    x0, x1 = c_left * factor, min(width, (c_right + 1) * factor)
+    y0, y1 = c_top * factor, min(height, (c_bottom + 1) * factor)
+
+    # 只在四条边所在的条带内精确查找
+    top_band = inner[y0:min(y1, y0 + factor), x0:x1] < 255
+    top = y0 + int(top_band.any(axis=1).argmax())
+    bottom_start = max(y0, c_bottom * factor)
+    bottom_band = inner[bottom_start:y1, x0:x1] < 255
+    bottom_rows = bottom_band.any(axis=1)
+    bottom = bottom_start + len(bottom_rows) - 1 - int(bottom_rows[::-1].argmax())
+
+    left_band = inner[y0:y1, x0:min(x1, x0 + factor)] < 255
+    left = x0 + int(left_band.any(axis=0).argmax())
+    right_start = max(x0, c_right * factor)
+    right_band = inner[y0:y1, right_start:x1] < 255
+    right_cols = right_band.any(axis=0)
+    right = right_start + len(right_cols) - 1 - int(right_cols[::-1].argmax())
+    return left, top, right, bottom
+
+
+def find_content_bbox(gray, border_width=5, coarse_factor=1):
+    """
+    在灰度图像中查找非白色内容的边界
+
+    Args:
+        gray: 二维 uint8 灰度数组
+        border_width: 忽略的边框宽度(像素)，负数表示不忽略
+        coarse_factor: 降采样倍数，大于1时启用由粗到细的查找
+
+    Returns:
+        (left, top, right, bottom) 闭区间像素坐标；页面全白或只有边框时返回 None
+    """
+    inner, bw = _inner_region(np.asarray(gray), border_width)
+    if inner is None:
+        return None
+    if coarse_factor and coarse_factor > 1:
+        edges = _coarse_edges(inner, int(coarse_factor))
+    else:
+        edges = _edges(inner < 255)
+    if edges is None:
+        return None
+    left, top, right, bottom = edges
+    return left + bw, top + bw, right + bw, bottom + bw
+
+
+def content_rect(gray, border_width=5, coarse_factor=1):
+    """返回与原逐像素循环相同的裁剪矩形 fitz.Rect，没有内容时返回 None"""
+    import fitz  # PyMuPDF
+
+    bbox = find_content_bbox(gray, border_width, coarse_factor)
+    if bbox is None:
+        return None
+    left, top, right, bottom = bbox
+    return fitz.Rect(left, top, right + 1, bottom + 1)  # 注意加一操作
@@ -0,0 +1,315 @@
+"""
+命令行入口：python -m pdfclip
+
+示例:
+    python -m pdfclip "incoming/*.pdf" -o output --border-width -400 --size 100x150 --workers 8
+    python -m pdfclip --watch incoming -o output      # 监控模式：持续处理投放到 incoming 中的PDF
+"""
+import argparse
+import glob
+import logging
+import os
+import signal
+import sys
+import time
+from contextlib import nullcontext
+
+from pdfclip import default_workers
+from pdfclip.modes import (BARCODE_BACKENDS, CROP_MODES, DECODE_RUNGS, DEFAULT_DECODE_LADDER, PAGE_MODES,
+                           TEXT_LAYER_MODES, DecodeLadder)
+
+logger = logging.getLogger("pdfclip")
+
+# 批处理时输出进度的间隔(秒)
+PROGRESS_LOG_INTERVAL = 10
+
+
+def parse_size(value):
+    """解析 "宽x高" 形式的毫米尺寸"""
+    try:
+        width, height = value.lower().split("x")
+        return float(width), float(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"尺寸格式应为 宽x高(毫米)，例如 100x150: {value}")
+
+
+def parse_rungs(value):
+    """解析逗号分隔的识别阶梯，如 roi_low,roi,full"""
+    rungs = tuple(name.strip() for name in value.split(",") if name.strip())
+    unknown = [name for name in rungs if name not in DECODE_RUNGS]
+    if unknown or not rungs:
+        raise argparse.ArgumentTypeError(f"识别阶梯应为 {','.join(DECODE_RUNGS)} 中的一个或多个: {value}")
+    return rungs
+
+
+def expand_inputs(patterns):
+    """展开输入的通配符，保持顺序并去重"""
+    file_paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or ([pattern] if os.path.isfile(pattern) else [])
+        if not matches:
+            logger.warning(f"没有匹配的文件: {pattern}")
+        for path in matches:
+            if path.lower().endswith(".pdf") and path not in file_paths:
+                file_paths.append(path)
+    return file_paths
+
+
+def exit_on_sigterm():
+    """收到 SIGTERM 时以 SystemExit 退出，使 finally 中的清理(生成 .xlsx 报告、写出跟踪记录等)仍会执行"""
+    def handler(signum, frame):
+        raise SystemExit(128 + signum)
+
+    try:
+        signal.signal(signal.SIGTERM, handler)
+    except ValueError:
+        pass  # 不在主线程中(如被嵌入调用)时无法设置
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m pdfclip", description="PDF 自动裁剪与重命名工具（命令行）")
+    parser.add_argument("inputs", nargs="*", help="输入PDF文件或通配符，如 \"in/*.pdf\"")
+    parser.add_argument("-o", "--output", default="output", help="输出文件夹 (默认: output)")
+    parser.add_argument("--border-width", type=int, default=-400, help="裁剪时忽略的边框宽度(像素)，默认 -400")
+    parser.add_argument("--crop-mode", choices=CROP_MODES, default="raster",
+                        help="裁剪区域检测方式: raster 渲染页面查找，vector 读取矢量绘制记录(更快，扫描页自动改用渲染)")
+    parser.add_argument("--page-mode", choices=PAGE_MODES, default="xobject",
+                        help="输出页面生成方式: xobject 缩放放置为新页面，cropbox 只改写页面框(不嵌入，文件更小)")
+    parser.add_argument("--size", type=parse_size, default=(100, 150), help="目标尺寸(毫米)，默认 100x150")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="工作进程数，默认为CPU核心数")
+    parser.add_argument("--no-rename", action="store_true", help="不按条码重命名")
+    parser.add_argument("--report", help="重命名报告路径，格式由扩展名决定: .xlsx/.csv/.jsonl (默认: 输出文件夹/重命名报告.xlsx，监控模式为 .csv)；"
+                             ".csv/.jsonl 逐行写入磁盘，.xlsx 在处理结束时才生成")
+    parser.add_argument("--text-layer", choices=TEXT_LAYER_MODES, default="off",
+                        help="先从文字层读取运单号: first 未找到时再渲染识别条码，verify 另抽样渲染交叉验证 (默认 off)")
+    parser.add_argument("--decode-ladder", type=parse_rungs, default=DEFAULT_DECODE_LADDER.rungs,
+                        help=f"渲染识别条码时依次尝试的各级，逗号分隔 (默认: {','.join(DECODE_RUNGS)})")
+    parser.add_argument("--decode-budget", type=float, default=DEFAULT_DECODE_LADDER.budget,
+                        help=f"每页渲染识别条码的时间预算(秒)，用完后跳过后面的各级，整页识别仍会尝试一次 "
+                             f"(默认: {DEFAULT_DECODE_LADDER.budget})")
+    parser.add_argument("--profiles", metavar="PATH",
+                        help="快递公司配置文件(JSON)：按页面自动选择条码区域、码制、格式校验和命名规则 (默认使用内置规则)")
+    parser.add_argument("--backend", choices=BARCODE_BACKENDS, default="pymupdf", help="条码识别渲染后端")
+    parser.add_argument("--poppler-path", help="poppler 可执行文件目录（仅 poppler 后端）")
+    parser.add_argument("--resume", action="store_true", help="断点续传：跳过处理清单中已完成的页面")
+    parser.add_argument("--manifest", help="处理清单路径 (默认: 输出文件夹/处理进度.jsonl)")
+    parser.add_argument("--metrics", help="各阶段耗时统计 JSON 路径 (默认: 输出文件夹/处理耗时.json；监控模式下每个文件处理完后更新)")
+    parser.add_argument("--prometheus", metavar="PATH", help="同时写出 Prometheus textfile collector 格式的耗时统计(.prom)")
+    parser.add_argument("--trace", metavar="PATH", help="记录每个文件、每页和每个阶段的时间段，写出 Chrome trace JSON (可在 Perfetto 中打开)")
+    parser.add_argument("--cache", help="结果缓存文件(SQLite)，默认位于用户缓存目录")
+    parser.add_argument("--no-cache", action="store_true", help="不使用结果缓存")
+    parser.add_argument("--roi-memory", metavar="PATH", nargs="?", const="",
+                        help="按版式学习条码位置，同一版式的后续页面先在学到的区域识别；"
+                             "PATH 为学习文件(JSON)，省略时位于用户缓存目录 (默认不学习，与图形界面一致)")
+    watch = parser.add_argument_group("监控模式")
+    watch.add_argument("--watch", metavar="DIR", help="监控输入目录，持续处理新投放的PDF（逐文件在当前进程中处理）")
+    watch.add_argument("--done-dir", help="处理完成的原文件移入的目录 (默认: 监控目录/已完成)")
+    watch.add_argument("--failed-dir", help="处理失败的原文件移入的目录 (默认: 监控目录/失败)")
+    watch.add_argument("--settle", type=float, default=1.0, help="文件大小保持不变多少秒后视为写入完成，默认 1")
+    watch.add_argument("--poll-interval", type=float, default=1.0, help="轮询间隔(秒)，默认 1")
+    watch.add_argument("--no-inotify", action="store_true", help="不使用 inotify，始终定时轮询")
+    watch.add_argument("--once", action="store_true", help="处理完监控目录中已有的文件后退出")
+    parser.add_argument("-q", "--quiet", action="store_true", help="只输出警告和错误")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.watch:
+        parser.error("需要指定输入文件或 --watch 目录")
+    # 处理引擎及其依赖在解析参数之后才导入，使 --help 等操作无需加载 PyMuPDF
+    from pdfclip.manifest import RunManifest, default_manifest_path
+    from pdfclip.metrics import StageMetrics
+    from pdfclip.report import open_report_sink
+    from pdfclip.resultcache import default_cache_path
+    from pdfclip.roimemory import default_memory_path
+    from pdfclip.trace import TraceWriter
+
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    exit_on_sigterm()
+
+    args.carrier_profiles = ()
+    if args.profiles:
+        from pdfclip.profiles import load_profiles
+
+        try:
+            args.carrier_profiles = load_profiles(args.profiles)
+        except (OSError, ValueError) as e:
+            logger.error(f"读取快递公司配置失败: {args.profiles} - {e}")
+            return 2
+        logger.info(f"快递公司配置: {', '.join(profile.name for profile in args.carrier_profiles)}")
+
+    args.roi_memory_path = None if args.roi_memory is None else (args.roi_memory or default_memory_path())
+
+    if args.watch:
+        return run_watch(args, None if args.no_cache else (args.cache or default_cache_path()))
+
+    file_paths = expand_inputs(args.inputs)
+    if not file_paths:
+        logger.error("没有找到需要处理的PDF文件")
+        return 2
+
+    enable_rename = not args.no_rename
+    report_file_path = args.report or os.path.join(args.output, "重命名报告.xlsx")
+    os.makedirs(args.output, exist_ok=True)
+    logger.info(f"共 {len(file_paths)} 个文件，输出目录: {args.output}，工作进程数: {args.workers}")
+
+    cache_path = None if args.no_cache else (args.cache or default_cache_path())
+    manifest = RunManifest(args.manifest or default_manifest_path(args.output), resume=args.resume)
+    completed = manifest.completed_pages() if args.resume else None
+    if completed:
+        logger.info(f"断点续传: 跳过 {sum(len(pages) for pages in completed.values())} 个已完成的页面")
+
+    report = None
+    if enable_rename:
+        try:
+            report = open_report_sink(report_file_path)
+        except (OSError, ValueError) as e:
+            logger.error(f"无法创建重命名报告: {e}")
+            return 2
+        # 续传时先写入之前运行中已完成(本次跳过)的页面
+        if completed:
+            report.write_rows(manifest.report_rows(completed))
+
+    metrics = StageMetrics()
+    try:
+        with manifest, (TraceWriter(args.trace) if args.trace else nullcontext()):
+            failed, processed, cache_hits, cache_misses = run_batch(args, file_paths, cache_path, completed,
+                                                                    manifest, report, metrics)
+    finally:
+        if report:
+            try:
+                report.close()
+            except Exception as e:
+                logger.error(f"保存重命名报告失败: {report_file_path} - {e}")
+                report = None
+        write_metrics(metrics, args.metrics or os.path.join(args.output, "处理耗时.json"), args.prometheus)
+    if report and report.rows:
+        logger.info(f"重命名报告已生成: {report_file_path}（{report.rows} 行）")
+
+    if args.trace:
+        logger.info(f"跟踪记录已写入: {args.trace}（可在 https://ui.perfetto.dev 中打开）")
+    if cache_path:
+        logger.info(f"结果缓存: 命中 {cache_hits} 次，未命中 {cache_misses} 次 ({cache_path})")
+    logger.info(f"处理完成，共处理 {processed} 页，失败 {failed} 项")
+    return 1 if failed else 0
+
+
+def write_metrics(metrics, json_path, prometheus_path=None):
+    """写出耗时统计并在日志中列出耗时最多的阶段"""
+    for line in metrics.summary_lines():
+        logger.info(f"耗时 {line}")
+    try:
+        metrics.write_json(json_path)
+        if prometheus_path:
+            metrics.write_prometheus(prometheus_path)
+    except OSError as e:
+        logger.error(f"无法写出耗时统计: {e}")
+
+
+def run_batch(args, file_paths, cache_path, completed, manifest, report=None, metrics=None):
+    """逐页处理并记录清单，重命名成功的页面逐行写入报告，返回 (失败数, 处理页数, 缓存命中, 缓存未命中)"""
+    from pdfclip.engine import process_files
+    from pdfclip.progress import ProgressTracker, count_pages
+    from pdfclip.report import report_row
+
+    enable_rename = not args.no_rename
+    processed = failed = cache_hits = cache_misses = 0
+    page_counts = count_pages(file_paths)
+    skipped = sum(len(completed.get(os.path.abspath(path), ())) for path in file_paths) if completed else 0
+    progress = ProgressTracker(sum(page_counts.values()) - skipped)
+    last_report = time.monotonic()
+    for result in process_files(file_paths, args.output, border_width=args.border_width,
+                                enable_rename=enable_rename, target_size_mm=args.size,
+                                workers=args.workers, barcode_backend=args.backend,
+                                poppler_path=args.poppler_path, cache_path=cache_path,
+                                completed=completed, progress=progress, metrics=metrics,
+                                crop_mode=args.crop_mode, page_mode=args.page_mode,
+                                text_layer=args.text_layer,
+                                decode_ladder=DecodeLadder(args.decode_ladder, args.decode_budget),
+                                carrier_profiles=args.carrier_profiles, roi_memory_path=args.roi_memory_path):
+        if time.monotonic() - last_report >= PROGRESS_LOG_INTERVAL:
+            last_report = time.monotonic()
+            logger.info(progress.snapshot().describe())
+        cache_hits += result.cache_hits
+        cache_misses += result.cache_misses
+        if result.error:
+            failed += 1
+            if result.page_number == 0:
+                logger.error(f"打开 {result.source_name} 时发生错误: {result.error}")
+            else:
+                logger.error(f"处理 {result.source_name} 第 {result.page_number} 页时发生错误: {result.error}")
+            continue
+        processed += 1
+        manifest.append(result)
+        if result.renamed:
+            if report:
+                report.write(report_row(result))
+            logger.info(f"{result.source_name} 第 {result.page_number} 页 -> {result.output_name}")
+        elif enable_rename:
+            reason = f"（{result.barcode_error}）" if result.barcode_error else ""
+            logger.warning(f"{result.source_name} 第 {result.page_number} 页未识别到有效条码{reason}: "
+                           f"{result.output_name}")
+        else:
+            logger.info(f"{result.source_name} 第 {result.page_number} 页 -> {result.output_name}")
+    return failed, processed, cache_hits, cache_misses
+
+
+def run_watch(args, cache_path):
+    """
+    监控模式，直到 Ctrl+C 或 --once 处理完已有文件
+
+    与批处理相同，每页写入处理清单和重命名报告(默认为 CSV，逐行写入磁盘)，--trace 时记录跟踪。
+    """
+    from pdfclip.manifest import RunManifest, default_manifest_path
+    from pdfclip.report import open_report_sink
+    from pdfclip.trace import TraceWriter
+    from pdfclip.watch import HotFolder
+
+    os.makedirs(args.output, exist_ok=True)
+    report = None
+    if not args.no_rename:
+        report_file_path = args.report or os.path.join(args.output, "重命名报告.csv")
+        try:
+            report = open_report_sink(report_file_path)
+        except (OSError, ValueError) as e:
+            logger.error(f"无法创建重命名报告: {e}")
+            return 2
+        if report_file_path.lower().endswith(".xlsx"):
+            logger.warning("监控模式下 .xlsx 报告在停止监控时才生成，建议使用 .csv")
+    manifest = RunManifest(args.manifest or default_manifest_path(args.output), resume=args.resume)
+
+    hot_folder = HotFolder(args.watch, args.output, done_dir=args.done_dir, failed_dir=args.failed_dir,
+                           settle_seconds=args.settle, poll_interval=args.poll_interval,
+                           use_inotify=not args.no_inotify, metrics_path=args.metrics,
+                           prometheus_path=args.prometheus, manifest=manifest, report=report,
+                           border_width=args.border_width, enable_rename=not args.no_rename,
+                           target_size_mm=args.size, workers=1, barcode_backend=args.backend,
+                           poppler_path=args.poppler_path, cache_path=cache_path, crop_mode=args.crop_mode,
+                           page_mode=args.page_mode, text_layer=args.text_layer,
+                           decode_ladder=DecodeLadder(args.decode_ladder, args.decode_budget),
+                           carrier_profiles=args.carrier_profiles, roi_memory_path=args.roi_memory_path)
+    try:
+        with manifest, (TraceWriter(args.trace) if args.trace else nullcontext()):
+            hot_folder.run(once=args.once)
+    except KeyboardInterrupt:
+        logger.info("监控已停止")
+    finally:
+        if report:
+            try:
+                report.close()
+            except Exception as e:
+                logger.error(f"保存重命名报告失败: {report.path} - {e}")
+    if report and report.rows:
+        logger.info(f"重命名报告: {report.path}（{report.rows} 行）")
+    if args.trace:
+        logger.info(f"跟踪记录已写入: {args.trace}（可在 https://ui.perfetto.dev 中打开）")
+    summary = hot_folder.metrics.summary()
+    logger.info(f"共处理 {summary['files']} 个文件 {summary['pages']} 页，失败 {summary['failed_files']} 个")
+    return 1 if summary["failed_files"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
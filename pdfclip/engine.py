@@ -0,0 +1,239 @@
+"""
+PDF 处理引擎：分页、裁剪、尺寸调整、条码识别与重命名报告
+
+本模块不依赖任何图形界面，可在无显示环境的服务器、多进程工作进程和命令行中使用。
+"""
+import logging
+import os
+
+import fitz  # PyMuPDF
+
+from pdfclip import trace
+from pdfclip.barcode import DEFAULT_DECODE_LADDER, decode_barcode_image, detect_barcode_in_document
+from pdfclip.metrics import stage
+from pdfclip.profiles import DEFAULT_PROFILE, select_profile
+from pdfclip.pipeline import (PageResult, crop_page_into, process_pdf_in_memory, resize_page_into,
+                              transform_page_into)
+from pdfclip.pool import process_pages_parallel
+from pdfclip.report import open_report_sink
+from pdfclip.roimemory import shared_memory
+
+logger = logging.getLogger("pdfclip")
+
+
+def split_pdf_to_single_pages(input_pdf_path, output_folder):
+    """将PDF拆分为单页文件"""
+    os.makedirs(output_folder, exist_ok=True)
+    with stage("open"):
+        pdf_document = fitz.open(input_pdf_path)
+    file_name = os.path.splitext(os.path.basename(input_pdf_path))[0]
+    page_files = []
+
+    for page_number in range(pdf_document.page_count):
+        # 创建单页PDF
+        with stage("split"):
+            single_page_pdf = fitz.open()
+            single_page_pdf.insert_pdf(pdf_document, from_page=page_number, to_page=page_number)
+
+        # 保存单页文件
+        output_path = os.path.join(output_folder, f"{file_name}_page{page_number+1}.pdf")
+        with stage("save"):
+            single_page_pdf.save(output_path)
+        single_page_pdf.close()
+        page_files.append(output_path)
+
+    pdf_document.close()
+    return page_files
+
+
+def auto_crop_pdf(input_pdf_path, output_pdf_path, border_width=5, coarse_factor=1, cache=None,
+                  crop_mode="raster"):
+    """自动裁剪单页PDF文件中的内容区域
+
+    coarse_factor 大于1时先在降采样图像上查找内容边界，再以全分辨率精确定位边缘；
+    cache 为结果缓存(ResultCache)时先查找已缓存的裁剪矩形；
+    crop_mode 为 "vector" 时由页面的绘制记录计算内容区域，不渲染页面(扫描页除外)
+    """
+    pdf_document = fitz.open(input_pdf_path)
+    output_pdf = fitz.open()
+
+    for page_number in range(pdf_document.page_count):
+        crop_page_into(output_pdf, pdf_document, page_number, border_width, coarse_factor, cache, crop_mode)
+
+    # 保存输出 PDF
+    with stage("save"):
+        output_pdf.save(output_pdf_path)
+    pdf_document.close()
+    output_pdf.close()
+
+
+def resize_pdf_page(input_pdf_path, output_pdf_path, target_width_mm=100, target_height_mm=150):
+    """
+    调整PDF页面大小为指定的毫米尺寸
+
+    Args:
+        input_pdf_path: 输入PDF文件路径
+        output_pdf_path: 输出PDF文件路径
+        target_width_mm: 目标宽度(毫米)
+        target_height_mm: 目标高度(毫米)
+    """
+    doc = fitz.open(input_pdf_path)
+    new_doc = fitz.open()
+
+    for page in doc:
+        resize_page_into(new_doc, doc, page.number, target_width_mm, target_height_mm)
+
+    # 保存调整后的PDF
+    with stage("save"):
+        new_doc.save(output_pdf_path)
+    doc.close()
+    new_doc.close()
+
+
+def crop_and_resize_pdf(input_pdf_path, output_pdf_path, border_width=5, target_width_mm=100,
+                        target_height_mm=150, coarse_factor=1, cache=None, crop_mode="raster", page_mode="xobject"):
+    """
+    自动裁剪并调整为指定的毫米尺寸，一次完成(等同于 auto_crop_pdf + resize_pdf_page，但不写中间文件、
+    不产生嵌套的 XObject)
+
+    page_mode 为 "cropbox" 时只改写页面框和坐标变换，不嵌入 XObject(见 pdfclip.pipeline.PAGE_MODES)
+    """
+    pdf_document = fitz.open(input_pdf_path)
+    output_pdf = fitz.open()
+
+    for page_number in range(pdf_document.page_count):
+        transform_page_into(output_pdf, pdf_document, page_number, border_width, coarse_factor, cache, crop_mode,
+                            (target_width_mm, target_height_mm), page_mode)
+
+    with stage("save"):
+        # cropbox 方式留下的原内容流需要清理
+        output_pdf.save(output_pdf_path, garbage=1 if page_mode == "cropbox" else 0)
+    pdf_document.close()
+    output_pdf.close()
+
+
+def detect_barcode_in_pdf(pdf_path, backend="pymupdf", poppler_path=None, dpi=200, cache=None,
+                          text_layer="off", decode_ladder=DEFAULT_DECODE_LADDER, carrier_profiles=()):
+    """检测PDF文件中的条码并返回条码内容，失败时返回 None
+
+    text_layer 不为 "off" 时先从文字层读取运单号，未找到时再渲染识别(见 pdfclip.textlayer)；
+    decode_ladder 为 pymupdf 后端渲染识别的阶梯(见 pdfclip.barcode.DecodeLadder)；
+    carrier_profiles 为快递公司配置，按第一页选择(见 pdfclip.profiles)
+    """
+    try:
+        if cache is not None or text_layer != "off" or carrier_profiles:
+            # 缓存键基于页面内容，命中时无需渲染；文字层提取和选择配置同样只需打开文档
+            with fitz.open(pdf_path) as doc:
+                profile = select_profile(doc[0], carrier_profiles) if doc.page_count else DEFAULT_PROFILE
+                return detect_barcode_in_document(doc, dpi=dpi, backend=backend,
+                                                  poppler_path=poppler_path, cache=cache, text_layer=text_layer,
+                                                  ladder=decode_ladder, profile=profile)
+
+        if backend == "poppler":
+            import numpy as np
+            from pdf2image import convert_from_path
+
+            # 将PDF页面转换为图像
+            with stage("render_barcode"):
+                images = convert_from_path(pdf_path, dpi=dpi, grayscale=True, poppler_path=poppler_path)
+            for img in images:
+                barcode_data = decode_barcode_image(np.array(img))
+                if barcode_data:
+                    return barcode_data
+            return None
+
+        # 使用 PyMuPDF 直接渲染，不启动 poppler 子进程
+        with fitz.open(pdf_path) as doc:
+            return detect_barcode_in_document(doc, dpi=dpi, ladder=decode_ladder)
+    except Exception as e:
+        logger.warning(f"条码检测失败: {os.path.basename(pdf_path)} - {str(e)}")
+        return None
+
+
+def generate_rename_report(report_data, report_file_path):
+    """一次性写出重命名报告(格式由扩展名决定)，逐页处理时应改用 open_report_sink 流式写入"""
+    try:
+        with open_report_sink(report_file_path) as sink:
+            sink.write_rows(report_data)
+        return True
+    except Exception as e:
+        logger.error(f"生成报告失败: {str(e)}")
+        return False
+
+
+def process_files(file_paths, output_folder, border_width=5, enable_rename=True,
+                  target_size_mm=(100, 150), workers=1, barcode_backend="pymupdf",
+                  poppler_path=None, cache_path=None, completed=None, progress=None, metrics=None,
+                  crop_mode="raster", page_mode="xobject", text_layer="off", decode_ladder=DEFAULT_DECODE_LADDER,
+                  carrier_profiles=(), roi_memory_path=None):
+    """
+    处理多个PDF文件的所有页面，按输入顺序逐个产出 PageResult
+
+    workers 大于 1 时使用多进程池，否则在当前进程中逐页处理。
+    cache_path 指定结果缓存文件(SQLite)时，未变化的页面直接使用缓存的裁剪与条码结果。
+    completed 为 {源文件绝对路径: {页码, ...}}(见 RunManifest.completed_pages)，其中的页面会被跳过。
+    文件无法打开时产出页码为 0 的 PageResult。
+    crop_mode 为裁剪区域的检测方式(见 pdfclip.vectorbbox.CROP_MODES)，page_mode 为输出页面的生成方式
+    (见 pdfclip.pipeline.PAGE_MODES)，text_layer 为运单号的文字层提取方式(见 pdfclip.textlayer.TEXT_LAYER_MODES)，
+    decode_ladder 为渲染识别条码的阶梯(见 pdfclip.barcode.DecodeLadder)，
+    carrier_profiles 为快递公司配置(见 pdfclip.profiles)，每页自动选择，都不匹配时使用默认配置。
+    roi_memory_path 指定学习文件(JSON)时按版式学习条码的实际位置，同一版式的后续页面先在学到的区域中识别；
+    多进程模式下由主进程根据各页结果学习，处理结束(或生成器关闭)时保存(见 pdfclip.roimemory)。
+    progress 为 ProgressTracker 时每产出一页调用一次 page_done()；
+    metrics 为 StageMetrics 时汇总每页各阶段的耗时(PageResult.timings)。
+    启用了跟踪(pdfclip.trace.TraceWriter)时记录每个文件、每页和每个阶段的时间段。
+    """
+    tracing = trace.tracing()
+    file_path = file_name = file_start = None
+    waiting_since = trace.now_us()
+    for result in _process_files(file_paths, output_folder, border_width, enable_rename, target_size_mm, workers,
+                                 barcode_backend, poppler_path, cache_path, completed, tracing, crop_mode,
+                                 page_mode, text_layer, decode_ladder, carrier_profiles, roi_memory_path):
+        if tracing:
+            trace.write_events(result.spans)
+            # 文件的时间段：从开始等待该文件的第一个结果到其最后一个结果处理完
+            if result.source_path != file_path:
+                if file_path:
+                    trace.emit("file", "file", file_start, waiting_since - file_start, {"file": file_name})
+                file_path, file_name, file_start = result.source_path, result.source_name, waiting_since
+        if progress and result.page_number:
+            progress.page_done()
+        if metrics:
+            metrics.observe_result(result)
+        yield result
+        waiting_since = trace.now_us()
+    if tracing and file_path:
+        trace.emit("file", "file", file_start, waiting_since - file_start, {"file": file_name})
+
+
+def _process_files(file_paths, output_folder, border_width, enable_rename, target_size_mm, workers,
+                   barcode_backend, poppler_path, cache_path, completed, tracing=False, crop_mode="raster",
+                   page_mode="xobject", text_layer="off", decode_ladder=DEFAULT_DECODE_LADDER, carrier_profiles=(),
+                   roi_memory_path=None):
+    options = dict(border_width=border_width, enable_rename=enable_rename,
+                   target_size_mm=tuple(target_size_mm), poppler_path=poppler_path,
+                   barcode_backend=barcode_backend, cache_path=cache_path, trace=tracing, crop_mode=crop_mode,
+                   page_mode=page_mode, text_layer=text_layer, decode_ladder=decode_ladder,
+                   carrier_profiles=tuple(carrier_profiles), roi_memory_path=roi_memory_path)
+    memory = shared_memory(roi_memory_path)
+    try:
+        if workers and workers > 1:
+            # 工作进程学到的位置只在各自进程内有效，主进程按结果学习后统一保存
+            for result in process_pages_parallel(file_paths, output_folder, workers=workers, completed=completed,
+                                                 **options):
+                if memory is not None:
+                    memory.learn(result.layout, result.barcode_region)
+                yield result
+            return
+
+        completed = completed or {}
+        for input_pdf_path in file_paths:
+            skip_pages = completed.get(os.path.abspath(input_pdf_path), ())
+            try:
+                yield from process_pdf_in_memory(input_pdf_path, output_folder, skip_pages=skip_pages, **options)
+            except Exception as e:
+                yield PageResult(source_name=os.path.basename(input_pdf_path), page_number=0, error=str(e),
+                                 source_path=input_pdf_path)
+    finally:
+        if memory is not None:
+            memory.save()
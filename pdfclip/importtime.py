@@ -0,0 +1,57 @@
+"""
+导入耗时报告：python -m pdfclip.importtime
+
+在全新的子进程中逐个导入模块，输出每个模块(含其依赖)的冷启动导入耗时，
+便于发现启动变慢的回归。需要逐个依赖的明细时可使用 python -X importtime。
+"""
+import argparse
+import subprocess
+import sys
+
+# 默认检查的模块：界面/命令行启动路径，以及各处理步骤才用到的重量级依赖
+DEFAULT_MODULES = (
+    "tkinter",
+    "pdfclip.cli",
+    "pdfclip.probe",
+    "pdfclip.engine",
+    "fitz",
+    "numpy",
+    "PIL.Image",
+    "cv2",
+    "pyzbar.pyzbar",
+    "pdf2image",
+    "openpyxl",
+)
+
+
+def measure_import(module):
+    """在全新的子进程中导入 module，返回累计耗时(毫秒)，导入失败时返回 None"""
+    code = ("import time; start = time.perf_counter(); "
+            f"import {module}; "
+            "print((time.perf_counter() - start) * 1000)")
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pdfclip.importtime", description="各模块的冷启动导入耗时")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="要测量的模块")
+    args = parser.parse_args(argv)
+
+    print(f"{'模块':<20}{'耗时(ms)':>10}")
+    total = 0.0
+    for module in args.modules:
+        elapsed = measure_import(module)
+        if elapsed is None:
+            print(f"{module:<20}{'导入失败':>10}")
+            continue
+        total += elapsed
+        print(f"{module:<20}{elapsed:>10.1f}")
+    print(f"{'合计':<20}{total:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
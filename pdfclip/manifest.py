@@ -0,0 +1,130 @@
+"""
+批处理断点清单
+
+每完成一页就向清单文件(JSON Lines)追加一条记录：源文件、页码、输出文件名和条码。
+程序崩溃或中途关闭后，以续传方式重新运行时会跳过已完成的页面，并根据清单重建重命名报告。
+"""
+import json
+import os
+from datetime import datetime
+
+from pdfclip.trace import span
+
+# 清单文件默认名称(位于输出文件夹中)
+MANIFEST_NAME = "处理进度.jsonl"
+
+
+def default_manifest_path(output_folder):
+    return os.path.join(output_folder, MANIFEST_NAME)
+
+
+def source_signature(path):
+    """源文件的大小与修改时间，用于判断续传时源文件是否已变化"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class RunManifest:
+    """
+    逐页追加的处理清单
+
+    Args:
+        path: 清单文件路径
+        resume: 为 True 时读取已有记录并继续追加；否则清空旧清单，开始新的一次运行
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.records = []
+        self._signatures = {}
+        if resume:
+            self.records = self._load()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def _load(self):
+        records = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue  # 崩溃时可能留下不完整的最后一行
+        except OSError:
+            pass
+        return records
+
+    def _signature(self, source_path):
+        if source_path not in self._signatures:
+            try:
+                self._signatures[source_path] = source_signature(source_path)
+            except OSError:
+                self._signatures[source_path] = None
+        return self._signatures[source_path]
+
+    def completed_pages(self):
+        """
+        返回已完成的页面 {源文件绝对路径: {页码, ...}}
+
+        只统计源文件未变化且输出文件仍然存在的记录。
+        """
+        completed = {}
+        for record in self.records:
+            source_path = record["source"]
+            if record.get("signature") != self._signature(source_path):
+                continue
+            if not os.path.exists(record["output"]):
+                continue
+            completed.setdefault(source_path, set()).add(record["page"])
+        return completed
+
+    def append(self, result):
+        """记录一个成功完成的页面(PageResult)，写入后立即刷新到磁盘"""
+        source_path = os.path.abspath(result.source_path)
+        record = {
+            "source": source_path,
+            "source_name": result.source_name,
+            "page": result.page_number,
+            "output": os.path.abspath(result.output_path),
+            "output_name": result.output_name,
+            "barcode": result.barcode,
+            "renamed": result.renamed,
+            "signature": self._signature(source_path),
+            "time": datetime.now().isoformat(timespec="seconds"),
+        }
+        with span("manifest", cat="io"):
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def report_rows(self, completed=None):
+        """
+        根据续传时读取的已有记录重建重命名报告(每个页面保留最后一条记录，按完成顺序)
+
+        completed 为 completed_pages() 的结果时，只返回其中(本次被跳过)的页面。
+        本次运行新追加的记录不驻留内存，应在处理时直接写入报告。
+        """
+        latest = {}
+        for record in self.records:
+            if completed is not None and record["page"] not in completed.get(record["source"], ()):
+                continue
+            latest.pop((record["source"], record["page"]), None)
+            latest[(record["source"], record["page"])] = record
+        return [{
+            "原始文件名": record["source_name"],
+            "页码": record["page"],
+            "新文件名": record["output_name"],
+            "条码内容": record["barcode"]
+        } for record in latest.values() if record["renamed"]]
+
+    def close(self):
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,233 @@
+"""
+分阶段耗时统计
+
+处理代码用 stage("阶段名") 包住各个步骤；只有在 record_timings() 范围内(即逐页处理时)才计时，
+每页的耗时记录在 PageResult.timings 中，多进程模式下随结果一起传回主进程。
+主进程用 StageMetrics 汇总为计数、总耗时和直方图，处理结束后写出 JSON，
+也可写出 Prometheus textfile collector 格式的文本文件。
+条码识别用 note_barcode_source() 记录条码由哪一级识别得到(PageResult.barcode_source)及其在页面上的位置，
+StageMetrics 按来源计数，可据此调整识别阶梯的顺序；位置用于学习各版式的条码区域(见 pdfclip.roimemory)。
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from pdfclip.trace import emit, now_us, tracing
+
+# 阶段名称(按处理顺序)
+STAGES = (
+    "open",            # 打开源文件
+    "split",           # 拆分单页(传统模式)
+    "render_crop",     # 为查找内容区域渲染页面
+    "bbox",            # 查找内容区域
+    "crop",            # 放置裁剪后的页面
+    "resize",          # 调整尺寸
+    "transform",       # 裁剪并缩放为最终页面(一次放置)
+    "profile",         # 选择快递公司配置
+    "layout",          # 计算版式指纹、查找学到的条码区域
+    "text_layer",      # 从文字层读取运单号
+    "decode_vector",   # 由矢量绘制命令还原条码(不渲染)
+    "decode_image",    # 识别条码区域内的嵌入图像(不渲染)
+    "render_barcode",  # 为识别条码渲染页面
+    "decode_roi",      # 条码区域识别
+    "decode_full",     # 整页识别(条码区域未识别到时)
+    "save",            # 保存输出文件
+    "rename",          # 按条码重命名
+)
+
+# 直方图上界(秒)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 当前正在记录的耗时字典 {阶段: 秒}
+_current_timings = contextvars.ContextVar("pdfclip_timings", default=None)
+
+# 当前页的识别结果信息，如 {"barcode_source": "roi_low", "barcode_region": (0.6, 0.1, 0.9, 0.3)}
+_current_outcome = contextvars.ContextVar("pdfclip_outcome", default=None)
+
+
+@contextmanager
+def record_timings(timings):
+    """在此范围内 stage() 的耗时累加到 timings 字典中"""
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def record_outcome(outcome):
+    """在此范围内 note_barcode_source() 记录的来源和位置写入 outcome 字典"""
+    token = _current_outcome.set(outcome)
+    try:
+        yield outcome
+    finally:
+        _current_outcome.reset(token)
+
+
+def note_barcode_source(source, region=None):
+    """
+    记录当前页的条码由哪一级识别得到(见 pdfclip.barcode.BARCODE_SOURCES)；不在 record_outcome() 范围内时忽略
+
+    region 为条码在页面上的位置 (左, 上, 右, 下)，页面宽高的比例；位置未知(缓存、文字层等)时为 None。
+    """
+    outcome = _current_outcome.get()
+    if outcome is not None:
+        outcome["barcode_source"] = source
+        outcome["barcode_region"] = region
+
+
+@contextmanager
+def stage(name):
+    """记录一个处理步骤的耗时；不在 record_timings() 范围内时不计时。启用跟踪时同时记录一个时间段"""
+    timings = _current_timings.get()
+    traced = tracing()
+    if timings is None and not traced:
+        yield
+        return
+    start_us = now_us() if traced else 0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+        if traced:
+            emit(name, "stage", start_us, int(elapsed * 1e6))
+
+
+class StageMetrics:
+    """汇总各阶段的调用次数、总耗时、最大耗时和直方图(线程安全)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}  # 阶段 -> {"count", "sum", "max", "buckets"}
+        self.barcode_sources = {}  # 条码来源 -> 页数
+        self.pages = 0
+        self.failed_pages = 0
+        self.started = time.time()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(BUCKETS)}
+            stats["count"] += 1
+            stats["sum"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    stats["buckets"][index] += 1
+                    break
+
+    def observe_timings(self, timings):
+        for name, seconds in timings.items():
+            self.observe(name, seconds)
+
+    def observe_result(self, result):
+        """汇总一个 PageResult(页码为 0 表示整个文件打开失败，不计入页数)"""
+        if result.page_number:
+            with self._lock:
+                self.pages += 1
+                if result.error:
+                    self.failed_pages += 1
+                if result.barcode_source:
+                    self.barcode_sources[result.barcode_source] = \
+                        self.barcode_sources.get(result.barcode_source, 0) + 1
+        self.observe_timings(result.timings)
+
+    def _ordered_names(self):
+        known = [name for name in STAGES if name in self.stages]
+        return known + sorted(name for name in self.stages if name not in STAGES)
+
+    def to_dict(self):
+        with self._lock:
+            elapsed = time.time() - self.started
+            stages = {}
+            for name in self._ordered_names():
+                stats = self.stages[name]
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(BUCKETS, stats["buckets"]):
+                    cumulative += count
+                    buckets[str(bound)] = cumulative
+                buckets["+Inf"] = stats["count"]
+                stages[name] = {
+                    "count": stats["count"],
+                    "total_seconds": round(stats["sum"], 6),
+                    "mean_seconds": round(stats["sum"] / stats["count"], 6),
+                    "max_seconds": round(stats["max"], 6),
+                    "buckets": buckets,
+                }
+            return {
+                "pages": self.pages,
+                "failed_pages": self.failed_pages,
+                "elapsed_seconds": round(elapsed, 3),
+                "pages_per_second": round(self.pages / elapsed, 3) if elapsed > 0 else None,
+                "stages": stages,
+                "barcode_sources": dict(sorted(self.barcode_sources.items(), key=lambda item: -item[1])),
+            }
+
+    def summary_lines(self, limit=5):
+        """按总耗时排序的前几个阶段，用于日志输出"""
+        stages = self.to_dict()["stages"]
+        ranked = sorted(stages.items(), key=lambda item: item[1]["total_seconds"], reverse=True)[:limit]
+        return [f"{name}: 共 {stats['total_seconds']:.2f} 秒，{stats['count']} 次，平均 {stats['mean_seconds'] * 1000:.1f} 毫秒"
+                for name, stats in ranked]
+
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path):
+        """
+        写出 Prometheus textfile collector 格式(node_exporter 读取 *.prom 文件)
+
+        _total 结尾的计数在本次运行(监控模式下为本进程)内只增不减，声明为 counter，新的运行从 0 开始，
+        rate()/increase() 会把归零当作计数器重置处理。
+        """
+        data = self.to_dict()
+        lines = [
+            "# HELP pdfclip_stage_seconds Time spent in each processing stage.",
+            "# TYPE pdfclip_stage_seconds histogram",
+        ]
+        for name, stats in data["stages"].items():
+            for bound, count in stats["buckets"].items():
+                lines.append(f'pdfclip_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'pdfclip_stage_seconds_sum{{stage="{name}"}} {stats["total_seconds"]}')
+            lines.append(f'pdfclip_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        lines += [
+            "# HELP pdfclip_barcode_source_total Pages whose barcode was found by each detection step.",
+            "# TYPE pdfclip_barcode_source_total counter",
+        ]
+        for source, count in data["barcode_sources"].items():
+            lines.append(f'pdfclip_barcode_source_total{{source="{source}"}} {count}')
+        lines += [
+            "# HELP pdfclip_pages_total Pages processed in the current run.",
+            "# TYPE pdfclip_pages_total counter",
+            f"pdfclip_pages_total {data['pages']}",
+            "# HELP pdfclip_pages_failed_total Pages that failed in the current run.",
+            "# TYPE pdfclip_pages_failed_total counter",
+            f"pdfclip_pages_failed_total {data['failed_pages']}",
+            "# HELP pdfclip_run_duration_seconds Wall-clock duration of the last run.",
+            "# TYPE pdfclip_run_duration_seconds gauge",
+            f"pdfclip_run_duration_seconds {data['elapsed_seconds']}",
+            "# HELP pdfclip_run_timestamp_seconds Unix time the last run finished.",
+            "# TYPE pdfclip_run_timestamp_seconds gauge",
+            f"pdfclip_run_timestamp_seconds {int(time.time())}",
+        ]
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+
+def _write_atomic(path, text):
+    """先写临时文件再替换，读取方不会看到写了一半的文件"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
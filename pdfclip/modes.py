@@ -0,0 +1,41 @@
+"""
+处理方式的名称与识别阶梯配置
+
+只包含常量，不导入任何依赖：命令行在解析参数时(--help、choices 校验)需要这些名称，
+PyMuPDF、NumPy 等重量级依赖在解析参数之后才导入。各处理模块从这里导入并沿用原来的名称。
+"""
+from typing import NamedTuple
+
+# 裁剪区域检测方式：raster 渲染页面后查找非白像素，vector 读取绘制记录(扫描页自动改用渲染)，见 pdfclip.vectorbbox
+CROP_MODES = ("raster", "vector")
+
+# 输出页面的生成方式(见 pdfclip.pipeline)：
+#   xobject  把源页面按裁剪区域一次性缩放放置到目标尺寸的新页面上(一层 Form XObject)
+#   cropbox  复制源页面，只改写页面框并在内容流前加坐标变换，不嵌入 XObject(文件更小、打印机栅格化更快)
+PAGE_MODES = ("xobject", "cropbox")
+
+# 文字层提取方式(见 pdfclip.textlayer)：
+#   off     只渲染识别条码
+#   first   先读取文字层，未找到有效运单号时再渲染识别
+#   verify  同 first，但对抽样的页面(约 1/VERIFY_SAMPLE_RATE)再渲染识别一次，结果不一致时以条码为准
+TEXT_LAYER_MODES = ("off", "first", "verify")
+
+# 条码识别后端
+BARCODE_BACKENDS = ("pymupdf", "poppler")
+
+# 渲染识别的阶梯(见 pdfclip.barcode)，由便宜到昂贵逐级尝试，识别到通过校验的条码即停止：
+#   roi_low      以 LOW_DPI 渲染条码区域(增强对比度)，大多数页面在这一级完成
+#   roi          以识别分辨率渲染条码区域(增强对比度)
+#   roi_binary   条码区域二值化：Otsu 全局阈值、自适应阈值(底色不均或褪色的扫描件)
+#   roi_rotated  条码区域按 ROTATION_ANGLES 旋转(zbar 只沿水平和竖直方向扫描，倾斜较大的条码需要转正)
+#   full         渲染整页识别(条码不在条码区域内)
+DECODE_RUNGS = ("roi_low", "roi", "roi_binary", "roi_rotated", "full")
+
+
+class DecodeLadder(NamedTuple):
+    """渲染识别的阶梯配置"""
+    rungs: tuple = DECODE_RUNGS  # 依次尝试的各级(DECODE_RUNGS 中的名称)
+    budget: float = 0.5          # 每页的时间预算(秒)：用完后跳过后面的各级，但第一级和 full 总会尝试
+
+
+DEFAULT_DECODE_LADDER = DecodeLadder()
@@ -0,0 +1,404 @@
+"""单次打开、全内存的逐页处理流水线
+
+源 PDF 只打开一次，裁剪、尺寸调整和条码识别都在内存中的页面上完成，
+每个输出页只写入磁盘一次，且直接使用条码文件名。
+"""
+import os
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Optional
+
+import fitz  # PyMuPDF
+
+from pdfclip.barcode import DEFAULT_DECODE_LADDER, detect_barcode_in_document, normalize_barcode, safe_file_stem
+from pdfclip.bbox import content_rect, min_pool
+from pdfclip.metrics import record_outcome, record_timings, stage
+from pdfclip.modes import PAGE_MODES  # noqa: F401  (输出页面的生成方式)
+from pdfclip.profiles import select_profile
+from pdfclip.raster import PageRaster
+from pdfclip.resultcache import MISS, make_key, page_fingerprint, shared_cache
+from pdfclip.roimemory import layout_signature, shared_memory
+from pdfclip.trace import collect_spans, span
+from pdfclip.vectorbbox import RASTER_FALLBACK, page_pixel_size, vector_content_rect
+
+# 毫米转换为点 (1mm = 2.83465点)
+MM_TO_PT = 2.83465
+
+
+
+@dataclass
+class PageResult:
+    """单页处理结果"""
+    source_name: str                    # 原始文件名
+    page_number: int                    # 页码(从1开始)
+    output_path: Optional[str] = None   # 输出文件路径
+    barcode: Optional[str] = None       # 处理后的条码内容
+    raw_barcode: Optional[str] = None   # 识别到的原始条码内容
+    barcode_source: Optional[str] = None  # 条码由哪一级识别得到(见 pdfclip.barcode.BARCODE_SOURCES)
+    barcode_region: Optional[tuple] = None  # 条码在输出页面上的位置(宽高的比例)，缓存和文字层的结果为 None
+    layout: Optional[tuple] = None      # 版式指纹(pdfclip.roimemory.LayoutSignature)，只在学习条码位置时计算
+    renamed: bool = False               # 是否以条码命名
+    error: Optional[str] = None         # 错误信息
+    barcode_error: Optional[str] = None  # 条码识别失败的原因(页面仍以默认文件名保存)
+    cache_hits: int = 0                 # 结果缓存命中次数
+    cache_misses: int = 0               # 结果缓存未命中次数
+    source_path: Optional[str] = None   # 原始文件路径
+    timings: dict = field(default_factory=dict)  # 各阶段耗时(秒)，见 pdfclip.metrics
+    spans: list = field(default_factory=list)    # 工作进程中记录的跟踪事件，见 pdfclip.trace
+
+    @property
+    def output_name(self):
+        return os.path.basename(self.output_path) if self.output_path else None
+
+
+def find_crop_rect(page, border_width=5, coarse_factor=1, crop_mode="raster", raster=None):
+    """
+    查找页面的内容区域
+
+    crop_mode 为 "vector" 时直接读取页面的绘制记录，不渲染页面；以扫描图像为主的页面仍渲染后查找。
+    raster 为该页的共享图像(PageRaster)时，不单独渲染，而是把共享图像降采样为 72 DPI 后查找。
+
+    Returns:
+        (裁剪矩形, (渲染宽度, 渲染高度))；页面全白或只有边框时裁剪矩形为 None
+    """
+    from pdfclip.raster import render_luminance
+
+    if crop_mode == "vector":
+        with stage("bbox"):
+            crop_rect = vector_content_rect(page, border_width)
+        if crop_rect is not RASTER_FALLBACK:
+            return crop_rect, page_pixel_size(page)
+
+    with stage("render_crop"):
+        if raster is not None and raster.enabled:
+            # 每个 72 DPI 像素取对应块的最小值，块内有任意墨迹即为非白
+            gray = min_pool(raster.gray, raster.dpi // 72)
+        else:
+            # 与原 auto_crop_pdf 相同的灰度(RGB 按 PIL 的公式换算)，不经过 PIL 图像副本
+            gray = render_luminance(page)
+    with stage("bbox"):
+        return content_rect(gray, border_width, coarse_factor), (gray.shape[1], gray.shape[0])
+
+
+def cached_crop_rect(page, border_width=5, coarse_factor=1, cache=None, crop_mode="raster", raster=None):
+    """先查询结果缓存，未命中时再查找内容区域"""
+    if cache is None:
+        return find_crop_rect(page, border_width, coarse_factor, crop_mode, raster)
+
+    # raster 模式沿用原有的缓存键；由共享图像降采样的结果在边缘可能相差 1 点，分开缓存
+    mode_params = {"crop_mode": crop_mode} if crop_mode != "raster" else {}
+    if raster is not None and raster.enabled:
+        mode_params["raster_dpi"] = raster.dpi
+    key = make_key("crop", page_fingerprint(page), border_width=border_width, **mode_params)
+    cached = cache.get(key)
+    if cached is not MISS:
+        rect = fitz.Rect(cached["rect"]) if cached["rect"] else None
+        return rect, tuple(cached["size"])
+
+    crop_rect, size = find_crop_rect(page, border_width, coarse_factor, crop_mode, raster)
+    cache.put(key, {"rect": list(crop_rect) if crop_rect else None, "size": list(size)})
+    return crop_rect, size
+
+
+def crop_page_into(target_doc, src_doc, page_number, border_width=5, coarse_factor=1, cache=None,
+                   crop_mode="raster"):
+    """裁剪 src_doc 的指定页，并将结果追加为 target_doc 的新页面"""
+    crop_rect, (width, height) = cached_crop_rect(src_doc[page_number], border_width, coarse_factor, cache,
+                                                  crop_mode)
+
+    with stage("crop"):
+        # 如果整个页面都是白色或只有边框，则不裁剪
+        if crop_rect is None:
+            new_page = target_doc.new_page(width=width, height=height)
+            show_page_region(new_page, new_page.rect, src_doc, page_number)
+            return new_page
+
+        new_page = target_doc.new_page(width=crop_rect.width, height=crop_rect.height)
+        show_page_region(new_page, new_page.rect, src_doc, page_number, clip=crop_rect)
+        return new_page
+
+
+def unrotated_clip(page, rect):
+    """将 page.rect 坐标(渲染方向)中的矩形转换为未旋转的页面坐标"""
+    if rect is None or not page.rotation:
+        return rect
+    clip = rect * page.derotation_matrix
+    clip.normalize()
+    return clip
+
+
+def show_page_region(target_page, rect, src_doc, page_number, clip=None):
+    """
+    把源页面的 clip 区域(page.rect 坐标，None 为整页)等比放置到 target_page 的 rect 中
+
+    show_pdf_page 对带旋转的源页面按未旋转的尺寸截取 clip，有 CropBox 偏移时还会错位，
+    所以先临时去掉源页面的旋转，以未旋转坐标截取后再按原角度旋转放置。
+    """
+    src_page = src_doc[page_number]
+    rotation = src_page.rotation
+    if not rotation:
+        target_page.show_pdf_page(rect, src_doc, page_number, clip=clip)
+        return
+    clip = unrotated_clip(src_page, clip if clip is not None else src_page.rect)
+    src_page.set_rotation(0)
+    try:
+        target_page.show_pdf_page(rect, src_doc, page_number, clip=clip, rotate=-rotation)
+    finally:
+        src_page.set_rotation(rotation)
+
+
+def fit_rect(width, height, target_width_pt, target_height_pt):
+    """将 width x height 的内容等比缩放并居中到目标尺寸，返回放置矩形"""
+    # 使用最小值确保内容完整显示（保持纵横比）
+    scale = min(target_width_pt / width, target_height_pt / height)
+    scaled_width = width * scale
+    scaled_height = height * scale
+
+    # 计算偏移量以居中内容
+    offset_x = (target_width_pt - scaled_width) / 2
+    offset_y = (target_height_pt - scaled_height) / 2
+    return fitz.Rect(offset_x, offset_y, offset_x + scaled_width, offset_y + scaled_height)
+
+
+def resize_page_into(target_doc, src_doc, page_number, target_width_mm=100, target_height_mm=150):
+    """将 src_doc 的指定页等比缩放并居中到指定毫米尺寸，追加为 target_doc 的新页面"""
+    target_width_pt = target_width_mm * MM_TO_PT
+    target_height_pt = target_height_mm * MM_TO_PT
+
+    original_bbox = src_doc[page_number].rect
+    new_page = target_doc.new_page(width=target_width_pt, height=target_height_pt)
+    target_rect = fit_rect(original_bbox.width, original_bbox.height, target_width_pt, target_height_pt)
+
+    with stage("resize"):
+        show_page_region(new_page, target_rect, src_doc, page_number)
+    return new_page
+
+
+def rewrite_page_boxes(page, clip, target_width_pt, target_height_pt):
+    """
+    不重新嵌入，直接把页面改写为目标尺寸
+
+    clip 为页面上要保留的区域(page.rect 坐标，None 表示整页)。页面的内容流合并为一个，
+    前后加入 "q 缩放平移 cm 裁剪路径 W n ... Q"，并把 MediaBox 设为目标尺寸、去掉 CropBox 等页面框。
+    页面的旋转保持不变；注释(链接等)无法随内容变换，与 xobject 方式一样被去掉。
+    原来的内容流不再被引用，保存时应使用 garbage 清理。
+    """
+    doc = page.parent
+    rotation = page.rotation
+    # 转换到未旋转的页面坐标，再转换到 PDF 坐标(原点在左下角)
+    clip = unrotated_clip(page, fitz.Rect(clip if clip is not None else page.rect))
+    origin_x = page.cropbox.x0
+    origin_y = page.mediabox.y1 - page.cropbox.y0
+    x0, x1 = origin_x + clip.x0, origin_x + clip.x1
+    y0, y1 = origin_y - clip.y1, origin_y - clip.y0
+
+    # 旋转 90/270 度的页面，未旋转时的宽高与显示时相反
+    if rotation % 180:
+        target_width_pt, target_height_pt = target_height_pt, target_width_pt
+    placed = fit_rect(x1 - x0, y1 - y0, target_width_pt, target_height_pt)
+    scale = placed.width / (x1 - x0)
+    # fit_rect 的上下留白对称，左下角坐标系中偏移量相同
+    e = placed.x0 - x0 * scale
+    f = placed.y0 - y0 * scale
+
+    prefix = (f"q {scale:.6f} 0 0 {scale:.6f} {e:.4f} {f:.4f} cm "
+              f"{x0:.4f} {y0:.4f} {x1 - x0:.4f} {y1 - y0:.4f} re W n\n").encode("ascii")
+    # 多个内容流按顺序连接(以空白分隔)与原页面等价
+    content = prefix + b"\n".join(doc.xref_stream(xref) for xref in page.get_contents()) + b"\nQ\n"
+    xref = doc.get_new_xref()
+    doc.update_object(xref, "<<>>")
+    doc.update_stream(xref, content)
+    doc.xref_set_key(page.xref, "Contents", f"{xref} 0 R")
+    doc.xref_set_key(page.xref, "Annots", "null")
+    page.set_mediabox(fitz.Rect(0, 0, target_width_pt, target_height_pt))
+    return page
+
+
+def transform_page_into(target_doc, src_doc, page_number, border_width=5, coarse_factor=1, cache=None,
+                        crop_mode="raster", target_size_mm=(100, 150), page_mode="xobject", raster=None):
+    """
+    裁剪并缩放 src_doc 的指定页，一次生成目标尺寸的页面追加到 target_doc
+
+    裁剪区域、缩放比例和居中偏移一起计算，只放置一次，不像 crop_page_into + resize_page_into
+    那样产生嵌套的 XObject 和重复的资源。page_mode 见 PAGE_MODES。
+    raster 为该页的共享图像(PageRaster)时用于查找裁剪区域，并记录页面的放置位置供条码识别换算坐标。
+    """
+    crop_rect, _ = cached_crop_rect(src_doc[page_number], border_width, coarse_factor, cache, crop_mode, raster)
+    target_width_pt = target_size_mm[0] * MM_TO_PT
+    target_height_pt = target_size_mm[1] * MM_TO_PT
+    # 如果整个页面都是白色或只有边框，则不裁剪
+    source = crop_rect if crop_rect is not None else src_doc[page_number].rect
+    # 两种方式的放置位置相同(cropbox 方式在未旋转坐标中计算，居中后结果一致)
+    placed = fit_rect(source.width, source.height, target_width_pt, target_height_pt)
+    if raster is not None:
+        raster.place(source, placed)
+
+    with stage("transform"):
+        if page_mode == "cropbox":
+            target_doc.insert_pdf(src_doc, from_page=page_number, to_page=page_number)
+            return rewrite_page_boxes(target_doc[-1], crop_rect, target_width_pt, target_height_pt)
+
+        new_page = target_doc.new_page(width=target_width_pt, height=target_height_pt)
+        show_page_region(new_page, placed, src_doc, page_number, clip=crop_rect)
+        return new_page
+
+
+def unique_output_path(output_folder, file_name):
+    """确保文件名不重复，重名时追加 _1、_2 ..."""
+    output_path = os.path.join(output_folder, file_name)
+    stem, ext = os.path.splitext(file_name)
+    counter = 1
+    while os.path.exists(output_path):
+        output_path = os.path.join(output_folder, f"{stem}_{counter}{ext}")
+        counter += 1
+    return output_path
+
+
+def barcode_output_path(output_folder, barcode):
+    """由条码生成不重复的输出路径，条码中没有可用字符时返回 None"""
+    safe_barcode = safe_file_stem(barcode)
+    if not safe_barcode:
+        return None
+    return unique_output_path(output_folder, f"{safe_barcode}.pdf")
+
+
+def rename_to_barcode(result, output_folder):
+    """将以默认文件名保存的页面按条码重命名（用于多进程模式下在主进程中按顺序重命名）"""
+    if result.error or result.renamed or not result.barcode:
+        return result
+    with record_timings(result.timings), stage("rename"):
+        new_path = barcode_output_path(output_folder, result.barcode)
+        if new_path:
+            os.rename(result.output_path, new_path)
+            result.output_path = new_path
+            result.renamed = True
+    return result
+
+
+def wants_shared_raster(result):
+    """
+    根据上一页的处理结果，判断同一文件的下一页是否共享渲染
+
+    共享图像是整页的高分辨率渲染，比 72 DPI 的裁剪渲染加上条码区域的渲染更耗时，
+    只有条码区域未识别到、还要渲染整页识别时才更快。同一文件中的面单版式通常相同，按上一页是否用到整页识别决定。
+    """
+    return "decode_full" in result.timings
+
+
+def process_page(src_doc, page_number, source_name, output_folder, border_width=5,
+                 enable_rename=True, target_size_mm=(100, 150), poppler_path=None,
+                 coarse_factor=1, barcode_backend="pymupdf", rename_output=True, cache_path=None, trace=False,
+                 crop_mode="raster", page_mode="xobject", text_layer="off", shared_raster=False,
+                 decode_ladder=DEFAULT_DECODE_LADDER, carrier_profiles=(), roi_memory_path=None):
+    """
+    在内存中完成单页的裁剪、尺寸调整与条码识别，并写出最终文件
+
+    rename_output 为 False 时只识别条码、仍以默认文件名保存，由调用方稍后调用 rename_to_barcode；
+    cache_path 指定结果缓存文件时，裁剪矩形和条码结果会先从缓存中查找；
+    crop_mode 为裁剪区域的检测方式(见 pdfclip.vectorbbox.CROP_MODES)，page_mode 为输出页面的生成方式(见 PAGE_MODES)；
+    text_layer 为运单号的文字层提取方式(见 pdfclip.textlayer.TEXT_LAYER_MODES)，
+    decode_ladder 为渲染识别条码的阶梯(见 pdfclip.barcode.DecodeLadder)；
+    carrier_profiles 为快递公司配置(pdfclip.profiles.load_profiles 的结果)，按源页面选择后决定条码区域、码制和命名规则；
+    roi_memory_path 指定学习文件时(见 pdfclip.roimemory)，先在同一版式学到的条码区域中识别，识别到后记录条码位置
+    (本进程内立即生效，文件由 engine.process_files 保存)；
+    shared_raster 为 True 时源页面最多渲染一次(pdfclip.raster.PageRaster)，裁剪和条码识别共用，本页处理完即释放
+    (是否值得共享见 wants_shared_raster)；
+    trace 为 True 时(多进程模式下的工作进程)把本页的跟踪事件收集到 result.spans。
+    """
+    base_name = os.path.splitext(source_name)[0]
+    result = PageResult(source_name=source_name, page_number=page_number + 1)
+    cache = shared_cache(cache_path)
+    memory = shared_memory(roi_memory_path)
+    hits_before, misses_before = (cache.hits, cache.misses) if cache else (0, 0)
+    final = fitz.open()
+    # 只有同一进程内用 PyMuPDF 识别条码时才共享；只裁剪时按 72 DPI 渲染更快
+    raster = None
+    if shared_raster and enable_rename and barcode_backend == "pymupdf":
+        raster = PageRaster(src_doc[page_number])
+    outcome = {}
+    try:
+        with collect_spans(result.spans) if trace else nullcontext(), record_timings(result.timings), \
+                record_outcome(outcome), span("page", cat="page", file=source_name, page=page_number + 1):
+            page = transform_page_into(final, src_doc, page_number, border_width, coarse_factor, cache, crop_mode,
+                                       target_size_mm, page_mode, raster)
+
+            result.output_path = os.path.join(output_folder, f"{base_name}_page{page_number + 1}_final.pdf")
+            if enable_rename:
+                with stage("profile"):
+                    profile = select_profile(src_doc[page_number], carrier_profiles)
+                learned = ()
+                if memory is not None:
+                    with stage("layout"):
+                        result.layout = layout_signature(page, src_doc[page_number])
+                        learned = memory.rois(result.layout)
+                # 识别失败(缺少 zbar、poppler 出错、图像数据损坏等)时仍以默认文件名保存裁剪后的页面
+                try:
+                    raw_barcode = detect_barcode_in_document(final, backend=barcode_backend,
+                                                             poppler_path=poppler_path, cache=cache,
+                                                             text_layer=text_layer, raster=raster,
+                                                             ladder=decode_ladder, profile=profile, rois=learned)
+                except Exception as e:
+                    result.barcode_error = str(e)
+                    raw_barcode = None
+                if raw_barcode:
+                    result.raw_barcode = raw_barcode
+                    result.barcode_source = outcome.get("barcode_source")
+                    result.barcode_region = outcome.get("barcode_region")
+                    if memory is not None:
+                        memory.learn(result.layout, result.barcode_region)
+                    result.barcode = normalize_barcode(raw_barcode, profile)
+                    new_path = barcode_output_path(output_folder, result.barcode) if rename_output else None
+                    if new_path:
+                        result.output_path = new_path
+                        result.renamed = True
+
+            with stage("save"):
+                # cropbox 方式留下的原内容流需要清理
+                final.save(result.output_path, garbage=1 if page_mode == "cropbox" else 0)
+    except Exception as e:
+        result.error = str(e)
+    finally:
+        final.close()
+        if raster is not None:
+            raster.release()
+        if cache:
+            result.cache_hits = cache.hits - hits_before
+            result.cache_misses = cache.misses - misses_before
+    return result
+
+
+def process_pdf_in_memory(input_pdf_path, output_folder, border_width=5, enable_rename=True,
+                          target_size_mm=(100, 150), poppler_path=None, coarse_factor=1,
+                          barcode_backend="pymupdf", cache_path=None, skip_pages=(), trace=False,
+                          crop_mode="raster", page_mode="xobject", text_layer="off",
+                          decode_ladder=DEFAULT_DECODE_LADDER, carrier_profiles=(), roi_memory_path=None):
+    """
+    逐页处理一个PDF文件，按页码顺序逐个产出 PageResult
+
+    源文件只打开一次；打开失败时抛出异常，单页失败记录在 PageResult.error 中。
+    skip_pages 中的页码(从1开始)视为已完成，直接跳过。
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    source_name = os.path.basename(input_pdf_path)
+    open_timings = {}
+    with record_timings(open_timings), stage("open"):
+        src_doc = fitz.open(input_pdf_path)
+    shared_raster = False
+    try:
+        for page_number in range(src_doc.page_count):
+            if page_number + 1 in skip_pages:
+                continue
+            result = process_page(src_doc, page_number, source_name, output_folder, border_width,
+                                  enable_rename, target_size_mm, poppler_path, coarse_factor, barcode_backend,
+                                  cache_path=cache_path, trace=trace, crop_mode=crop_mode,
+                                  page_mode=page_mode, text_layer=text_layer, shared_raster=shared_raster,
+                                  decode_ladder=decode_ladder, carrier_profiles=carrier_profiles,
+                                  roi_memory_path=roi_memory_path)
+            shared_raster = wants_shared_raster(result)
+            result.source_path = input_pdf_path
+            # 打开文件的耗时计入该文件的第一个结果
+            result.timings.update(open_timings)
+            open_timings = {}
+            yield result
+    finally:
+        src_doc.close()
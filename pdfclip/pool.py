@@ -0,0 +1,116 @@
+"""多进程逐页处理池
+
+按页把裁剪、尺寸调整和条码识别分发到多个工作进程，限制同时在途的任务数，
+并按输入顺序流式返回结果，使日志、重命名和报告的顺序保持确定。
+"""
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from pdfclip import default_workers
+from pdfclip.metrics import record_timings, stage
+from pdfclip.trace import collect_spans
+from pdfclip.pipeline import PageResult, process_page, rename_to_barcode, wants_shared_raster
+
+# 每个工作进程缓存当前打开的源文件，连续处理同一文件的页面时无需重复打开；
+# shared_raster 记录该文件的下一页是否共享渲染(见 pipeline.wants_shared_raster)
+_worker_document = {"path": None, "doc": None, "opened": False, "shared_raster": False}
+
+
+def _open_worker_document(input_pdf_path):
+    if _worker_document["path"] != input_pdf_path:
+        if _worker_document["doc"] is not None:
+            _worker_document["doc"].close()
+        _worker_document["doc"] = fitz.open(input_pdf_path)
+        _worker_document["path"] = input_pdf_path
+        _worker_document["opened"] = True
+        _worker_document["shared_raster"] = False
+    return _worker_document["doc"]
+
+
+def _run_page_task(input_pdf_path, page_number, output_folder, options):
+    """工作进程中处理单页；重命名留给主进程按顺序完成"""
+    open_timings = {}
+    open_spans = []
+    with collect_spans(open_spans), record_timings(open_timings), stage("open"):
+        src_doc = _open_worker_document(input_pdf_path)
+    result = process_page(src_doc, page_number, os.path.basename(input_pdf_path), output_folder,
+                          rename_output=False, shared_raster=_worker_document["shared_raster"], **options)
+    _worker_document["shared_raster"] = wants_shared_raster(result)
+    result.source_path = input_pdf_path
+    if _worker_document["opened"]:
+        # 工作进程首次打开该文件时，打开耗时计入这一页
+        result.timings.update(open_timings)
+        if options.get("trace"):
+            result.spans[:0] = open_spans
+        _worker_document["opened"] = False
+    return result
+
+
+def iter_page_tasks(file_paths, completed=None):
+    """
+    逐个文件统计页数并产出 (文件路径, 页索引)
+
+    completed 为 {源文件绝对路径: {页码, ...}}，其中的页面视为已完成而跳过。
+    文件无法打开时产出页码为 0 的 PageResult 表示整个文件失败。
+    """
+    completed = completed or {}
+    for input_pdf_path in file_paths:
+        try:
+            with fitz.open(input_pdf_path) as doc:
+                page_count = doc.page_count
+        except Exception as e:
+            yield PageResult(source_name=os.path.basename(input_pdf_path), page_number=0, error=str(e),
+                             source_path=input_pdf_path)
+            continue
+        skip_pages = completed.get(os.path.abspath(input_pdf_path), ())
+        for page_number in range(page_count):
+            if page_number + 1 not in skip_pages:
+                yield input_pdf_path, page_number
+
+
+def process_pages_parallel(file_paths, output_folder, workers=None, max_in_flight=None, completed=None,
+                           **options):
+    """
+    使用进程池处理多个PDF文件的所有页面，按输入顺序逐个产出 PageResult
+
+    Args:
+        file_paths: 输入PDF文件路径列表
+        output_folder: 输出文件夹
+        workers: 工作进程数，默认为 CPU 核心数
+        max_in_flight: 同时在途的最大页数，默认为工作进程数的 2 倍
+        completed: 已完成的页面 {源文件绝对路径: {页码, ...}}，续传时跳过
+        **options: 传给 process_page 的参数(border_width、enable_rename、target_size_mm 等)
+    """
+    workers = workers or default_workers()
+    max_in_flight = max_in_flight or workers * 2
+    enable_rename = options.get("enable_rename", True)
+    os.makedirs(output_folder, exist_ok=True)
+
+    def finish(item):
+        if not isinstance(item, Future):
+            return item
+        result = item.result()
+        if enable_rename:
+            try:
+                rename_to_barcode(result, output_folder)
+            except OSError as e:
+                result.error = f"重命名失败: {e}"
+        return result
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in iter_page_tasks(file_paths, completed):
+            if isinstance(task, PageResult):
+                pending.append(task)
+            else:
+                input_pdf_path, page_number = task
+                pending.append(executor.submit(_run_page_task, input_pdf_path, page_number,
+                                               output_folder, options))
+            # 在途任务达到上限时，先按顺序取回最早的结果
+            while len(pending) >= max_in_flight:
+                yield finish(pending.popleft())
+        while pending:
+            yield finish(pending.popleft())
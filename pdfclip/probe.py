@@ -0,0 +1,127 @@
+"""
+依赖检测及其结果的磁盘缓存
+
+检测结果按 Python 解释器与相关库的版本缓存在用户缓存目录中，
+环境不变时后续启动直接读取缓存，无需重新检测。
+"""
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+# 影响检测结果的发行包
+PROBE_PACKAGES = ("PyMuPDF", "pyzbar", "pdf2image", "numpy", "opencv-python", "opencv-python-headless")
+
+
+def cache_dir():
+    """用户缓存目录：Windows 下为 %LOCALAPPDATA%\\pdfclip，其他系统为 ~/.cache/pdfclip"""
+    base = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "pdfclip")
+
+
+def package_version(name):
+    """读取已安装发行包的版本(不导入该包)，未安装时返回 None"""
+    try:
+        from importlib import metadata
+        return metadata.version(name)
+    except Exception:
+        return None
+
+
+def environment_key(*extra):
+    """由解释器、库版本及额外参数计算缓存键"""
+    parts = [sys.executable, sys.version]
+    parts += [f"{name}={package_version(name)}" for name in PROBE_PACKAGES]
+    parts += [str(item) for item in extra]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _cache_file():
+    return os.path.join(cache_dir(), "probes.json")
+
+
+def _load_cache():
+    try:
+        with open(_cache_file(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(data):
+    path = _cache_file()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+    except OSError:
+        pass  # 缓存写入失败不影响检测结果
+
+
+def cached_probe(name, probe, *key_parts, refresh=False):
+    """
+    执行依赖检测，结果按环境缓存
+
+    Args:
+        name: 检测项名称
+        probe: 无参数的检测函数，返回可 JSON 序列化的结果
+        *key_parts: 影响检测结果的额外参数(如 poppler 路径)
+        refresh: 为 True 时忽略缓存重新检测
+    """
+    key = environment_key(*key_parts)
+    data = _load_cache()
+    entry = data.get(name)
+    if not refresh and entry and entry.get("key") == key:
+        return entry["result"]
+
+    result = probe()
+    data[name] = {"key": key, "result": result, "checked_at": datetime.now().isoformat(timespec="seconds")}
+    _save_cache(data)
+    return result
+
+
+def poppler_available(poppler_path=None):
+    """检查poppler是否可用（会启动 pdfinfo 子进程）"""
+    try:
+        import tempfile
+
+        import fitz  # PyMuPDF
+        from pdf2image import pdfinfo_from_path
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 创建一个空白PDF并尝试获取信息
+            temp_pdf = os.path.join(temp_dir, "probe.pdf")
+            doc = fitz.open()
+            doc.new_page(width=100, height=100)
+            doc.save(temp_pdf)
+            doc.close()
+            pdfinfo_from_path(temp_pdf, poppler_path=poppler_path)
+        return True
+    except Exception:
+        return False
+
+
+def zbar_available():
+    """检查条码识别库是否可用"""
+    try:
+        import numpy as np
+        from pyzbar.pyzbar import decode
+
+        decode(np.zeros((100, 100), dtype=np.uint8))  # 尝试解码空白图像
+        return True
+    except Exception:
+        return False
+
+
+def check_poppler(poppler_path=None, refresh=False):
+    """带缓存的 poppler 检测"""
+    return cached_probe("poppler", lambda: poppler_available(poppler_path), poppler_path, refresh=refresh)
+
+
+def check_zbar(refresh=False):
+    """带缓存的条码识别库检测"""
+    return cached_probe("zbar", zbar_available, refresh=refresh)
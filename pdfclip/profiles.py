@@ -0,0 +1,164 @@
+"""快递公司配置(承运商配置)
+
+每种面单的条码位置、码制和运单号格式不同。配置文件(JSON)中为每家快递公司定义：
+条码区域(可有多个，依次尝试)、允许的码制(传给 pyzbar 的 symbols，扫描时跳过其他码制)、
+条码内容的校验正则和命名规则。处理每页时按页面尺寸和文字层关键字选择配置，都不匹配时使用内置的默认配置。
+
+配置文件示例::
+
+    {
+      "profiles": [
+        {
+          "name": "顺丰",
+          "match": {"keywords": ["顺丰", "SF EXPRESS"], "page_size_mm": [100, 150]},
+          "rois": [[0.5, 0.05, 1.0, 0.35]],
+          "symbologies": ["CODE128"],
+          "pattern": "SF\\\\d{12,13}",
+          "normalize": []
+        }
+      ]
+    }
+
+normalize 为 [[正则, 替换模板], ...]，条码完整匹配第一个正则时按模板(re 的 \\1 等分组引用)生成用于命名的条码。
+"""
+import json
+import re
+from typing import NamedTuple, Optional
+
+# 默认的条码区域：快递面单的条码通常在右上角，(左, 上, 右, 下) 占页面宽高的比例
+DEFAULT_ROI = (0.6, 0.1, 0.95, 0.4)
+
+# 默认的命名规则：以 4 开头且超过 22 位的截取后 22 位，以 9 开头且超过 22 位的截取后 12 位
+DEFAULT_NORMALIZE = (
+    (r"(?s)(?=4).+(.{22})", r"\1"),
+    (r"(?s)(?=9).{11,}(.{12})", r"\1"),
+)
+
+# zbar 支持的码制名称(pyzbar.pyzbar.ZBarSymbol 的成员名)
+SYMBOLOGIES = ("EAN2", "EAN5", "EAN8", "UPCE", "ISBN10", "UPCA", "EAN13", "ISBN13", "COMPOSITE", "I25",
+               "DATABAR", "DATABAR_EXP", "CODABAR", "CODE39", "PDF417", "QRCODE", "SQCODE", "CODE93", "CODE128")
+
+# 页面尺寸匹配的默认容差(毫米)
+SIZE_TOLERANCE_MM = 3.0
+
+# 1 毫米对应的点数
+PT_PER_MM = 72 / 25.4
+
+
+class CarrierProfile(NamedTuple):
+    """一家快递公司的条码识别配置"""
+    name: str
+    rois: tuple = (DEFAULT_ROI,)          # 条码区域 ((左, 上, 右, 下), ...)，页面宽高的比例，依次尝试
+    symbologies: tuple = ()               # 允许的码制(pyzbar 名称，如 "CODE128")，空表示不限制
+    pattern: Optional[str] = None         # 条码内容必须完整匹配的正则，None 表示不校验
+    normalize: tuple = DEFAULT_NORMALIZE  # 命名规则 ((正则, 替换模板), ...)
+    keywords: tuple = ()                  # 匹配条件：页面文字中出现其中任意一个
+    page_size_mm: Optional[tuple] = None  # 匹配条件：源页面尺寸(宽, 高)，不区分横竖
+    size_tolerance_mm: float = SIZE_TOLERANCE_MM
+
+    def accepts(self, barcode):
+        """条码内容是否符合该配置的格式"""
+        return bool(barcode) and (self.pattern is None or _regex(self.pattern).fullmatch(barcode) is not None)
+
+    def normalized(self, barcode):
+        """按命名规则处理条码内容，返回用于命名的条码"""
+        for pattern, template in self.normalize:
+            match = _regex(pattern).fullmatch(barcode)
+            if match:
+                return match.expand(template)
+        return barcode
+
+
+DEFAULT_PROFILE = CarrierProfile("默认")
+
+_compiled = {}
+
+
+def _regex(pattern):
+    regex = _compiled.get(pattern)
+    if regex is None:
+        regex = _compiled[pattern] = re.compile(pattern)
+    return regex
+
+
+def _profile_from_dict(data):
+    """由配置文件中的一项生成 CarrierProfile，格式错误时抛出 ValueError"""
+    if not isinstance(data, dict) or not data.get("name"):
+        raise ValueError(f"配置缺少 name: {data!r}")
+    match = data.get("match", {})
+    rois = tuple(tuple(float(value) for value in roi) for roi in data.get("rois", [DEFAULT_ROI]))
+    for roi in rois:
+        if len(roi) != 4 or not (0 <= roi[0] < roi[2] <= 1 and 0 <= roi[1] < roi[3] <= 1):
+            raise ValueError(f"{data['name']}: 条码区域应为 [左, 上, 右, 下] 且在 0~1 之间: {list(roi)}")
+    for pattern in [data.get("pattern")] + [rule[0] for rule in data.get("normalize", [])]:
+        if pattern is not None:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"{data['name']}: 正则 {pattern!r} 无效: {e}")
+    symbologies = tuple(name.upper() for name in data.get("symbologies", ()))
+    unknown = [name for name in symbologies if name not in SYMBOLOGIES]
+    if unknown:
+        raise ValueError(f"{data['name']}: 未知的码制 {', '.join(unknown)}，可用: {', '.join(SYMBOLOGIES)}")
+    size = match.get("page_size_mm")
+    return CarrierProfile(
+        name=data["name"],
+        rois=rois or (DEFAULT_ROI,),
+        symbologies=symbologies,
+        pattern=data.get("pattern"),
+        normalize=tuple((pattern, template) for pattern, template in data.get("normalize", DEFAULT_NORMALIZE)),
+        keywords=tuple(match.get("keywords", ())),
+        page_size_mm=tuple(float(value) for value in size) if size else None,
+        size_tolerance_mm=float(match.get("size_tolerance_mm", SIZE_TOLERANCE_MM)),
+    )
+
+
+def load_profiles(path):
+    """
+    读取配置文件，返回 CarrierProfile 元组(按文件中的顺序匹配)
+
+    文件无法读取时抛出 OSError，格式错误时抛出 ValueError(json.JSONDecodeError 也是 ValueError)。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    items = data.get("profiles", []) if isinstance(data, dict) else data
+    return tuple(_profile_from_dict(item) for item in items)
+
+
+class PageSignature:
+    """选择配置用的页面特征：页面尺寸(毫米)和文字层内容，文字只在需要时提取"""
+
+    def __init__(self, page):
+        self.page = page
+        rect = page.rect
+        self.size_mm = (rect.width / PT_PER_MM, rect.height / PT_PER_MM)
+        self._text = None
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = self.page.get_text().upper()
+        return self._text
+
+    def matches(self, profile):
+        """页面是否符合配置的匹配条件(没有条件的配置匹配所有页面)"""
+        if profile.page_size_mm:
+            width, height = self.size_mm
+            tolerance = profile.size_tolerance_mm
+            if not any(abs(width - w) <= tolerance and abs(height - h) <= tolerance
+                       for w, h in (profile.page_size_mm, profile.page_size_mm[::-1])):
+                return False
+        if profile.keywords and not any(keyword.upper() in self.text for keyword in profile.keywords):
+            return False
+        return True
+
+
+def select_profile(page, profiles):
+    """为页面选择第一个匹配的配置；profiles 为空或都不匹配时返回 DEFAULT_PROFILE"""
+    if not profiles:
+        return DEFAULT_PROFILE
+    signature = PageSignature(page)
+    for profile in profiles:
+        if signature.matches(profile):
+            return profile
+    return DEFAULT_PROFILE
@@ -0,0 +1,116 @@
+"""
+处理进度、吞吐量与剩余时间估计
+
+开始处理前用 count_pages 快速统计总页数(只读取页面树，不解析页面内容)，
+处理过程中各阶段(分割/裁剪/条码)每完成一页调用 ProgressTracker.advance，
+界面或命令行定时读取 snapshot() 显示进度、页/秒和预计剩余时间。
+"""
+import collections
+import threading
+import time
+from dataclasses import dataclass, field
+
+# 处理阶段
+STAGES = ("split", "crop", "barcode")
+STAGE_NAMES = {"split": "分割", "crop": "裁剪", "barcode": "条码"}
+
+
+def count_pages(file_paths):
+    """统计每个PDF的页数，返回 {路径: 页数}；无法打开的文件计为 0 页"""
+    import fitz  # PyMuPDF
+
+    counts = {}
+    for path in file_paths:
+        try:
+            with fitz.open(path) as doc:
+                counts[path] = doc.page_count
+        except Exception:
+            counts[path] = 0
+    return counts
+
+
+@dataclass
+class ProgressSnapshot:
+    """某一时刻的进度"""
+    done_pages: int                 # 全部阶段都已完成的页数
+    total_pages: int
+    fraction: float                 # 总体完成比例(按各阶段工作量计算)
+    pages_per_second: float         # 最近一段时间的吞吐量
+    eta_seconds: float = None       # 预计剩余时间，无法估计时为 None
+    stages: dict = field(default_factory=dict)  # {阶段: (已完成, 总数)}
+
+    def describe(self):
+        """形如 "已完成 120/3000 页 (4.0%) · 55.1 页/秒 · 剩余约 00:52" 的说明文字"""
+        text = f"已完成 {self.done_pages}/{self.total_pages} 页 ({self.fraction:.1%})"
+        if self.pages_per_second:
+            text += f" · {self.pages_per_second:.1f} 页/秒"
+        if self.eta_seconds is not None:
+            text += f" · 剩余约 {format_duration(self.eta_seconds)}"
+        return text
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class ProgressTracker:
+    """
+    线程安全的分阶段进度统计
+
+    Args:
+        total_pages: 总页数
+        stages: 需要执行的阶段，默认分割、裁剪、条码
+        window_seconds: 计算吞吐量时使用的最近时间窗口
+    """
+
+    def __init__(self, total_pages, stages=STAGES, window_seconds=30.0):
+        self._lock = threading.Lock()
+        self.stages = tuple(stages)
+        self.totals = {stage: total_pages for stage in self.stages}
+        self.done = {stage: 0 for stage in self.stages}
+        self.window_seconds = window_seconds
+        self.started = time.monotonic()
+        self._samples = collections.deque([(self.started, 0)])  # (时间, 已完成工作量)
+
+    def set_total(self, stage, total):
+        """阶段开始时得知实际数量(如裁剪阶段的单页文件数)后修正总数"""
+        with self._lock:
+            self.totals[stage] = total
+
+    def advance(self, stage, count=1):
+        with self._lock:
+            self.done[stage] += count
+            now = time.monotonic()
+            self._samples.append((now, sum(self.done.values())))
+            # 只保留时间窗口内的样本(至少保留两个)
+            while len(self._samples) > 2 and now - self._samples[0][0] > self.window_seconds:
+                self._samples.popleft()
+
+    def page_done(self, count=1):
+        """一页的所有阶段都已完成(内存流水线模式下每产出一个结果调用一次)"""
+        for stage in self.stages:
+            self.advance(stage, count)
+
+    def snapshot(self):
+        with self._lock:
+            total_work = sum(self.totals.values())
+            done_work = sum(min(self.done[stage], self.totals[stage]) for stage in self.stages)
+            start_time, start_work = self._samples[0]
+            end_time, end_work = self._samples[-1]
+            stages = {stage: (self.done[stage], self.totals[stage]) for stage in self.stages}
+            final_stage = self.stages[-1]
+
+        elapsed = end_time - start_time
+        work_rate = (end_work - start_work) / elapsed if elapsed > 0 else 0.0
+        eta = (total_work - done_work) / work_rate if work_rate > 0 else None
+        return ProgressSnapshot(
+            done_pages=min(stages[final_stage][0], stages[final_stage][1]),
+            total_pages=stages[final_stage][1],
+            fraction=done_work / total_work if total_work else 1.0,
+            pages_per_second=work_rate / len(self.stages),
+            eta_seconds=eta,
+            stages=stages,
+        )
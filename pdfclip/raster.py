@@ -0,0 +1,149 @@
+"""页面栅格化辅助函数（PyMuPDF 渲染）
+
+条码识别的页面直接渲染为单通道灰度 Pixmap，中间不经过 RGB 和 PIL；只需要部分区域时用 clip 只渲染该区域。
+裁剪使用 render_luminance：渲染为 RGB 后按 PIL convert("L") 的公式换算，非白像素与原 auto_crop_pdf 完全一致
+(MuPDF 的灰度渲染对浅色墨迹的取整不同，近白的彩色细线在灰度图中可能是 254，裁剪区域随之变大)。
+PageRaster 让同一页只渲染一次，裁剪和条码识别都从这一份图像中取视图。
+"""
+import math
+
+import fitz  # PyMuPDF
+import numpy as np
+
+# 共享渲染的分辨率：72 的整数倍，查找内容区域时按 3x3 块降采样回 72 DPI 的像素网格
+SHARED_DPI = 216
+
+# 共享渲染的像素上限(约为 216 DPI 的 A3 页面)，更大的页面仍按需分别渲染，单页占用的内存有界
+MAX_SHARED_PIXELS = 12_000_000
+
+# PIL 由 RGB 转换为 L 的整数权重：L = (R*19595 + G*38470 + B*7471 + 0x8000) >> 16
+# 各项之和小于 2**24，用 float32 计算没有舍入误差，可以走矩阵乘法
+LUMA_WEIGHTS = np.array([19595, 38470, 7471], dtype=np.float32)
+
+
+def render_gray(page, dpi=72, clip=None):
+    """
+    将页面(或页面中的 clip 区域)直接渲染为单通道灰度图像
+
+    Returns:
+        形状为 (height, width) 的 uint8 数组
+    """
+    return gray_array(page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, clip=clip, alpha=False))
+
+
+def render_luminance(page, dpi=72, clip=None):
+    """
+    将页面渲染为 RGB，再按 PIL convert("L") 的公式换算为灰度(用于查找裁剪区域)
+
+    Returns:
+        形状为 (height, width) 的 uint8 数组
+    """
+    pix = page.get_pixmap(dpi=dpi, clip=clip, alpha=False)
+    # samples_mv 在 Pixmap 回收后失效，这里的视图只在本函数中使用，结果是新数组
+    rgb = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+    rgb = rgb[:, :pix.width * 3].reshape(pix.height, pix.width, 3)
+    return ((rgb @ LUMA_WEIGHTS + 0x8000) * (1 / 65536)).astype(np.uint8)
+
+
+def gray_array(pix):
+    """
+    单通道无 alpha 的 Pixmap 的像素数组(每行可能有填充，按 stride 取宽度)
+
+    数组持有 pix.samples 复制出的 bytes：samples_mv 的视图在 Pixmap 回收后失效，而返回的数组会比 Pixmap 存在得久。
+    """
+    pixels = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    return pixels[:, :pix.width]
+
+
+def image_gray(doc, xref):
+    """
+    按原始分辨率解码嵌入图像为灰度数组，不渲染页面
+
+    图像掩码(没有颜色空间)无法单独得到墨迹颜色，返回 None。
+    """
+    pix = fitz.Pixmap(doc, xref)
+    if pix.colorspace is None:
+        return None
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.colorspace.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    return gray_array(pix)
+
+
+def relative_rect(rect, roi):
+    """按比例 (左, 上, 右, 下) 计算 rect 中的子区域"""
+    return fitz.Rect(rect.x0 + rect.width * roi[0], rect.y0 + rect.height * roi[1],
+                     rect.x0 + rect.width * roi[2], rect.y0 + rect.height * roi[3])
+
+
+def rect_ratio(rect, sub):
+    """relative_rect 的逆运算：sub 在 rect 中的比例 (左, 上, 右, 下)，限制在 0~1 之间"""
+    width, height = rect.width or 1, rect.height or 1
+    return (min(max((sub.x0 - rect.x0) / width, 0.0), 1.0), min(max((sub.y0 - rect.y0) / height, 0.0), 1.0),
+            min(max((sub.x1 - rect.x0) / width, 0.0), 1.0), min(max((sub.y1 - rect.y0) / height, 0.0), 1.0))
+
+
+class PageRaster:
+    """
+    源页面只渲染一次的灰度图像，供裁剪和条码识别共用
+
+    首次访问 gray 时才渲染，矢量裁剪、缓存命中或不需要渲染识别的页面不会渲染；
+    页面处理完后调用 release() 释放图像。条码在输出页面上识别，place() 记录源页面区域在输出页面上的
+    放置位置，region() 把输出页面上的区域换算回源页面坐标，直接截取图像视图，不再渲染输出页面。
+    """
+
+    def __init__(self, page, dpi=SHARED_DPI):
+        self.page = page
+        self.dpi = dpi
+        self.source = None  # 源页面上被放置的区域(page.rect 坐标)
+        self.placed = None  # 该区域在输出页面上的矩形
+        self._gray = None
+
+    @property
+    def enabled(self):
+        """页面是否足够小，可以共享渲染"""
+        rect = self.page.rect
+        return rect.width * rect.height * (self.dpi / 72) ** 2 <= MAX_SHARED_PIXELS
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = render_gray(self.page, self.dpi)
+        return self._gray
+
+    def place(self, source, placed):
+        """记录源页面的 source 区域被等比放置到输出页面的 placed 矩形"""
+        self.source, self.placed = fitz.Rect(source), fitz.Rect(placed)
+
+    def placed_dpi(self):
+        """图像相对输出页面的等效分辨率(输出页面放大时低于 dpi)"""
+        return self.dpi * self.source.width / self.placed.width
+
+    def region(self, clip):
+        """
+        输出页面上 clip 区域对应的图像视图
+
+        Returns:
+            uint8 数组视图；尚未放置或 clip 与放置区域不相交时返回 None
+        """
+        if self.placed is None:
+            return None
+        clip = fitz.Rect(clip) & self.placed
+        if clip.is_empty:
+            return None
+        # 输出页面坐标 -> 源页面坐标 -> 图像像素
+        zoom = self.source.width / self.placed.width * self.dpi / 72
+        origin_x = self.source.x0 * self.dpi / 72
+        origin_y = self.source.y0 * self.dpi / 72
+        gray = self.gray
+        x0 = max(0, math.floor(origin_x + (clip.x0 - self.placed.x0) * zoom))
+        y0 = max(0, math.floor(origin_y + (clip.y0 - self.placed.y0) * zoom))
+        x1 = min(gray.shape[1], math.ceil(origin_x + (clip.x1 - self.placed.x0) * zoom))
+        y1 = min(gray.shape[0], math.ceil(origin_y + (clip.y1 - self.placed.y0) * zoom))
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return gray[y0:y1, x0:x1]
+
+    def release(self):
+        self._gray = None
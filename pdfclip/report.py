@@ -0,0 +1,123 @@
+"""
+重命名报告的流式写入
+
+每处理完一页就追加一行，不在内存中保留整份报告。格式由文件扩展名决定：
+.csv 和 .jsonl 每行写入后立即刷新，程序中途退出时已完成的行仍在磁盘上；
+.xlsx 使用 openpyxl 的只写模式，行数据不驻留内存，但文件只在 close() 时一次性生成：调用方须在 finally 中关闭，
+进程被强制结束时 .xlsx 报告不会生成(已完成的页面仍在处理清单中，以续传方式重新运行即可重建报告)。
+长时间运行(监控模式等)应使用 .csv。
+"""
+import csv
+import json
+import os
+
+from pdfclip.trace import span
+
+# 重命名报告的列
+REPORT_COLUMNS = ["原始文件名", "页码", "新文件名", "条码内容"]
+
+
+def report_row(result):
+    """由 PageResult 生成一行重命名报告"""
+    return {
+        "原始文件名": result.source_name,
+        "页码": result.page_number,
+        "新文件名": result.output_name,
+        "条码内容": result.barcode
+    }
+
+
+class ReportSink:
+    """报告写入器基类，子类实现 _open / _write / _close"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        # 确保报告目录存在；已存在的旧报告被覆盖
+        report_dir = os.path.dirname(path)
+        if report_dir:
+            os.makedirs(report_dir, exist_ok=True)
+        self._open()
+
+    def write(self, row):
+        """追加一行(以 REPORT_COLUMNS 为键的字典)"""
+        with span("report", cat="io"):
+            self._write([row.get(column) for column in REPORT_COLUMNS])
+        self.rows += 1
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def close(self):
+        self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvReportSink(ReportSink):
+    def _open(self):
+        # utf-8-sig 使 Excel 能正确识别中文
+        self._file = open(self.path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(REPORT_COLUMNS)
+
+    def _write(self, values):
+        self._writer.writerow(values)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonlReportSink(ReportSink):
+    def _open(self):
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def _write(self, values):
+        self._file.write(json.dumps(dict(zip(REPORT_COLUMNS, values)), ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class XlsxReportSink(ReportSink):
+    """Excel 报告：逐行写入临时数据，close() 时才生成 .xlsx 文件"""
+
+    def _open(self):
+        from openpyxl import Workbook
+
+        # 先删除旧报告，被其他程序占用时在开始处理前就能发现
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet()
+        self._sheet.append(REPORT_COLUMNS)
+
+    def _write(self, values):
+        self._sheet.append(values)
+
+    def _close(self):
+        if self._workbook is not None:
+            self._workbook.save(self.path)
+            self._workbook = None
+
+
+REPORT_FORMATS = {
+    ".csv": CsvReportSink,
+    ".jsonl": JsonlReportSink,
+    ".xlsx": XlsxReportSink,
+}
+
+
+def open_report_sink(path):
+    """根据扩展名打开报告写入器，不支持的扩展名抛出 ValueError"""
+    sink_class = REPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if sink_class is None:
+        raise ValueError(f"不支持的报告格式: {path}（支持 {', '.join(REPORT_FORMATS)}）")
+    return sink_class(path)
@@ -0,0 +1,195 @@
+"""
+按内容寻址的结果缓存（SQLite）
+
+以页面内容(内容流、引用的 XObject/图像流、字体及其嵌入的字体程序、页面尺寸与旋转)的哈希加上处理参数作为键，
+缓存裁剪矩形和条码识别结果。批处理中途失败后重新运行时，未变化的页面无需再次渲染和识别。
+缓存按条目数做 LRU 淘汰，并统计命中/未命中次数；未找到结果(None)的条目只保留 NEGATIVE_TTL 秒。
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# 默认最多保留的条目数
+DEFAULT_MAX_ENTRIES = 500000
+
+# 未命中时 get() 的返回值（与缓存的 None 结果区分）
+MISS = object()
+
+# None 结果(如未识别到条码)的有效期(秒)：环境变化(安装了缺少的依赖、更新了识别库)后不会一直沿用
+NEGATIVE_TTL = 3600
+
+# 字体描述中指向嵌入字体程序的键
+FONT_FILE_KEYS = ("FontFile", "FontFile2", "FontFile3")
+
+_REFERENCE = re.compile(r"(\d+) 0 R")
+
+
+def default_cache_path():
+    """默认缓存文件：用户缓存目录下的 results.sqlite"""
+    from pdfclip.probe import cache_dir
+
+    return os.path.join(cache_dir(), "results.sqlite")
+
+
+def page_fingerprint(page):
+    """
+    计算页面内容的哈希
+
+    包含页面尺寸、旋转、内容流，页面(含嵌套 Form XObject)引用的 XObject 和图像的原始流，
+    以及字体字典和嵌入的字体程序(内容流不变、只替换了字体时结果也可能不同)。
+    """
+    doc = page.parent
+    digest = hashlib.sha256()
+    digest.update(repr((tuple(page.rect), page.rotation)).encode("ascii"))
+    digest.update(page.read_contents())
+
+    xrefs = [item[0] for item in page.get_xobjects()]
+    xrefs += [item[0] for item in page.get_images(full=True)]
+    for xref in sorted(set(xrefs)):
+        if xref > 0 and doc.xref_is_stream(xref):
+            digest.update(doc.xref_stream_raw(xref) or b"")
+    for font in page.get_fonts(full=True):
+        digest.update(repr(font[1:5]).encode("utf-8", "replace"))
+        if font[0] > 0:
+            for xref in _font_xrefs(doc, font[0]):
+                digest.update(doc.xref_object(xref, compressed=True).encode("utf-8", "replace"))
+                if doc.xref_is_stream(xref):
+                    digest.update(doc.xref_stream_raw(xref) or b"")
+    return digest.hexdigest()
+
+
+def _references(doc, xref, key):
+    """xref 对象中 key 对应的间接引用(数组中的各个引用也展开)"""
+    kind, value = doc.xref_get_key(xref, key)
+    if kind == "xref" and key == "DescendantFonts":
+        # 间接引用的数组
+        value = doc.xref_object(int(value.split()[0]), compressed=True)
+    elif kind not in ("xref", "array"):
+        return []
+    return [int(number) for number in _REFERENCE.findall(value)]
+
+
+def _font_xrefs(doc, xref):
+    """字体字典、Type0 字体的后代字体、字体描述及嵌入的字体程序流的 xref"""
+    result = [xref]
+    for font in [xref] + _references(doc, xref, "DescendantFonts"):
+        if font != xref:
+            result.append(font)
+        for descriptor in _references(doc, font, "FontDescriptor"):
+            result.append(descriptor)
+            for key in FONT_FILE_KEYS:
+                result.extend(_references(doc, descriptor, key))
+    return result
+
+
+def document_fingerprint(doc):
+    """计算整个文档(所有页面)内容的哈希"""
+    digest = hashlib.sha256()
+    for page in doc:
+        digest.update(page_fingerprint(page).encode("ascii"))
+    return digest.hexdigest()
+
+
+def make_key(kind, fingerprint, **params):
+    """由结果类型、页面哈希和处理参数生成缓存键"""
+    param_text = ",".join(f"{name}={params[name]!r}" for name in sorted(params))
+    return f"{kind}|{fingerprint}|{param_text}"
+
+
+class ResultCache:
+    """SQLite 结果缓存，可在多个进程间共享同一个文件"""
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL, expires REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used)")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(results)")]
+        if "expires" not in columns:
+            # 旧版本的缓存文件：其中的 None 结果没有有效期，直接删除
+            self._conn.execute("ALTER TABLE results ADD COLUMN expires REAL")
+            self._conn.execute("DELETE FROM results WHERE value = 'null'")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key):
+        """返回缓存的结果，未命中(或已过期)时返回 MISS"""
+        with self._lock:
+            now = time.time()
+            row = self._conn.execute("SELECT value, expires FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] is not None and row[1] < now:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return MISS
+            self.hits += 1
+            self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+
+    def put(self, key, value):
+        """
+        写入结果(需可 JSON 序列化)，超过容量时淘汰最久未使用的条目
+
+        None 结果在 NEGATIVE_TTL 秒后过期，其他结果只按 LRU 淘汰。
+        """
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, last_used, expires) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now + NEGATIVE_TTL if value is None else None))
+            # 替换已有条目时计数会略微偏大，淘汰前会重新统计
+            self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        # 一次淘汰 10%，避免每次写入都触发删除
+        self._count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = self._count - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY last_used LIMIT ?)", (excess,))
+            self._count -= excess
+
+    def stats(self):
+        """返回命中/未命中统计"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": self._count,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# 每个进程按路径复用同一个缓存连接（多进程工作进程中各自打开）
+_shared_caches = {}
+
+
+def shared_cache(path):
+    """返回当前进程中 path 对应的共享缓存实例，path 为空时返回 None"""
+    if not path:
+        return None
+    cache = _shared_caches.get(path)
+    if cache is None:
+        cache = _shared_caches[path] = ResultCache(path)
+    return cache
@@ -0,0 +1,256 @@
+"""学习各版式面单上条码的实际位置
+
+同一批面单大多出自同一模板，条码总在页面上的同一位置，但配置的条码区域(profiles 的 rois)未必覆盖它，
+未命中时要逐级识别到整页。这里按版式指纹(源页面尺寸 + 页面内容的粗略分布)记录每次识别到条码的位置
+(输出页面宽高的比例)，同一版式的后续页面先在学到的区域中识别，大多在低分辨率的小区域内完成。
+
+学到的区域保存在 JSON 文件中(默认在用户缓存目录)，下次运行继续使用。同一版式每学习一次，其原有区域的权重
+乘以 LEARN_DECAY；权重还按上次更新后经过的时间衰减(半衰期 HALF_LIFE_DAYS)，模板更换后旧位置逐渐失效。
+多进程模式下工作进程只在内存中学习，由主进程根据各页结果(PageResult.layout、barcode_region)学习并保存。
+"""
+import json
+import os
+import time
+from typing import NamedTuple
+
+from pdfclip.probe import cache_dir
+from pdfclip.profiles import PT_PER_MM
+
+# 内容分布的网格：页面分为 GRID x GRID 格，记录哪些格中有对象(按对象中心)
+GRID = 8
+
+# 面积超过页面该比例的对象(背景、边框)不计入内容分布
+LARGE_OBJECT_FRACTION = 0.25
+
+# 内容分布不同的格数不超过有内容格数的 1/SIGNATURE_TOLERANCE 时视为同一版式(可变的地址、商品行等)
+SIGNATURE_TOLERANCE = 8
+
+# 每个版式最多使用的学习区域数(按权重)
+MAX_LEARNED_ROIS = 3
+
+# 权重低于该值的区域不再使用，低于 PRUNE_WEIGHT 时删除
+MIN_WEIGHT = 0.25
+PRUNE_WEIGHT = 0.05
+
+# 同一版式每学习一次，原有区域的权重乘以该系数
+LEARN_DECAY = 0.9
+
+# 文件中权重的半衰期(天)
+HALF_LIFE_DAYS = 14
+
+# 新位置有该比例以上的面积落在已有区域扩展后的识别区域内(即该区域能识别到)时合并为一个区域
+MERGE_OVERLAP = 0.5
+
+# 条码位置向四周扩展的比例(条码宽高的比例，至少 MIN_MARGIN 个页面宽高比例)，留出静区并容忍位置偏差
+ROI_MARGIN = 0.25
+MIN_MARGIN = 0.02
+
+# 文件中最多保存的版式数，超出时删除最久未更新的
+MAX_LAYOUTS = 1000
+
+
+class LayoutSignature(NamedTuple):
+    """版式指纹"""
+    size_mm: tuple  # 源页面尺寸(宽, 高)，取整到毫米
+    cells: int      # 内容分布：第 行 x GRID + 列 位表示该格中有对象
+
+    @property
+    def key(self):
+        return f"{self.size_mm[0]}x{self.size_mm[1]}:{self.cells:016x}"
+
+    @classmethod
+    def from_key(cls, key):
+        size, cells = key.split(":")
+        width, height = size.split("x")
+        return cls((int(width), int(height)), int(cells, 16))
+
+    def distance(self, other):
+        """内容分布不同的格数；页面尺寸不同时为 None"""
+        if self.size_mm != other.size_mm:
+            return None
+        return bin(self.cells ^ other.cells).count("1")
+
+
+def layout_signature(page, source_page=None):
+    """
+    计算 page 的版式指纹
+
+    内容分布取自页面的绘制记录(不渲染)，文字、路径和图像按外接矩形的中心计入所在的格；
+    页面尺寸取自 source_page(生成 page 的源页面，输出页面的尺寸都相同)，None 时取 page 本身。
+    扫描页只有一幅整页图像，指纹只能区分页面尺寸。
+    """
+    rect = page.rect
+    width, height = rect.width or 1, rect.height or 1
+    large = width * height * LARGE_OBJECT_FRACTION
+    # bbox log 使用未旋转的页面坐标，按旋转矩阵转换到渲染时的方向
+    a, b, c, d, e, f = page.rotation_matrix
+    cells = 0
+    for kind, (x0, y0, x1, y1) in page.get_bboxlog():
+        if not kind.startswith(("fill-", "stroke-")) or (x1 - x0) * (y1 - y0) > large:
+            continue
+        x, y = (x0 + x1) / 2, (y0 + y1) / 2
+        column = min(max(int((a * x + c * y + e) / width * GRID), 0), GRID - 1)
+        row = min(max(int((b * x + d * y + f) / height * GRID), 0), GRID - 1)
+        cells |= 1 << (row * GRID + column)
+    size = (source_page or page).rect
+    return LayoutSignature((round(size.width / PT_PER_MM), round(size.height / PT_PER_MM)), cells)
+
+
+def _age_factor(updated, now):
+    """按经过的时间(半衰期 HALF_LIFE_DAYS)衰减的系数"""
+    return 0.5 ** (max(now - updated, 0.0) / 86400 / HALF_LIFE_DAYS)
+
+
+def _overlap(region, roi):
+    """region 落在 roi 内的面积比例"""
+    width = min(region[2], roi[2]) - max(region[0], roi[0])
+    height = min(region[3], roi[3]) - max(region[1], roi[1])
+    area = (region[2] - region[0]) * (region[3] - region[1])
+    if width <= 0 or height <= 0 or area <= 0:
+        return 0.0
+    return width * height / area
+
+
+def expand_region(region):
+    """把条码位置扩展为识别用的条码区域 (左, 上, 右, 下)"""
+    x0, y0, x1, y1 = region
+    margin_x = max((x1 - x0) * ROI_MARGIN, MIN_MARGIN)
+    margin_y = max((y1 - y0) * ROI_MARGIN, MIN_MARGIN)
+    return (round(max(x0 - margin_x, 0.0), 4), round(max(y0 - margin_y, 0.0), 4),
+            round(min(x1 + margin_x, 1.0), 4), round(min(y1 + margin_y, 1.0), 4))
+
+
+class RoiMemory:
+    """
+    各版式学到的条码位置
+
+    layouts 为 {版式指纹键: {"updated": 时间戳, "regions": [[左, 上, 右, 下, 权重], ...]}}，
+    位置为条码本身(未扩展)的比例坐标，权重为 updated 时的值，使用时再按经过的时间衰减。
+    path 为 None 时只在内存中学习。
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.layouts = {}
+        self.dirty = False
+        self._matches = {}  # 版式指纹键 -> 最接近的已学习版式的键(新增版式时清空)
+        if path:
+            self.layouts = self._read()
+
+    def _read(self):
+        """读取文件，去掉衰减后已失效的版式；文件不存在或损坏时返回空字典"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                layouts = json.load(f)["layouts"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+        now = time.time()
+        result = {}
+        for key, entry in layouts.items():
+            try:
+                LayoutSignature.from_key(key)
+                updated = float(entry["updated"])
+                regions = [[float(value) for value in region[:5]] for region in entry["regions"]]
+            except (ValueError, KeyError, TypeError, IndexError):
+                continue
+            if regions and all(len(region) == 5 for region in regions) and \
+                    max(region[4] for region in regions) * _age_factor(updated, now) >= PRUNE_WEIGHT:
+                result[key] = {"updated": updated, "regions": regions}
+        return result
+
+    def _match(self, signature):
+        """与 signature 相同或最接近的已学习版式的键，没有时返回 None"""
+        key = signature.key
+        if key in self.layouts:
+            return key
+        if key not in self._matches:
+            best = None
+            for other_key in self.layouts:
+                other = LayoutSignature.from_key(other_key)
+                distance = signature.distance(other)
+                limit = max(bin(signature.cells).count("1"), bin(other.cells).count("1")) // SIGNATURE_TOLERANCE
+                if distance is not None and distance <= limit and (best is None or distance < best[0]):
+                    best = (distance, other_key)
+            self._matches[key] = best[1] if best else None
+        return self._matches[key]
+
+    def rois(self, signature):
+        """该版式学到的条码区域(已扩展的比例坐标，按权重从高到低)，没有时返回空元组"""
+        key = self._match(signature)
+        if key is None:
+            return ()
+        entry = self.layouts[key]
+        factor = _age_factor(entry["updated"], time.time())
+        regions = sorted((region for region in entry["regions"] if region[4] * factor >= MIN_WEIGHT),
+                         key=lambda region: -region[4])
+        return tuple(expand_region(region[:4]) for region in regions[:MAX_LEARNED_ROIS])
+
+    def learn(self, signature, region):
+        """记录该版式上识别到的条码位置 region (左, 上, 右, 下)，页面宽高的比例"""
+        if signature is None or region is None or region[0] >= region[2] or region[1] >= region[3]:
+            return
+        key = self._match(signature) or signature.key
+        now = time.time()
+        if key not in self.layouts:
+            self._matches.clear()
+        entry = self.layouts.setdefault(key, {"updated": now, "regions": []})
+        factor = _age_factor(entry["updated"], now) * LEARN_DECAY
+        entry["updated"] = now
+        regions = entry["regions"]
+        for existing in regions:
+            existing[4] *= factor
+        best = max(regions, key=lambda existing: _overlap(region, expand_region(existing[:4])), default=None)
+        if best is not None and _overlap(region, expand_region(best[:4])) >= MERGE_OVERLAP:
+            # 按权重平均，单次的偏差不会让区域漂移
+            weight = best[4]
+            for index in range(4):
+                best[index] = (best[index] * weight + region[index]) / (weight + 1)
+            best[4] = weight + 1
+        else:
+            regions.append([float(value) for value in region] + [1.0])
+        entry["regions"] = [existing for existing in regions if existing[4] >= PRUNE_WEIGHT]
+        self.dirty = True
+
+    def save(self):
+        """
+        写入文件(原子替换)；文件中其他进程保存的、本实例没有的版式保留
+
+        写入失败不影响处理结果。
+        """
+        if not self.path or not self.dirty:
+            return
+        layouts = self._read()
+        layouts.update(self.layouts)
+        if len(layouts) > MAX_LAYOUTS:
+            newest = sorted(layouts, key=lambda key: layouts[key]["updated"], reverse=True)[:MAX_LAYOUTS]
+            layouts = {key: layouts[key] for key in newest}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"layouts": {key: {"updated": entry["updated"],
+                                             "regions": [[round(value, 4) for value in region]
+                                                         for region in entry["regions"]]}
+                                       for key, entry in layouts.items()}}, f)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+        except OSError:
+            pass
+
+
+def default_memory_path():
+    """默认的学习文件：用户缓存目录下的 learned_rois.json"""
+    return os.path.join(cache_dir(), "learned_rois.json")
+
+
+_shared_memories = {}
+
+
+def shared_memory(path):
+    """返回当前进程中 path 对应的共享 RoiMemory 实例，path 为空时返回 None"""
+    if not path:
+        return None
+    memory = _shared_memories.get(path)
+    if memory is None:
+        memory = _shared_memories[path] = RoiMemory(path)
+    return memory
@@ -0,0 +1,174 @@
+"""
+处理过程的跟踪记录(Chrome trace-event 格式)
+
+启用后为每个文件、每页和每个处理阶段记录一个时间段(含进程号和线程号)，
+写出的 JSON 可直接在 Perfetto (ui.perfetto.dev) 或 chrome://tracing 中打开，
+用于查找界面阻塞、异常慢的页面、磁盘写入和 poppler 子进程等造成的停顿。
+
+主进程中 TraceWriter 处于启用状态时，事件直接流式写入文件，每 FLUSH_EVENTS 个事件或每 FLUSH_INTERVAL 秒
+刷新到磁盘，进程退出时(atexit)自动结束文件；程序被强制结束时最多丢失最后一批事件，已写入的部分仍可打开。
+多进程模式下工作进程把本页的事件收集到 PageResult.spans，由主进程写入。
+未启用时 span() 不做任何记录。
+"""
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 当前进程中启用的 TraceWriter
+_writer = None
+
+# 写入多少个事件或经过多少秒后刷新到磁盘
+FLUSH_EVENTS = 256
+FLUSH_INTERVAL = 1.0
+
+# 工作进程中正在收集事件的列表
+_pending_spans = contextvars.ContextVar("pdfclip_spans", default=None)
+
+
+def now_us():
+    """墙上时间(微秒)，各进程之间可比较"""
+    return time.time_ns() // 1000
+
+
+def _active_writer():
+    # fork 出的工作进程会继承父进程的 _writer，只在创建它的进程中使用
+    if _writer is not None and _writer.pid == os.getpid():
+        return _writer
+    return None
+
+
+def tracing():
+    """当前是否在记录跟踪事件"""
+    return _active_writer() is not None or _pending_spans.get() is not None
+
+
+def emit(name, cat, start_us, duration_us, args=None):
+    """记录一个已结束的时间段"""
+    event = {"name": name, "cat": cat, "ph": "X", "ts": start_us, "dur": duration_us,
+             "pid": os.getpid(), "tid": threading.get_native_id()}
+    if args:
+        event["args"] = args
+    writer = _active_writer()
+    if writer is not None:
+        writer.write(event)
+        return
+    spans = _pending_spans.get()
+    if spans is not None:
+        spans.append(event)
+
+
+@contextmanager
+def span(name, cat="stage", **args):
+    """记录 with 语句块的时间段；未启用跟踪时不做任何事"""
+    if not tracing():
+        yield
+        return
+    start_us = now_us()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        emit(name, cat, start_us, int((time.perf_counter() - start) * 1e6), args)
+
+
+@contextmanager
+def collect_spans(spans):
+    """在此范围内(且本进程没有 TraceWriter 时)把事件追加到 spans 列表"""
+    token = _pending_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _pending_spans.reset(token)
+
+
+def write_events(events):
+    """将工作进程传回的事件写入当前的 TraceWriter"""
+    writer = _active_writer()
+    if writer is not None:
+        for event in events:
+            writer.write(event)
+
+
+class TraceWriter:
+    """
+    流式写出 Chrome trace-event JSON 数组
+
+    activate() 在本进程中启用跟踪，close() 关闭文件并停用；也可作为上下文管理器使用。
+    事件按 FLUSH_EVENTS / FLUSH_INTERVAL 分批刷新到磁盘；没有调用 close() 时在进程退出时(atexit)关闭。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self.events = 0
+        self._unflushed = 0
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._named = set()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        # JSON 数组格式允许省略结尾的 "]"，中途退出时文件仍可加载
+        self._file.write("[\n")
+        self._write_metadata(self.pid, None, "process_name", "pdfclip 主进程")
+        atexit.register(self.close)
+
+    def _write_line(self, event):
+        self._file.write(json.dumps(event, ensure_ascii=False) + ",\n")
+
+    def _write_metadata(self, pid, tid, kind, name):
+        event = {"name": kind, "ph": "M", "pid": pid, "args": {"name": name}}
+        if tid is not None:
+            event["tid"] = tid
+        self._write_line(event)
+
+    def write(self, event):
+        with self._lock:
+            if self._file.closed:
+                return
+            if event["pid"] not in self._named:
+                self._named.add(event["pid"])
+                if event["pid"] != self.pid:
+                    self._write_metadata(event["pid"], None, "process_name", f"工作进程 {event['pid']}")
+            thread_key = (event["pid"], event["tid"])
+            if thread_key not in self._named and event["pid"] == self.pid:
+                self._named.add(thread_key)
+                thread_name = threading.current_thread().name if event["tid"] == threading.get_native_id() else None
+                if thread_name:
+                    self._write_metadata(event["pid"], event["tid"], "thread_name", thread_name)
+            self._write_line(event)
+            self.events += 1
+            self._unflushed += 1
+            if self._unflushed >= FLUSH_EVENTS or time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+                self._file.flush()
+                self._unflushed = 0
+                self._flushed_at = time.monotonic()
+
+    def activate(self):
+        global _writer
+        _writer = self
+        return self
+
+    def close(self):
+        global _writer
+        if self.pid != os.getpid():
+            return  # fork 出的子进程继承的副本，文件由主进程结束
+        if _writer is self:
+            _writer = None
+        atexit.unregister(self.close)
+        with self._lock:
+            if not self._file.closed:
+                # 以一个空的元数据事件结尾，避免最后一个逗号
+                self._file.write(json.dumps({"name": "trace_end", "ph": "M", "pid": self.pid, "args": {}}) + "\n]\n")
+                self._file.close()
+
+    def __enter__(self):
+        return self.activate()
+
+    def __exit__(self, *exc):
+        self.close()
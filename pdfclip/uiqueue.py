@@ -0,0 +1,115 @@
+"""
+工作线程到界面主线程的事件队列
+
+工作线程只向队列投递日志、状态和对话框事件，不直接操作 Tk 控件；
+界面主线程用 start_pump 定时取出一批事件并合并更新：日志一次插入，状态和进度只保留最后一条，
+相同类型的连续对话框合并为一个。界面刷新频率有上限，待显示的日志条数也有上限，
+因此界面开销不随处理页数增长，工作线程也不会等待界面。本模块不依赖 tkinter。
+"""
+import collections
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class UIBatch:
+    """一次取出的界面事件"""
+    logs: list = field(default_factory=list)      # [(文本, 级别), ...]
+    dropped: int = 0                               # 超出上限被省略的日志条数
+    status: Optional[str] = None                   # 最新的状态文本
+    progress: object = None                        # 最新的进度(ProgressSnapshot)
+    actions: list = field(default_factory=list)   # 按投递顺序执行的对话框与回调
+
+    def __bool__(self):
+        return bool(self.logs or self.dropped or self.status is not None or self.progress is not None
+                    or self.actions)
+
+
+class UIEventQueue:
+    """
+    线程安全的界面事件队列
+
+    Args:
+        max_pending_logs: 两次刷新之间最多保留的日志条数，超出时丢弃较早的日志并计数
+    """
+
+    def __init__(self, max_pending_logs=500):
+        self._lock = threading.Lock()
+        self._logs = collections.deque(maxlen=max_pending_logs)
+        self._dropped = 0
+        self._status = None
+        self._progress = None
+        self._actions = []
+
+    def log(self, text, level="info"):
+        with self._lock:
+            if len(self._logs) == self._logs.maxlen:
+                self._dropped += 1
+            self._logs.append((text, level))
+
+    def status(self, text):
+        with self._lock:
+            self._status = text
+
+    def progress(self, snapshot):
+        with self._lock:
+            self._progress = snapshot
+
+    def dialog(self, kind, title, message):
+        """kind 为 tkinter.messagebox 的函数名，如 showinfo / showwarning / showerror"""
+        with self._lock:
+            last = self._actions[-1] if self._actions else None
+            if last and last[0] == "dialog" and last[1] == kind and last[2] == title:
+                last[4] += 1  # 合并相同类型的连续对话框
+            else:
+                self._actions.append(["dialog", kind, title, message, 0])
+
+    def call(self, func, *args):
+        """在界面主线程中执行 func(*args)"""
+        with self._lock:
+            self._actions.append(["call", func, args])
+
+    def drain(self):
+        with self._lock:
+            batch = UIBatch(list(self._logs), self._dropped, self._status, self._progress, self._actions)
+            self._logs.clear()
+            self._dropped = 0
+            self._status = None
+            self._progress = None
+            self._actions = []
+        return batch
+
+
+def run_actions(batch, messagebox):
+    """按顺序显示对话框、执行回调"""
+    for action in batch.actions:
+        if action[0] == "call":
+            action[1](*action[2])
+            continue
+        _, kind, title, message, merged = action
+        if merged:
+            message = f"{message}\n\n另有 {merged} 条同类消息，详见处理日志"
+        getattr(messagebox, kind)(title, message)
+
+
+def trim_text(widget, max_lines):
+    """只保留文本控件中最后 max_lines 行，避免日志控件无限增长"""
+    line_count = int(widget.index("end-1c").split(".")[0])
+    if line_count > max_lines:
+        widget.delete("1.0", f"{line_count - max_lines + 1}.0")
+
+
+def start_pump(widget, events, apply_batch, max_updates_per_second=10):
+    """在界面主线程中定时取出事件并调用 apply_batch(batch)，每秒最多刷新 max_updates_per_second 次"""
+    interval = max(1, int(1000 / max_updates_per_second))
+
+    def tick():
+        batch = events.drain()
+        try:
+            if batch:
+                apply_batch(batch)
+        finally:
+            widget.after(interval, tick)
+
+    widget.after(interval, tick)
@@ -0,0 +1,367 @@
+"""矢量条码识别(不栅格化)
+
+快递系统导出的面单大多把一维条码画成一组填充矩形。直接读取页面的绘制命令(PyMuPDF get_cdrawings)，
+找出成组的平行细条，还原条/空宽度序列后按 Code128、Code39、EAN-13/EAN-8 解码并检查校验位。
+条码区域(快递公司配置的 rois)中的条码优先；找不到或无法解码时返回 None，由调用方改为图像识别。
+"""
+from pdfclip.metrics import stage
+
+# Code128 符号 0-106 的条/空宽度(模块数)，106 为终止符(含结尾的 2 模块终止条)
+CODE128_PATTERNS = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312", "132212", "221213",
+    "221312", "231212", "112232", "122132", "122231", "113222", "123122", "123221", "223211", "221132",
+    "221231", "213212", "223112", "312131", "311222", "321122", "321221", "312212", "322112", "322211",
+    "212123", "212321", "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121", "313121", "211331",
+    "231131", "213113", "213311", "213131", "311123", "311321", "331121", "312113", "312311", "332111",
+    "314111", "221411", "431111", "111224", "111422", "121124", "121421", "141122", "141221", "112214",
+    "112412", "122114", "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112", "421211", "212141",
+    "214121", "412121", "111143", "111341", "131141", "114113", "114311", "411113", "411311", "113141",
+    "114131", "311141", "411131", "211412", "211214", "211232", "2331112",
+)
+CODE128_START_A, CODE128_START_B, CODE128_START_C, CODE128_STOP = 103, 104, 105, 106
+_CODE128_INDEX = {pattern: code for code, pattern in enumerate(CODE128_PATTERNS[:CODE128_STOP])}
+
+# Code39 字符的条/空宽窄(w 宽，n 窄)，每个字符 9 个单元，其中 3 个为宽
+CODE39_PATTERNS = {
+    "0": "nnnwwnwnn", "1": "wnnwnnnnw", "2": "nnwwnnnnw", "3": "wnwwnnnnn", "4": "nnnwwnnnw",
+    "5": "wnnwwnnnn", "6": "nnwwwnnnn", "7": "nnnwnnwnw", "8": "wnnwnnwnn", "9": "nnwwnnwnn",
+    "A": "wnnnnwnnw", "B": "nnwnnwnnw", "C": "wnwnnwnnn", "D": "nnnnwwnnw", "E": "wnnnwwnnn",
+    "F": "nnwnwwnnn", "G": "nnnnnwwnw", "H": "wnnnnwwnn", "I": "nnwnnwwnn", "J": "nnnnwwwnn",
+    "K": "wnnnnnnww", "L": "nnwnnnnww", "M": "wnwnnnnwn", "N": "nnnnwnnww", "O": "wnnnwnnwn",
+    "P": "nnwnwnnwn", "Q": "nnnnnnwww", "R": "wnnnnnwwn", "S": "nnwnnnwwn", "T": "nnnnwnwwn",
+    "U": "wwnnnnnnw", "V": "nwwnnnnnw", "W": "wwwnnnnnn", "X": "nwnnwnnnw", "Y": "wwnnwnnnn",
+    "Z": "nwwnwnnnn", "-": "nwnnnnwnw", ".": "wwnnnnwnn", " ": "nwwnnnwnn", "$": "nwnwnwnnn",
+    "/": "nwnwnnnwn", "+": "nwnnnwnwn", "%": "nnnwnwnwn", "*": "nwnnwnwnn",
+}
+_CODE39_INDEX = {pattern: char for char, pattern in CODE39_PATTERNS.items()}
+
+# EAN 左侧奇数(L)编码的模块序列；右侧(R)与 L 的条空宽度相同，偶数(G)编码为 L 的宽度倒序
+_EAN_L_MODULES = ("0001101", "0011001", "0010011", "0111101", "0100011",
+                  "0110001", "0101111", "0111011", "0110111", "0001011")
+# EAN-13 第一位数字由左侧 6 位的奇偶编码组合决定
+_EAN13_PARITY = ("LLLLLL", "LLGLGG", "LLGGLG", "LLGGGL", "LGLLGG",
+                 "LGGLLG", "LGGGLL", "LGLGLG", "LGLGGL", "LGGLGL")
+
+# 条的长边至少为宽度的倍数，且不短于该长度(点)
+MIN_BAR_ASPECT = 2.0
+MIN_BAR_LENGTH = 4.0
+
+# 相邻两条的间隔超过最窄条宽度的该倍数时视为另一个条码(静区至少 10 个模块)
+MAX_GAP_FACTOR = 6.0
+
+
+def _run_widths(modules):
+    """模块序列("0001101")转为条空宽度元组，如 (3, 2, 1, 1)"""
+    widths = []
+    for index, module in enumerate(modules):
+        if index and module == modules[index - 1]:
+            widths[-1] += 1
+        else:
+            widths.append(1)
+    return tuple(widths)
+
+
+_EAN_L = {_run_widths(modules): digit for digit, modules in enumerate(_EAN_L_MODULES)}
+_EAN_G = {widths[::-1]: digit for widths, digit in _EAN_L.items()}
+
+
+def _modules(widths, total_modules):
+    """按总模块数把宽度换算为整数模块数"""
+    module = sum(widths) / total_modules
+    return [round(width / module) for width in widths]
+
+
+def decode_code128(widths):
+    """由条空宽度序列(从条开始)解码 Code128，校验失败返回 None"""
+    count = len(widths)
+    if count < 19 or (count - 7) % 6:
+        return None
+    symbol_count = (count - 7) // 6
+    codes = []
+    for index in range(symbol_count):
+        # 每个符号 11 个模块，逐个符号换算，容忍整体的轻微缩放误差
+        key = "".join(map(str, _modules(widths[index * 6:index * 6 + 6], 11)))
+        code = _CODE128_INDEX.get(key)
+        if code is None:
+            return None
+        codes.append(code)
+    if "".join(map(str, _modules(widths[-7:], 13))) != CODE128_PATTERNS[CODE128_STOP]:
+        return None
+    if len(codes) < 2 or codes[0] not in (CODE128_START_A, CODE128_START_B, CODE128_START_C):
+        return None
+    data, checksum = codes[1:-1], codes[-1]
+    if (codes[0] + sum(index * code for index, code in enumerate(data, 1))) % 103 != checksum:
+        return None
+
+    code_set = "ABC"[codes[0] - CODE128_START_A]
+    shift = False
+    text = []
+    for index, code in enumerate(data):
+        current = ("B" if code_set == "A" else "A") if shift else code_set
+        shift = False
+        if code == 102:
+            # 与 zbar 一致：开头的 FNC1 表示 GS1-128，不输出；其余的 FNC1 输出为 GS 分隔符
+            if index:
+                text.append("\x1d")
+        elif current == "C":
+            if code < 100:
+                text.append(f"{code:02d}")
+            elif code in (100, 101):
+                code_set = "B" if code == 100 else "A"
+            else:
+                return None
+        elif code < 96:
+            if current == "A":
+                text.append(chr(code + 32) if code < 64 else chr(code - 64))
+            else:
+                text.append(chr(code + 32))
+        elif code == 98:
+            shift = True
+        elif code == 99:
+            code_set = "C"
+        elif code == (100 if current == "A" else 101):
+            code_set = "B" if current == "A" else "A"
+        else:
+            # FNC2/FNC3/FNC4 很少见，交给图像识别
+            return None
+    return "".join(text) or None
+
+
+def decode_code39(widths):
+    """由条空宽度序列解码 Code39(不含起止符 *，不做全 ASCII 转换)"""
+    count = len(widths)
+    if count < 29 or (count + 1) % 10:
+        return None
+    # 字符之间的间隔不参与宽窄判断
+    elements = [width for index, width in enumerate(widths) if index % 10 != 9]
+    narrow, wide = min(elements), max(elements)
+    if wide < narrow * 1.8:
+        return None
+    threshold = (narrow + wide) / 2
+    chars = []
+    for start in range(0, count, 10):
+        pattern = "".join("w" if width > threshold else "n" for width in widths[start:start + 9])
+        char = _CODE39_INDEX.get(pattern)
+        if char is None:
+            return None
+        chars.append(char)
+    if chars[0] != "*" or chars[-1] != "*" or "*" in chars[1:-1]:
+        return None
+    return "".join(chars[1:-1]) or None
+
+
+def _ean_checksum_ok(digits):
+    # 从右向左(不含校验位)交替乘 3 和 1
+    total = sum(int(digit) * (3 if index % 2 == 0 else 1) for index, digit in enumerate(reversed(digits[:-1])))
+    return (10 - total % 10) % 10 == int(digits[-1])
+
+
+def decode_ean(widths):
+    """由条空宽度序列解码 EAN-13(含 UPC-A，前补 0)或 EAN-8，校验失败返回 None"""
+    count = len(widths)
+    if count == 59:
+        side = 6
+    elif count == 43:
+        side = 4
+    else:
+        return None
+    modules = _modules(widths, 14 * side + 11)
+    middle = 3 + side * 4
+    if modules[:3] != [1, 1, 1] or modules[middle:middle + 5] != [1] * 5 or modules[-3:] != [1, 1, 1]:
+        return None
+
+    parity = []
+    digits = []
+    for half, start in enumerate((3, middle + 5)):
+        for index in range(side):
+            key = tuple(_modules(widths[start + index * 4:start + index * 4 + 4], 7))
+            if key in _EAN_L:
+                digits.append(_EAN_L[key])
+                parity.append("L")
+            elif half == 0 and side == 6 and key in _EAN_G:
+                digits.append(_EAN_G[key])
+                parity.append("G")
+            else:
+                return None
+    if side == 6:
+        pattern = "".join(parity[:6])
+        if pattern not in _EAN13_PARITY:
+            return None
+        digits.insert(0, _EAN13_PARITY.index(pattern))
+    text = "".join(map(str, digits))
+    return text if _ean_checksum_ok(text) else None
+
+
+# 解码函数及其对应的码制名称(与 pyzbar 相同)
+DECODERS = (
+    (decode_code128, ("CODE128",)),
+    (decode_ean, ("EAN13", "EAN8", "UPCA")),
+    (decode_code39, ("CODE39",)),
+)
+
+
+def decode_widths(widths, symbologies=()):
+    """依次尝试各种码制(symbologies 不为空时只尝试其中的码制)，正反两个方向(条码可能倒置)"""
+    decoders = [decoder for decoder, names in DECODERS
+                if not symbologies or any(name in symbologies for name in names)]
+    for sequence in (widths, widths[::-1]):
+        for decoder in decoders:
+            text = decoder(sequence)
+            if text:
+                return text
+    return None
+
+
+def _is_dark(color, opacity=1.0):
+    if not color or opacity is None or opacity < 0.5:
+        return False
+    if len(color) == 4:  # CMYK
+        cyan, magenta, yellow, black = color
+        color = ((1 - cyan) * (1 - black), (1 - magenta) * (1 - black), (1 - yellow) * (1 - black))
+    return sum(color) / len(color) < 0.5
+
+
+def _points_bounds(points):
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _line_rects(items):
+    """
+    填充路径中由直线段围成的水平矩形的外接矩形
+
+    经过旋转变换(如 Form XObject 旋转放置)后，矩形在绘制记录中变为 4 条首尾相连的直线段。
+    """
+    rects = []
+    points = []
+    for item in items + [None]:
+        if item is not None and item[0] == "l" and points and \
+                abs(item[1][0] - points[-1][0]) < 1e-3 and abs(item[1][1] - points[-1][1]) < 1e-3:
+            points.append(item[2])
+            continue
+        # 一个子路径结束：全部为水平或竖直线段的闭合路径视为矩形
+        if len(points) >= 4 and all(abs(a[0] - b[0]) < 1e-3 or abs(a[1] - b[1]) < 1e-3
+                                    for a, b in zip(points, points[1:])):
+            rects.append(_points_bounds(points))
+        points = [item[1], item[2]] if item is not None and item[0] == "l" else []
+    return rects
+
+
+def dark_rects(page):
+    """
+    页面上深色填充矩形(以及粗直线)的外接矩形 (x0, y0, x1, y1)，未旋转的页面坐标
+
+    条码的条可能画成矩形、四边形、直线段围成的矩形或者线宽等于条宽的竖线。
+    """
+    drawings = page.get_cdrawings() if hasattr(page, "get_cdrawings") else page.get_drawings()
+    rects = []
+    for drawing in drawings:
+        kind = drawing.get("type", "")
+        if "f" in kind and _is_dark(drawing.get("fill"), drawing.get("fill_opacity", 1.0)):
+            for item in drawing["items"]:
+                if item[0] == "re":
+                    # 经过翻转变换的矩形可能 x0 > x1
+                    x0, y0, x1, y1 = item[1]
+                    rects.append((min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)))
+                elif item[0] == "qu":
+                    rects.append(_points_bounds(item[1]))
+            if any(item[0] == "l" for item in drawing["items"]):
+                rects.extend(_line_rects(list(drawing["items"])))
+        elif kind == "s" and _is_dark(drawing.get("color"), drawing.get("stroke_opacity", 1.0)):
+            half = (drawing.get("width") or 0) / 2
+            for item in drawing["items"]:
+                if item[0] != "l" or not half:
+                    continue
+                (x0, y0), (x1, y1) = item[1], item[2]
+                if abs(x0 - x1) < 1e-3:
+                    rects.append((x0 - half, min(y0, y1), x0 + half, max(y0, y1)))
+                elif abs(y0 - y1) < 1e-3:
+                    rects.append((min(x0, x1), y0 - half, max(x0, x1), y0 + half))
+    return rects
+
+
+def bar_groups(rects):
+    """
+    把竖直的细条按位置分组，每组产出 (条空宽度列表, 外接矩形)
+
+    同一条码的条上下范围重叠、彼此间隔较小；相邻或重叠的条合并为一条(有的程序逐模块绘制)。
+    """
+    bars = sorted((rect for rect in rects
+                   if rect[3] - rect[1] >= max(MIN_BAR_LENGTH, (rect[2] - rect[0]) * MIN_BAR_ASPECT)
+                   and rect[2] > rect[0]), key=lambda rect: rect[0])
+    groups = []  # [条列表, 最窄条宽度]
+    for x0, y0, x1, y1 in bars:
+        for entry in groups:
+            group, narrowest = entry
+            last = group[-1]
+            top, bottom = group[0][1], group[0][3]
+            overlap = min(y1, bottom) - max(y0, top)
+            if overlap >= 0.5 * min(y1 - y0, bottom - top) and x0 - last[2] <= narrowest * MAX_GAP_FACTOR:
+                if x0 <= last[2] + narrowest * 0.05:
+                    group[-1] = (last[0], min(last[1], y0), max(last[2], x1), max(last[3], y1))
+                else:
+                    group.append((x0, y0, x1, y1))
+                    entry[1] = min(narrowest, x1 - x0)
+                break
+        else:
+            groups.append([[(x0, y0, x1, y1)], x1 - x0])
+
+    for group, _ in groups:
+        if len(group) < 10:
+            continue
+        widths = []
+        for index, (x0, _, x1, _) in enumerate(group):
+            if index:
+                widths.append(x0 - group[index - 1][2])
+            widths.append(x1 - x0)
+        bounds = (group[0][0], min(bar[1] for bar in group), group[-1][2], max(bar[3] for bar in group))
+        yield widths, bounds
+
+
+def find_vector_barcode(page, rois=(), symbologies=(), accept=None):
+    """
+    从页面的矢量绘制命令中识别一维条码
+
+    rois 为页面(渲染方向)坐标中依次优先查找的区域，其中的条码按区域顺序先解码，其余的按阅读顺序在后；
+    symbologies 不为空时只解码其中的码制，accept 不为 None 时跳过其返回 False 的内容(如面单上的其他条码)。
+
+    Returns:
+        (条码内容, 条码在页面(渲染方向)坐标中的 fitz.Rect)；未找到时返回 (None, None)
+    """
+    import fitz  # PyMuPDF
+
+    with stage("decode_vector"):
+        rects = dark_rects(page)
+        if len(rects) < 10:
+            return None, None
+        # 绘制命令使用未旋转的页面坐标；把 rois 转换过去比较
+        if page.rotation:
+            rois = [roi * page.derotation_matrix for roi in rois]
+            for roi in rois:
+                roi.normalize()
+
+        candidates = []
+        # 竖直的条；横向的条(条码旋转 90 度)交换坐标轴后按同样的方法处理
+        for transposed, group_rects in ((False, rects), (True, [(y0, x0, y1, x1) for x0, y0, x1, y1 in rects])):
+            for widths, (x0, y0, x1, y1) in bar_groups(group_rects):
+                if transposed:
+                    x0, y0, x1, y1 = y0, x0, y1, x1
+                roi_index = next((index for index, roi in enumerate(rois)
+                                  if x0 < roi.x1 and roi.x0 < x1 and y0 < roi.y1 and roi.y0 < y1), len(rois))
+                candidates.append((roi_index, y0, x0, widths, (x0, y0, x1, y1)))
+
+        for _, _, _, widths, bounds in sorted(candidates, key=lambda candidate: candidate[:3]):
+            text = decode_widths(widths, symbologies)
+            if text and (accept is None or accept(text)):
+                rect = fitz.Rect(bounds) * page.rotation_matrix
+                rect.normalize()
+                return text, rect
+    return None, None
+
+
+def detect_vector_barcode(page, rois=(), symbologies=(), accept=None):
+    """同 find_vector_barcode，只返回条码内容，未找到时返回 None"""
+    return find_vector_barcode(page, rois, symbologies, accept)[0]
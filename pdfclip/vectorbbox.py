@@ -0,0 +1,94 @@
+"""不栅格化的内容边界检测
+
+从页面的绘制记录(PyMuPDF 的 bbox log)中收集文字、路径和图像的外接矩形，直接得到内容区域，
+省去为查找内容而渲染页面。快递系统导出的面单大多是矢量PDF，这种方式比渲染快得多。
+以扫描图像为主的页面无法由此判断墨迹位置，返回 RASTER_FALLBACK，由调用方改用渲染检测。
+"""
+import math
+
+import fitz  # PyMuPDF
+
+from pdfclip.modes import CROP_MODES  # noqa: F401  (裁剪区域检测方式)
+
+# vector_content_rect 无法判断时的返回值(与没有内容的 None 区分)
+RASTER_FALLBACK = object()
+
+# 图像覆盖页面面积超过该比例时视为扫描页
+SCANNED_IMAGE_FRACTION = 0.5
+
+# 填充路径覆盖超过该比例时检查其颜色，白色背景不算内容
+LARGE_FILL_FRACTION = 0.25
+
+IMAGE_KINDS = ("fill-image", "fill-imgmask")
+
+
+def page_pixel_size(page):
+    """与 72 DPI 渲染结果相同的页面像素尺寸"""
+    irect = page.rect.irect
+    return irect.width, irect.height
+
+
+def _white_fill_rects(page):
+    """页面上没有描边的白色填充路径的矩形(未旋转坐标)"""
+    return [drawing["rect"] for drawing in page.get_drawings()
+            if drawing.get("fill") and min(drawing["fill"]) >= 0.99 and not drawing.get("color")]
+
+
+def _is_white_fill(rect, white_rects):
+    return any(abs(rect.x0 - white.x0) < 1 and abs(rect.y0 - white.y0) < 1 and
+               abs(rect.x1 - white.x1) < 1 and abs(rect.y1 - white.y1) < 1 for white in white_rects)
+
+
+def vector_content_rect(page, border_width=5):
+    """
+    由绘制记录计算内容区域，坐标与 72 DPI 渲染后 content_rect 的结果一致
+
+    与渲染检测相同，距页面边缘 border_width 点以内的部分不算内容；结果向外取整到整点。
+    文字按字形框计算，可能比实际墨迹略大(约 1 点)；白色的大面积背景填充不算内容。
+
+    Returns:
+        fitz.Rect；页面没有内容时返回 None；以扫描图像为主时返回 RASTER_FALLBACK
+    """
+    width, height = page_pixel_size(page)
+    page_area = float(width * height) or 1.0
+    # bbox log 使用未旋转的页面坐标，按旋转矩阵转换到渲染时的方向
+    a, b, c, d, e, f = page.rotation_matrix
+    page_x1, page_y1 = page.rect.x1, page.rect.y1
+    # 与 content_rect 相同的边框语义：负数边框不排除，边框占满页面时视为没有内容
+    bw = max(0, int(border_width))
+    inner_x1, inner_y1 = width - bw, height - bw
+
+    # 对象很多(如二维码由数百个矩形组成)，这里用浮点数运算，避免逐个创建 fitz.Rect
+    image_area = 0.0
+    white_rects = None
+    left = top = math.inf
+    right = bottom = -math.inf
+    for kind, (x0, y0, x1, y1) in page.get_bboxlog():
+        # clip-*、ignore-text(不可见文字)以及分组标记都不产生墨迹
+        if not kind.startswith(("fill-", "stroke-")):
+            continue
+        if kind == "fill-path" and (x1 - x0) * (y1 - y0) > page_area * LARGE_FILL_FRACTION:
+            if white_rects is None:
+                white_rects = _white_fill_rects(page)
+            if _is_white_fill(fitz.Rect(x0, y0, x1, y1), white_rects):
+                continue
+        # 旋转为 90 度的倍数，变换两个对角点即可
+        px0, py0 = a * x0 + c * y0 + e, b * x0 + d * y0 + f
+        px1, py1 = a * x1 + c * y1 + e, b * x1 + d * y1 + f
+        x0, x1 = max(min(px0, px1), 0.0), min(max(px0, px1), page_x1)
+        y0, y1 = max(min(py0, py1), 0.0), min(max(py0, py1), page_y1)
+        if x0 >= x1 or y0 >= y1:
+            continue
+        if kind in IMAGE_KINDS:
+            image_area += (x1 - x0) * (y1 - y0)
+        # 只在边框内的部分不算内容(逐个对象裁剪，与逐像素判断一致)
+        x0, y0, x1, y1 = max(x0, bw), max(y0, bw), min(x1, inner_x1), min(y1, inner_y1)
+        if x0 < x1 and y0 < y1:
+            left, top = min(left, x0), min(top, y0)
+            right, bottom = max(right, x1), max(bottom, y1)
+
+    if image_area >= page_area * SCANNED_IMAGE_FRACTION:
+        return RASTER_FALLBACK
+    if 2 * bw >= height or 2 * bw >= width or left > right:
+        return None
+    return fitz.Rect(math.floor(left), math.floor(top), math.ceil(right), math.ceil(bottom))
@@ -0,0 +1,305 @@
+"""
+热文件夹监控：持续处理投放到输入目录中的PDF
+
+Linux 上使用 inotify，在文件写入关闭或移入时立即唤醒；其他平台或 inotify 不可用时定时轮询。
+文件的大小和修改时间在 settle 秒内保持不变才视为写入完成，随后送入处理流水线，
+处理完成后原文件移入完成目录，出错时移入失败目录。与批处理相同，每页写入处理清单和重命名报告
+(由调用方打开并传入)，启用跟踪时记录每个文件和每页的时间段。每个文件的等待与处理耗时记录在 WatchMetrics 中。
+"""
+import collections
+import json
+import logging
+import os
+import select
+import shutil
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+from pdfclip.manifest import source_signature
+from pdfclip.metrics import StageMetrics
+
+logger = logging.getLogger("pdfclip")
+
+# inotify 事件：写入后关闭、移入目录
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+
+
+class InotifyWaker:
+    """通过 inotify 等待目录中有文件写入完成或移入"""
+
+    def __init__(self, directory):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        if libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(error, f"无法监控目录: {directory}")
+        self.fd = fd
+
+    def wait(self, timeout):
+        """等待事件或超时，有事件时返回 True"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        # 只需要被唤醒，事件内容由随后的目录扫描处理
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWaker:
+    """定时轮询"""
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        return False
+
+    def close(self):
+        pass
+
+
+def create_waker(directory, use_inotify=True):
+    """优先使用 inotify，不可用时退回定时轮询"""
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            return InotifyWaker(directory)
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify 不可用，改为定时轮询: {e}")
+    return PollingWaker()
+
+
+@dataclass
+class FileLatency:
+    """单个文件的处理耗时(秒)"""
+    name: str
+    pages: int
+    ok: bool
+    wait_seconds: float      # 发现文件到开始处理(含等待写入完成)
+    process_seconds: float   # 处理耗时
+
+    @property
+    def total_seconds(self):
+        return self.wait_seconds + self.process_seconds
+
+
+def percentile(values, fraction):
+    """最近邻百分位数，values 为空时返回 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class WatchMetrics:
+    """
+    监控模式的累计统计与最近文件的耗时分布
+
+    只保留最近 window 个文件的耗时，长时间运行时内存占用保持不变。
+    """
+
+    def __init__(self, window=1000):
+        self.files = 0
+        self.failed_files = 0
+        self.pages = 0
+        self.recent = collections.deque(maxlen=window)
+        self.started = time.time()
+        self.stages = StageMetrics()  # 各阶段耗时
+
+    def record(self, latency):
+        self.files += 1
+        self.pages += latency.pages
+        if not latency.ok:
+            self.failed_files += 1
+        self.recent.append(latency)
+
+    def summary(self):
+        totals = [latency.total_seconds for latency in self.recent]
+        processing = [latency.process_seconds for latency in self.recent]
+        return {
+            "files": self.files,
+            "failed_files": self.failed_files,
+            "pages": self.pages,
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "latency_p50_seconds": percentile(totals, 0.5),
+            "latency_p95_seconds": percentile(totals, 0.95),
+            "latency_max_seconds": max(totals) if totals else None,
+            "process_p50_seconds": percentile(processing, 0.5),
+            "last_file": dict(asdict(self.recent[-1]), total_seconds=self.recent[-1].total_seconds)
+            if self.recent else None,
+            "stages": self.stages.to_dict()["stages"],
+        }
+
+    def write(self, path):
+        """原子地写出统计 JSON，供监控脚本读取"""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+
+class HotFolder:
+    """
+    监控输入目录并逐个处理新投放的PDF
+
+    Args:
+        input_dir: 监控的输入目录(只扫描顶层文件)
+        output_folder: 输出文件夹
+        done_dir / failed_dir: 处理完成 / 失败的原文件移入的目录，默认为输入目录下的 已完成 / 失败
+        settle_seconds: 文件大小和修改时间保持不变多久后视为写入完成
+        poll_interval: 轮询间隔(秒)；使用 inotify 时为兜底的重新扫描间隔
+        metrics_path: 每处理完一个文件后写出统计 JSON 的路径
+        prometheus_path: 每处理完一个文件后写出各阶段耗时(Prometheus textfile 格式)的路径
+        manifest: RunManifest，每个成功处理的页面追加一条记录
+        report: 重命名报告写入器(pdfclip.report)，以条码命名的页面逐行写入
+        **options: 传给 engine.process_files 的处理参数
+    """
+
+    def __init__(self, input_dir, output_folder, done_dir=None, failed_dir=None, settle_seconds=1.0,
+                 poll_interval=1.0, use_inotify=True, metrics_path=None, prometheus_path=None, manifest=None,
+                 report=None, **options):
+        self.input_dir = input_dir
+        self.output_folder = output_folder
+        self.done_dir = done_dir or os.path.join(input_dir, "已完成")
+        self.failed_dir = failed_dir or os.path.join(input_dir, "失败")
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.metrics_path = metrics_path
+        self.prometheus_path = prometheus_path
+        self.manifest = manifest
+        self.report = report
+        self.options = options
+        self.metrics = WatchMetrics()
+        self._pending = {}  # 路径 -> (签名, 签名最后变化的时间, 首次发现的时间)
+
+    def scan(self):
+        """扫描输入目录，返回已写入完成、可以处理的文件(按发现顺序)"""
+        now = time.monotonic()
+        seen = set()
+        ready = []
+        with os.scandir(self.input_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(".pdf") or entry.name.startswith("."):
+                    continue
+                path = entry.path
+                seen.add(path)
+                try:
+                    signature = source_signature(path)
+                except OSError:
+                    continue
+                previous = self._pending.get(path)
+                if previous is None or previous[0] != signature:
+                    first_seen = previous[2] if previous else now
+                    self._pending[path] = (signature, now, first_seen)
+                elif now - previous[1] >= self.settle_seconds and self._readable(path):
+                    ready.append(path)
+
+        # 被外部删除或移走的文件不再跟踪
+        for path in list(self._pending):
+            if path not in seen:
+                del self._pending[path]
+        return sorted(ready, key=lambda path: self._pending[path][2])
+
+    @staticmethod
+    def _readable(path):
+        # Windows 上写入方仍持有文件时无法打开
+        try:
+            with open(path, "rb"):
+                return True
+        except OSError:
+            return False
+
+    def _next_timeout(self):
+        """有文件等待写入完成时，在其稳定时间到达时再次扫描"""
+        if not self._pending:
+            return self.poll_interval if not self.use_inotify else max(self.poll_interval, 30.0)
+        now = time.monotonic()
+        remaining = min(changed + self.settle_seconds - now for _, changed, _ in self._pending.values())
+        return min(self.poll_interval, max(0.05, remaining))
+
+    def process_file(self, path):
+        """处理一个文件并移走原文件，返回 FileLatency"""
+        from pdfclip.engine import process_files
+        from pdfclip.pipeline import unique_output_path
+        from pdfclip.report import report_row
+
+        first_seen = self._pending.pop(path)[2]
+        started = time.monotonic()
+        pages = 0
+        ok = True
+        for result in process_files([path], self.output_folder, metrics=self.metrics.stages, **self.options):
+            if result.error:
+                ok = False
+                if result.page_number == 0:
+                    logger.error(f"打开 {result.source_name} 时发生错误: {result.error}")
+                else:
+                    logger.error(f"处理 {result.source_name} 第 {result.page_number} 页时发生错误: {result.error}")
+                continue
+            pages += 1
+            if self.manifest is not None:
+                self.manifest.append(result)
+            if result.renamed and self.report is not None:
+                self.report.write(report_row(result))
+            if not result.renamed and self.options.get("enable_rename", True):
+                reason = f"（{result.barcode_error}）" if result.barcode_error else ""
+                logger.warning(f"{result.source_name} 第 {result.page_number} 页未识别到有效条码{reason}: "
+                               f"{result.output_name}")
+            else:
+                logger.info(f"{result.source_name} 第 {result.page_number} 页 -> {result.output_name}")
+        finished = time.monotonic()
+
+        target_dir = self.done_dir if ok else self.failed_dir
+        os.makedirs(target_dir, exist_ok=True)
+        try:
+            shutil.move(path, unique_output_path(target_dir, os.path.basename(path)))
+        except OSError as e:
+            logger.error(f"无法移动原文件 {path}: {e}")
+
+        latency = FileLatency(name=os.path.basename(path), pages=pages, ok=ok,
+                              wait_seconds=round(started - first_seen, 3),
+                              process_seconds=round(finished - started, 3))
+        self.metrics.record(latency)
+        logger.info(f"{latency.name}: {pages} 页，等待 {latency.wait_seconds:.2f} 秒，"
+                    f"处理 {latency.process_seconds:.2f} 秒{'' if ok else '，已移入失败目录'}")
+        if self.metrics_path:
+            self.metrics.write(self.metrics_path)
+        if self.prometheus_path:
+            self.metrics.stages.write_prometheus(self.prometheus_path)
+        return latency
+
+    def run(self, stop_event=None, once=False):
+        """
+        持续监控直到 stop_event 被设置(或 Ctrl+C)
+
+        once 为 True 时处理完当前目录中已有的文件后返回。
+        """
+        os.makedirs(self.input_dir, exist_ok=True)
+        os.makedirs(self.output_folder, exist_ok=True)
+        waker = create_waker(self.input_dir, self.use_inotify)
+        self.use_inotify = isinstance(waker, InotifyWaker)
+        logger.info(f"开始监控 {self.input_dir}（{'inotify' if self.use_inotify else '轮询'}），输出到 {self.output_folder}")
+        try:
+            while not (stop_event and stop_event.is_set()):
+                for path in self.scan():
+                    if stop_event and stop_event.is_set():
+                        break
+                    self.process_file(path)
+                if once and not self._pending:
+                    break
+                waker.wait(self._next_timeout())
+        finally:
+            waker.close()
+        return self.metrics
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 不安装也能导入 pdfclip(与 benchmarks 相同)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
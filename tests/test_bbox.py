@@ -0,0 +1,78 @@
+"""find_content_bbox/content_rect 与 auto_crop_pdf 原逐像素循环的结果一致"""
+import numpy as np
+import pytest
+
+from pdfclip.bbox import content_rect, find_content_bbox
+
+
+def reference_bbox(gray, border_width):
+    """auto_crop_pdf 原来的逐像素循环"""
+    height, width = gray.shape
+    left, top, right, bottom = width, height, 0, 0
+
+    def is_border_pixel(x, y):
+        return x < border_width or y < border_width or x >= width - border_width or y >= height - border_width
+
+    for y in range(height):
+        for x in range(width):
+            if not is_border_pixel(x, y) and gray[y, x] < 255:
+                left = min(left, x)
+                right = max(right, x)
+                top = min(top, y)
+                bottom = max(bottom, y)
+    if left == width and top == height and right == 0 and bottom == 0:
+        return None
+    return left, top, right, bottom
+
+
+def random_pages(count=40, seed=0):
+    """白底上随机散布少量非白像素的小页面，部分页面在边缘画边框"""
+    rng = np.random.default_rng(seed)
+    for index in range(count):
+        height, width = rng.integers(8, 48, size=2)
+        gray = np.full((height, width), 255, dtype=np.uint8)
+        for _ in range(rng.integers(1, 6)):
+            gray[rng.integers(0, height), rng.integers(0, width)] = rng.integers(0, 255)
+        if index % 3 == 0:
+            gray[0, :] = gray[-1, :] = gray[:, 0] = gray[:, -1] = 0
+        yield gray
+
+
+BORDERS = [0, 1, 3, -400, 24, 10000]
+
+
+@pytest.mark.parametrize("border_width", BORDERS)
+@pytest.mark.parametrize("coarse_factor", [1, 2, 3, 8])
+def test_matches_reference_loop(border_width, coarse_factor):
+    for gray in random_pages():
+        assert find_content_bbox(gray, border_width, coarse_factor) == reference_bbox(gray, border_width)
+
+
+@pytest.mark.parametrize("border_width", BORDERS)
+def test_all_white_page(border_width):
+    gray = np.full((30, 20), 255, dtype=np.uint8)
+    assert find_content_bbox(gray, border_width) is None
+    assert find_content_bbox(gray, border_width, coarse_factor=4) is None
+    assert content_rect(gray, border_width) is None
+
+
+def test_only_border_pixels():
+    gray = np.full((30, 20), 255, dtype=np.uint8)
+    gray[:2, :] = 0
+    assert find_content_bbox(gray, 2) is None
+    assert find_content_bbox(gray, 0) == reference_bbox(gray, 0) == (0, 0, 19, 1)
+
+
+def test_single_pixel_at_origin():
+    gray = np.full((10, 10), 255, dtype=np.uint8)
+    gray[0, 0] = 254
+    assert find_content_bbox(gray, 0) == reference_bbox(gray, 0) == (0, 0, 0, 0)
+    assert find_content_bbox(gray, 0, coarse_factor=4) == (0, 0, 0, 0)
+
+
+@pytest.mark.parametrize("coarse_factor", [1, 4])
+def test_content_rect_is_exclusive(coarse_factor):
+    gray = np.full((40, 30), 255, dtype=np.uint8)
+    gray[5:12, 7:21] = 0
+    rect = content_rect(gray, 2, coarse_factor)
+    assert tuple(rect) == (7, 5, 21, 12)
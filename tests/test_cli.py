@@ -0,0 +1,25 @@
+"""命令行：解析参数前不加载处理引擎的依赖"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("fitz", "pymupdf", "numpy", "cv2", "pyzbar", "PIL", "pdf2image", "openpyxl")
+
+
+def test_import_cli_loads_no_heavy_dependencies():
+    code = ("import sys, pdfclip.cli\n"
+            "pdfclip.cli.build_parser().format_help()\n"
+            f"print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == ""
+
+
+def test_roi_memory_is_opt_in():
+    from pdfclip.cli import build_parser
+
+    parser = build_parser()
+    assert parser.parse_args(["in.pdf"]).roi_memory is None
+    assert parser.parse_args(["in.pdf", "--roi-memory"]).roi_memory == ""  # 使用默认的学习文件
+    assert parser.parse_args(["in.pdf", "--roi-memory", "rois.json"]).roi_memory == "rois.json"
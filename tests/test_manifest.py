@@ -0,0 +1,108 @@
+"""断点清单：续传时跳过已完成的页面，并重建重命名报告"""
+import os
+
+import fitz  # PyMuPDF
+
+from pdfclip.engine import process_files
+from pdfclip.manifest import RunManifest
+from pdfclip.pipeline import PageResult
+
+
+def make_pdf(path, pages=3):
+    doc = fitz.open()
+    for index in range(pages):
+        page = doc.new_page(width=300, height=400)
+        page.draw_rect(fitz.Rect(40 + index, 50, 200, 300), color=(0, 0, 0), fill=(0, 0, 0))
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_result(tmp_path, source, page_number, barcode=None):
+    output_path = tmp_path / "out" / f"{barcode or f'page_{page_number}'}.pdf"
+    output_path.parent.mkdir(exist_ok=True)
+    output_path.write_bytes(b"%PDF")
+    return PageResult(source_name=os.path.basename(source), page_number=page_number,
+                      output_path=str(output_path), barcode=barcode, renamed=barcode is not None,
+                      source_path=str(source))
+
+
+def test_resume_reads_completed_pages(tmp_path):
+    source = make_pdf(str(tmp_path / "a.pdf"))
+    path = str(tmp_path / "manifest.jsonl")
+    with RunManifest(path) as manifest:
+        manifest.append(make_result(tmp_path, source, 1, "SF0001"))
+        manifest.append(make_result(tmp_path, source, 2))
+
+    with RunManifest(path, resume=True) as manifest:
+        assert manifest.completed_pages() == {os.path.abspath(source): {1, 2}}
+
+
+def test_new_run_clears_manifest(tmp_path):
+    source = make_pdf(str(tmp_path / "a.pdf"))
+    path = str(tmp_path / "manifest.jsonl")
+    with RunManifest(path) as manifest:
+        manifest.append(make_result(tmp_path, source, 1))
+    with RunManifest(path) as manifest:
+        assert manifest.records == []
+    with RunManifest(path, resume=True) as manifest:
+        assert manifest.completed_pages() == {}
+
+
+def test_changed_source_or_missing_output_is_not_completed(tmp_path):
+    source = make_pdf(str(tmp_path / "a.pdf"))
+    other = make_pdf(str(tmp_path / "b.pdf"))
+    path = str(tmp_path / "manifest.jsonl")
+    with RunManifest(path) as manifest:
+        manifest.append(make_result(tmp_path, source, 1))
+        removed = make_result(tmp_path, other, 1, "YT0002")
+        manifest.append(removed)
+    os.remove(removed.output_path)
+    make_pdf(source, pages=4)  # 源文件被替换：大小和修改时间都变了
+
+    with RunManifest(path, resume=True) as manifest:
+        assert manifest.completed_pages() == {}
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    source = make_pdf(str(tmp_path / "a.pdf"))
+    path = str(tmp_path / "manifest.jsonl")
+    with RunManifest(path) as manifest:
+        manifest.append(make_result(tmp_path, source, 1))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"source": "')  # 崩溃时写了一半的记录
+
+    with RunManifest(path, resume=True) as manifest:
+        assert manifest.completed_pages() == {os.path.abspath(source): {1}}
+
+
+def test_report_rows_keep_last_record_of_skipped_pages(tmp_path):
+    source = make_pdf(str(tmp_path / "a.pdf"))
+    path = str(tmp_path / "manifest.jsonl")
+    with RunManifest(path) as manifest:
+        manifest.append(make_result(tmp_path, source, 1, "SF0001"))
+        manifest.append(make_result(tmp_path, source, 2, "SF0002"))
+        manifest.append(make_result(tmp_path, source, 1, "SF0003"))
+        manifest.append(make_result(tmp_path, source, 3))
+
+    with RunManifest(path, resume=True) as manifest:
+        rows = manifest.report_rows(manifest.completed_pages())
+    assert [(row["页码"], row["条码内容"]) for row in rows] == [(2, "SF0002"), (1, "SF0003")]
+
+
+def test_process_files_skips_completed_pages(tmp_path):
+    source = make_pdf(str(tmp_path / "a.pdf"))
+    output = str(tmp_path / "out")
+    path = str(tmp_path / "manifest.jsonl")
+    with RunManifest(path) as manifest:
+        for result in process_files([source], output, enable_rename=False):
+            assert result.error is None
+            manifest.append(result)
+            if result.page_number == 2:
+                break  # 模拟中途中断
+
+    with RunManifest(path, resume=True) as manifest:
+        completed = manifest.completed_pages()
+        assert completed == {os.path.abspath(source): {1, 2}}
+        results = list(process_files([source], output, enable_rename=False, completed=completed))
+    assert [result.page_number for result in results] == [3]
@@ -0,0 +1,84 @@
+"""快递公司配置：默认命名规则与原来的条码处理规则等价，配置文件的解析与校验"""
+import json
+import random
+
+import pytest
+
+from pdfclip.profiles import DEFAULT_PROFILE, DEFAULT_ROI, CarrierProfile, load_profiles
+
+
+def legacy_normalize(barcode):
+    """原 process_pdf_files_thread 中的条码处理规则"""
+    if barcode.startswith('4') and len(barcode) > 22:
+        barcode = barcode[-22:]  # 截取后22位
+    elif barcode.startswith('9') and len(barcode) > 22:
+        barcode = barcode[-12:]  # 截取后12位
+    return barcode
+
+
+def sample_barcodes():
+    rng = random.Random(0)
+    alphabet = "0123456789ABCDEFSFYT-_ \n\t\x1d条码"
+    for first in "4958A\n":
+        for length in range(0, 40):
+            yield first + "".join(rng.choice(alphabet) for _ in range(length))
+    yield ""
+
+
+def test_default_normalize_matches_legacy_rules():
+    for barcode in sample_barcodes():
+        assert DEFAULT_PROFILE.normalized(barcode) == legacy_normalize(barcode), repr(barcode)
+
+
+@pytest.mark.parametrize("barcode, expected", [
+    ("4" + "1" * 21, "4" + "1" * 21),                   # 22 位不截取
+    ("4" + "0" * 9 + "1234567890123456789012", "1234567890123456789012"),
+    ("9" + "0" * 21, "9" + "0" * 21),
+    ("9" + "0" * 10 + "123456789012", "123456789012"),
+    ("SF1234567890123456789012345", "SF1234567890123456789012345"),
+])
+def test_default_normalize_boundaries(barcode, expected):
+    assert DEFAULT_PROFILE.normalized(barcode) == expected == legacy_normalize(barcode)
+
+
+def test_custom_normalize_and_pattern():
+    profile = CarrierProfile("京东", pattern=r"JD[0-9A-Z]{13}(-\d+){0,3}",
+                             normalize=((r"(JD[0-9A-Z]{13})-.*", r"\1"),))
+    assert profile.accepts("JDVA12345678901-1-1")
+    assert not profile.accepts("SF1234567890")
+    assert not profile.accepts("")
+    assert profile.normalized("JDVA12345678901-1-1") == "JDVA12345678901"
+    assert profile.normalized("JDVA12345678901") == "JDVA12345678901"
+
+
+def write_profiles(tmp_path, profiles):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps({"profiles": profiles}, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def test_load_profiles(tmp_path):
+    profiles = load_profiles(write_profiles(tmp_path, [
+        {"name": "顺丰", "match": {"keywords": ["顺丰"], "page_size_mm": [100, 150]},
+         "rois": [[0.5, 0.05, 1.0, 0.35]], "symbologies": ["code128"], "pattern": "SF\\d{12,13}",
+         "normalize": []},
+        {"name": "其他"},
+    ]))
+    assert [profile.name for profile in profiles] == ["顺丰", "其他"]
+    assert profiles[0].symbologies == ("CODE128",)
+    assert profiles[0].page_size_mm == (100.0, 150.0)
+    assert profiles[0].normalized("SF123456789012") == "SF123456789012"
+    assert profiles[1].rois == (DEFAULT_ROI,)
+    assert profiles[1].normalized("9" + "0" * 30) == legacy_normalize("9" + "0" * 30)
+
+
+@pytest.mark.parametrize("profile", [
+    {"rois": [[0, 0, 1, 1]]},
+    {"name": "a", "rois": [[0.5, 0.5, 0.4, 1]]},
+    {"name": "a", "symbologies": ["CODE11"]},
+    {"name": "a", "pattern": "("},
+    {"name": "a", "normalize": [["[", ""]]},
+])
+def test_invalid_profiles(tmp_path, profile):
+    with pytest.raises(ValueError):
+        load_profiles(write_profiles(tmp_path, [profile]))
@@ -0,0 +1,52 @@
+"""裁剪用的灰度图像与原 auto_crop_pdf 的 RGB -> PIL "L" 转换一致"""
+import fitz  # PyMuPDF
+import numpy as np
+import pytest
+
+from pdfclip.bbox import content_rect
+from pdfclip.pipeline import find_crop_rect
+from pdfclip.raster import render_luminance
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def legacy_gray(page):
+    """原 auto_crop_pdf：默认 RGB 渲染，经 PIL 转换为灰度"""
+    pix = page.get_pixmap()
+    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    return np.asarray(image.convert("L"))
+
+
+def faint_label(rotation=0):
+    """内容四周是抗锯齿的近白细线和浅色文字，落在非整数像素位置"""
+    doc = fitz.open()
+    page = doc.new_page(width=283, height=425)
+    page.draw_rect(fitz.Rect(70, 90, 210, 300), color=None, fill=(0, 0, 0))
+    page.draw_line((20.3, 30.6), (262.7, 30.6), color=(1, 1, 0.99), width=0.3)
+    page.draw_line((18.4, 60.2), (18.4, 380.5), color=(0.99, 1, 1), width=0.2)
+    page.draw_line((40.5, 398.45), (240.25, 398.45), color=(0.97, 0.97, 0.97), width=0.1)
+    page.draw_line((265.6, 50.1), (265.6, 390.9), color=(1, 0.995, 1), width=0.4)
+    page.insert_text((30.7, 330.3), "SF1234567890", fontsize=7, color=(0.9, 0.9, 0.92))
+    page.insert_text((150.2, 370.8), "收件人", fontname="china-s", fontsize=6, color=(1, 0.98, 0.9))
+    page.set_rotation(rotation)
+    return doc
+
+
+def test_luminance_matches_pil():
+    rgb = np.random.default_rng(0).integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+    doc = fitz.open()
+    page = doc.new_page(width=64, height=64)
+    page.insert_image(page.rect, pixmap=fitz.Pixmap(fitz.csRGB, 64, 64, rgb.tobytes(), False))
+    assert np.array_equal(render_luminance(page), legacy_gray(page))
+
+
+@pytest.mark.parametrize("rotation", [0, 90])
+@pytest.mark.parametrize("border_width", [0, 5, 20])
+def test_crop_rect_matches_legacy_rendering(rotation, border_width):
+    doc = faint_label(rotation)
+    page = doc[0]
+    gray = legacy_gray(page)
+    assert np.array_equal(render_luminance(page), gray)
+    crop_rect, size = find_crop_rect(page, border_width)
+    assert crop_rect == content_rect(gray, border_width)
+    assert size == (gray.shape[1], gray.shape[0])
@@ -0,0 +1,71 @@
+"""重命名报告的 CSV/JSONL/XLSX 写入器"""
+import csv
+import json
+
+import pytest
+
+from pdfclip.pipeline import PageResult
+from pdfclip.report import REPORT_COLUMNS, open_report_sink, report_row
+
+ROWS = [
+    {"原始文件名": "面单.pdf", "页码": 1, "新文件名": "SF1234567890.pdf", "条码内容": "SF1234567890"},
+    {"原始文件名": "面单.pdf", "页码": 2, "新文件名": "YT9876543210.pdf", "条码内容": "YT9876543210"},
+]
+
+
+def test_report_row_from_page_result():
+    result = PageResult(source_name="面单.pdf", page_number=3, output_path="/out/SF1.pdf", barcode="SF1")
+    assert report_row(result) == {"原始文件名": "面单.pdf", "页码": 3, "新文件名": "SF1.pdf", "条码内容": "SF1"}
+
+
+def test_csv_rows_are_on_disk_before_close(tmp_path):
+    path = tmp_path / "报告" / "report.csv"
+    sink = open_report_sink(str(path))
+    sink.write(ROWS[0])
+    # 每行写入后立即刷新，中途退出时已完成的行仍在磁盘上
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        assert list(csv.reader(f)) == [REPORT_COLUMNS, ["面单.pdf", "1", "SF1234567890.pdf", "SF1234567890"]]
+    sink.write(ROWS[1])
+    sink.close()
+    assert sink.rows == 2
+    with open(path, "rb") as f:
+        assert f.read(3) == b"\xef\xbb\xbf"  # BOM，Excel 能正确识别中文
+
+
+def test_jsonl_rows(tmp_path):
+    path = tmp_path / "report.jsonl"
+    with open_report_sink(str(path)) as sink:
+        sink.write_rows(ROWS)
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == ROWS
+
+
+def test_xlsx_written_on_close(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = tmp_path / "report.xlsx"
+    path.write_bytes(b"old report")
+    sink = open_report_sink(str(path))
+    # 旧报告在打开时删除，新报告在 close() 时生成
+    assert not path.exists()
+    sink.write_rows(ROWS)
+    sink.write({"原始文件名": "a.pdf", "页码": 1})
+    sink.close()
+    sink.close()
+    rows = list(openpyxl.load_workbook(path).active.iter_rows(values_only=True))
+    assert rows == [tuple(REPORT_COLUMNS)] + [tuple(row[column] for column in REPORT_COLUMNS) for row in ROWS] \
+        + [("a.pdf", 1, None, None)]
+
+
+def test_xlsx_written_when_processing_raises(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = tmp_path / "report.xlsx"
+    with pytest.raises(RuntimeError):
+        with open_report_sink(str(path)) as sink:
+            sink.write(ROWS[0])
+            raise RuntimeError("处理中断")
+    assert openpyxl.load_workbook(path).active.max_row == 2
+
+
+def test_unsupported_extension(tmp_path):
+    with pytest.raises(ValueError):
+        open_report_sink(str(tmp_path / "report.txt"))
@@ -0,0 +1,60 @@
+"""结果缓存：页面哈希包含嵌入的字体程序，None 结果按 NEGATIVE_TTL 过期"""
+import sqlite3
+
+import fitz  # PyMuPDF
+
+from pdfclip import resultcache
+from pdfclip.resultcache import MISS, ResultCache, page_fingerprint
+
+
+def page_with_font(font_name, text="SF1234567890"):
+    doc = fitz.open()
+    page = doc.new_page(width=283, height=425)
+    page.insert_font(fontname="F0", fontbuffer=fitz.Font(font_name).buffer)
+    page.insert_text((40, 60), text, fontname="F0", fontsize=12)
+    return doc
+
+
+def test_fingerprint_changes_with_embedded_font():
+    tiro, tiro_again, courier = page_with_font("tiro"), page_with_font("tiro"), page_with_font("cour")
+    assert page_fingerprint(tiro[0]) == page_fingerprint(tiro_again[0])
+    assert page_fingerprint(tiro[0]) != page_fingerprint(courier[0])
+
+
+def test_fingerprint_changes_with_font_program_only():
+    """内容流和字体字典都相同，只替换了嵌入的字体程序"""
+    doc = page_with_font("tiro")
+    before = page_fingerprint(doc[0])
+    font_xref = doc[0].get_fonts()[0][0]
+    streams = [xref for xref in resultcache._font_xrefs(doc, font_xref) if doc.xref_is_stream(xref)]
+    assert streams
+    program = bytearray(doc.xref_stream(streams[-1]))
+    program[len(program) // 2] ^= 0xFF  # 同样大小、字形数据不同的字体程序
+    doc.update_stream(streams[-1], bytes(program))
+    assert page_fingerprint(doc[0]) != before
+
+
+def test_none_results_expire(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache.db"))
+    cache.put("found", "SF1")
+    cache.put("missing", None)
+    assert cache.get("found") == "SF1"
+    assert cache.get("missing") is None
+    monkeypatch.setattr(resultcache.time, "time", lambda: 1e12)
+    assert cache.get("found") == "SF1"
+    assert cache.get("missing") is MISS
+    cache.close()
+
+
+def test_old_cache_file_drops_unexpiring_none(tmp_path):
+    path = str(tmp_path / "cache.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE results (key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)")
+    conn.execute("INSERT INTO results VALUES ('found', '\"SF1\"', 0), ('missing', 'null', 0)")
+    conn.commit()
+    conn.close()
+
+    cache = ResultCache(path)
+    assert cache.get("found") == "SF1"
+    assert cache.get("missing") is MISS
+    cache.close()
@@ -0,0 +1,41 @@
+"""条码位置学习：按版式记录位置，学到的区域计入条码结果的缓存键"""
+import fitz  # PyMuPDF
+
+from benchmarks.labels import generate_labels
+from pdfclip.barcode import detect_barcode_in_document
+from pdfclip.resultcache import ResultCache
+from pdfclip.roimemory import LayoutSignature, RoiMemory, expand_region
+
+SIGNATURE = LayoutSignature((100, 150), 0b1011 << 20)
+
+
+def test_learn_and_reload(tmp_path):
+    path = str(tmp_path / "learned_rois.json")
+    memory = RoiMemory(path)
+    assert memory.rois(SIGNATURE) == ()
+    memory.learn(SIGNATURE, (0.1, 0.7, 0.4, 0.8))
+    memory.learn(SIGNATURE, (0.11, 0.71, 0.41, 0.81))  # 同一位置的小偏差合并为一个区域
+    memory.save()
+
+    rois = RoiMemory(path).rois(SIGNATURE)
+    assert len(rois) == 1
+    assert rois[0][0] < 0.1 and rois[0][3] > 0.81
+    # 其他尺寸的版式不共用
+    assert RoiMemory(path).rois(LayoutSignature((100, 180), SIGNATURE.cells)) == ()
+
+
+def test_learned_rois_are_part_of_cache_key(tmp_path):
+    path = str(tmp_path / "label.pdf")
+    barcode = generate_labels(path, 1)[0]["barcode"]
+    cache = ResultCache(str(tmp_path / "cache.db"))
+    roi = expand_region((0.1, 0.7, 0.4, 0.8))
+    nudged = tuple(value + 0.001 for value in roi)
+    with fitz.open(path) as doc:
+        assert detect_barcode_in_document(doc, cache=cache) == barcode
+        assert detect_barcode_in_document(doc, cache=cache, rois=(roi,)) == barcode
+        assert (cache.hits, cache.misses) == (0, 2)
+        # 学习时区域的微小移动不使缓存失效
+        assert detect_barcode_in_document(doc, cache=cache, rois=(nudged,)) == barcode
+        assert detect_barcode_in_document(doc, cache=cache) == barcode
+        assert (cache.hits, cache.misses) == (2, 2)
+    cache.close()
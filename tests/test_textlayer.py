@@ -0,0 +1,79 @@
+"""文字层运单号：纯数字号码只在紧挨条码时采用"""
+import fitz  # PyMuPDF
+import pytest
+
+from pdfclip.textlayer import barcode_rects, tracking_number_from_page
+
+
+def draw_bars(page, rect, count=30):
+    """在 rect 中画一组粗细交替的竖条(不需要能解码)"""
+    shape = page.new_shape()
+    step = rect.width / count
+    for index in range(count):
+        x = rect.x0 + index * step
+        shape.draw_rect(fitz.Rect(x, rect.y0, x + step * (0.3 if index % 3 else 0.6), rect.y1))
+    shape.finish(color=None, fill=(0, 0, 0), width=0)
+    shape.commit()
+
+
+def new_label():
+    doc = fitz.open()
+    return doc, doc.new_page(width=283, height=425)
+
+
+def test_number_under_vector_barcode():
+    doc, page = new_label()
+    draw_bars(page, fitz.Rect(60, 200, 240, 250))
+    page.insert_text((90, 264), "7512 3456 7890 12", fontsize=11)
+    page.insert_text((20, 60), "收件人电话 13800138000", fontname="china-s", fontsize=9)
+    assert tracking_number_from_page(page) == ("75123456789012", "数字")
+
+
+def test_phone_number_far_from_barcode_is_ignored():
+    doc, page = new_label()
+    draw_bars(page, fitz.Rect(60, 200, 240, 250))
+    page.insert_text((20, 60), "13800138000", fontsize=9)
+    page.insert_text((20, 380), "订单号 2024101712345678", fontname="china-s", fontsize=9)
+    assert tracking_number_from_page(page) == (None, None)
+
+
+def test_number_without_barcode_is_ignored():
+    doc, page = new_label()
+    # 原来按固定的右上角区域判断时会被采用
+    page.insert_text((170, 80), "13800138000", fontsize=9)
+    assert tracking_number_from_page(page) == (None, None)
+
+
+def test_number_under_barcode_image():
+    doc, page = new_label()
+    pixmap = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 120, 30), False)
+    pixmap.clear_with(0)
+    page.insert_image(fitz.Rect(150, 40, 270, 80), pixmap=pixmap, keep_proportion=False)
+    page.insert_text((160, 92), "433012345678901", fontsize=10)
+    assert [tuple(rect) for rect in barcode_rects(page)] == [(150, 40, 270, 80)]
+    assert tracking_number_from_page(page) == ("433012345678901", "数字")
+
+
+def test_full_page_image_is_not_a_barcode():
+    doc, page = new_label()
+    pixmap = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 283, 100), False)
+    pixmap.clear_with(255)
+    page.insert_image(fitz.Rect(0, 0, 283, 425), pixmap=pixmap, keep_proportion=False)
+    page.insert_text((160, 92), "13800138000", fontsize=10)
+    assert barcode_rects(page) == []
+    assert tracking_number_from_page(page) == (None, None)
+
+
+@pytest.mark.parametrize("rotation", [90, 180, 270])
+def test_rotated_page(rotation):
+    doc, page = new_label()
+    draw_bars(page, fitz.Rect(60, 200, 240, 250))
+    page.insert_text((90, 264), "75123456789012", fontsize=11)
+    page.set_rotation(rotation)
+    assert tracking_number_from_page(page) == ("75123456789012", "数字")
+
+
+def test_checked_number_needs_no_barcode():
+    doc, page = new_label()
+    page.insert_text((20, 400), "1Z 999 AA1 01 2345 6784", fontsize=9)
+    assert tracking_number_from_page(page) == ("1Z999AA10123456784", "UPS")
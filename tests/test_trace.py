@@ -0,0 +1,45 @@
+"""跟踪记录：事件分批刷新到磁盘，进程退出时自动结束文件"""
+import json
+import os
+import subprocess
+import sys
+
+from pdfclip import trace
+from pdfclip.trace import TraceWriter, span
+
+
+def read_events(path):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    # 中途的文件没有结尾的 "]"，与 Perfetto 一样容忍
+    return json.loads(text if text.rstrip().endswith("]") else text.rstrip().rstrip(",") + "]")
+
+
+def test_events_reach_disk_before_close(tmp_path, monkeypatch):
+    monkeypatch.setattr(trace, "FLUSH_EVENTS", 4)
+    monkeypatch.setattr(trace, "FLUSH_INTERVAL", 3600)
+    path = str(tmp_path / "trace.json")
+    writer = TraceWriter(path).activate()
+    try:
+        for index in range(4):
+            with span("page", cat="page", page=index):
+                pass
+        assert [event["args"]["page"] for event in read_events(path) if event["name"] == "page"] == [0, 1, 2, 3]
+    finally:
+        writer.close()
+    assert read_events(path)[-1]["name"] == "trace_end"
+    assert not trace.tracing()
+
+
+def test_closed_at_exit(tmp_path):
+    path = str(tmp_path / "trace.json")
+    code = ("import sys; from pdfclip.trace import TraceWriter, span\n"
+            f"TraceWriter({path!r}).activate()\n"
+            "with span('open', cat='file'): pass\n"
+            "sys.exit(3)\n")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 3
+    with open(path, encoding="utf-8") as f:
+        events = json.load(f)
+    assert [event["name"] for event in events if event["ph"] == "X"] == ["open"]
+    assert events[-1]["name"] == "trace_end"
@@ -0,0 +1,190 @@
+"""矢量条码识别：条空宽度解码和从绘制命令中查找条码"""
+import fitz  # PyMuPDF
+import pytest
+
+from pdfclip.vectorbarcode import (CODE128_PATTERNS, CODE128_START_B, CODE128_START_C, CODE128_STOP,
+                                   CODE39_PATTERNS, decode_code128, decode_code39, decode_ean, decode_widths,
+                                   find_vector_barcode)
+
+
+def code128_widths(text, code_set="B"):
+    """按 Code128 B 或 C 字符集编码为条空宽度序列(模块数)"""
+    if code_set == "C":
+        codes = [CODE128_START_C] + [int(text[index:index + 2]) for index in range(0, len(text), 2)]
+    else:
+        codes = [CODE128_START_B] + [ord(char) - 32 for char in text]
+    checksum = (codes[0] + sum(index * code for index, code in enumerate(codes[1:], 1))) % 103
+    return [int(width) for code in codes + [checksum, CODE128_STOP] for width in CODE128_PATTERNS[code]]
+
+
+def code39_widths(text):
+    """Code39(含起止符 *)，窄 1 宽 3，字符间隔 1"""
+    widths = []
+    for char in f"*{text}*":
+        if widths:
+            widths.append(1)
+        widths.extend(3 if element == "w" else 1 for element in CODE39_PATTERNS[char])
+    return widths
+
+
+def ean13_widths(digits):
+    """EAN-13(12 位数据 + 校验位)"""
+    l_modules = ("0001101", "0011001", "0010011", "0111101", "0100011",
+                 "0110001", "0101111", "0111011", "0110111", "0001011")
+    parity = ("LLLLLL", "LLGLGG", "LLGGLG", "LLGGGL", "LGLLGG",
+              "LGGLLG", "LGGGLL", "LGLGLG", "LGLGGL", "LGGLGL")[int(digits[0])]
+    modules = "101"
+    for index, digit in enumerate(digits[1:7]):
+        pattern = l_modules[int(digit)]
+        if parity[index] == "G":
+            pattern = "".join("1" if module == "0" else "0" for module in pattern)[::-1]
+        modules += pattern
+    modules += "01010"
+    for digit in digits[7:]:
+        modules += "".join("1" if module == "0" else "0" for module in l_modules[int(digit)])
+    modules += "101"
+    widths = [1]
+    for index in range(1, len(modules)):
+        if modules[index] == modules[index - 1]:
+            widths[-1] += 1
+        else:
+            widths.append(1)
+    return widths
+
+
+# 按码制规范的码表手工写出的条空宽度(模块数)，不经过 pdfclip.vectorbarcode 中的码表，
+# 码表中的错误不会因编码和解码使用同一张表而被抵消
+# Code128 B "PJJ123C"：起始符 B(104)，P J J 1 2 3 C，
+# 校验符 (104 + 48*1 + 42*2 + 42*3 + 17*4 + 18*5 + 19*6 + 35*7) % 103 = 55 ("W")，终止符
+CODE128_B_VECTOR = ("PJJ123C", "211214 313121 112133 112133 123221 223211 221132 131321 311321 2331112")
+# Code128 C "123456"：起始符 C(105)，12 34 56，校验符 (105 + 12*1 + 34*2 + 56*3) % 103 = 44，终止符
+CODE128_C_VECTOR = ("123456", "211232 112232 131123 331121 132131 2331112")
+# Code39 "CODE39"：* C O D E 3 9 *，每个字符 9 个单元(窄 1 宽 3)，字符之间 1 模块间隔
+CODE39_VECTOR = ("CODE39", "131131311 1 313113111 1 311131131 1 111133113 1 311133111 1 "
+                           "313311111 1 113311311 1 131131311")
+# EAN-13 4006381333931：首位 4 的左半部奇偶为 LGLLGG，起始符 中间分隔符 右半部 终止符
+EAN13_VECTOR = ("4006381333931", "111 3211 1123 1114 1411 3121 1222 11111 1411 1411 1411 3112 1411 2221 111")
+
+
+def vector_widths(vector):
+    return [int(width) for width in vector[1].replace(" ", "")]
+
+
+@pytest.mark.parametrize("vector, decode", [(CODE128_B_VECTOR, decode_code128), (CODE128_C_VECTOR, decode_code128),
+                                            (CODE39_VECTOR, decode_code39), (EAN13_VECTOR, decode_ean)])
+def test_reference_vectors(vector, decode):
+    widths = vector_widths(vector)
+    assert decode(widths) == vector[0]
+    assert decode_widths(widths) == vector[0]
+    assert decode_widths(widths[::-1]) == vector[0]  # 倒置的条码
+
+
+def test_reference_vectors_match_encoders():
+    """测试中的编码函数与手工写出的宽度一致"""
+    assert code128_widths("PJJ123C") == vector_widths(CODE128_B_VECTOR)
+    assert code128_widths("123456", "C") == vector_widths(CODE128_C_VECTOR)
+    assert code39_widths("CODE39") == vector_widths(CODE39_VECTOR)
+    assert ean13_widths("4006381333931") == vector_widths(EAN13_VECTOR)
+
+
+def scaled(widths, module=0.83, jitter=0.0):
+    """换算为点并加上交替的误差，模拟导出时的取整"""
+    return [width * module + (jitter if index % 2 else -jitter) for index, width in enumerate(widths)]
+
+
+@pytest.mark.parametrize("text, code_set", [("SF1234567890", "B"), ("JD0012345678-1-1", "B"),
+                                            ("773012345678", "C"), ("00", "C")])
+def test_code128(text, code_set):
+    widths = code128_widths(text, code_set)
+    assert decode_code128(widths) == text
+    assert decode_code128(scaled(widths, jitter=0.08)) == text
+    assert decode_widths(scaled(widths)[::-1]) == text  # 倒置的条码
+
+
+def test_code128_bad_checksum():
+    widths = code128_widths("SF1234567890")
+    # 把校验符换成另一个符号
+    widths[-13:-7] = [int(width) for width in CODE128_PATTERNS[0]]
+    assert decode_code128(widths) is None
+    assert decode_code128(widths[:-1]) is None
+
+
+def test_code39():
+    assert decode_code39(code39_widths("YT12345")) == "YT12345"
+    assert decode_code39(scaled(code39_widths("A-1 $"), module=0.5, jitter=0.05)) == "A-1 $"
+    assert decode_code39(code39_widths("YT12345")[10:]) is None  # 缺少起始符
+
+
+def test_ean13():
+    assert decode_ean(ean13_widths("6901234567892")) == "6901234567892"
+    assert decode_ean(ean13_widths("6901234567891")) is None  # 校验位错误
+
+
+def test_symbologies_filter():
+    widths = code128_widths("SF1234567890")
+    assert decode_widths(widths, ("CODE128",)) == "SF1234567890"
+    assert decode_widths(widths, ("CODE39", "EAN13")) is None
+
+
+def draw_bars(page, rect, widths):
+    module = rect.width / (sum(widths) + 20)
+    x = rect.x0 + module * 10
+    shape = page.new_shape()
+    for index, width in enumerate(widths):
+        if index % 2 == 0:
+            shape.draw_rect(fitz.Rect(x, rect.y0, x + width * module, rect.y1))
+        x += width * module
+    shape.finish(color=None, fill=(0, 0, 0), width=0)
+    shape.commit()
+
+
+def label_page(rotation=0):
+    doc = fitz.open()
+    page = doc.new_page(width=283, height=425)
+    draw_bars(page, fitz.Rect(30, 300, 250, 360), code128_widths("OTHER0001"))
+    draw_bars(page, fitz.Rect(150, 40, 270, 90), code128_widths("SF1234567890"))
+    page.set_rotation(rotation)
+    return doc
+
+
+def test_find_vector_barcode_prefers_rois():
+    doc = label_page()
+    page = doc[0]
+    # 没有条码区域时按阅读顺序
+    assert find_vector_barcode(page)[0] == "SF1234567890"
+    text, rect = find_vector_barcode(page, rois=[fitz.Rect(0, 280, 283, 400)])
+    assert text == "OTHER0001"
+    assert fitz.Rect(30, 300, 250, 360).contains(rect)
+    assert find_vector_barcode(page, accept=lambda text: text.startswith("OT"))[0] == "OTHER0001"
+
+
+@pytest.mark.parametrize("rotation", [90, 180, 270])
+def test_find_vector_barcode_rotated_page(rotation):
+    doc = label_page(rotation)
+    page = doc[0]
+    text, rect = find_vector_barcode(page)
+    assert text is not None
+    # 返回的位置使用渲染方向的坐标
+    bars = fitz.Rect(150, 40, 270, 90) if text == "SF1234567890" else fitz.Rect(30, 300, 250, 360)
+    expected = bars * page.rotation_matrix
+    expected.normalize()
+    # 绘制范围两端各含 10 模块静区，条本身占其大部分
+    assert expected.contains(rect) and rect.get_area() > 0.8 * expected.get_area()
+
+
+def test_vector_qr_is_left_to_image_decoding():
+    """二维码不在矢量识别范围内：画成方块的二维码不能被误读为一维条码"""
+    cv2 = pytest.importorskip("cv2")
+    modules = cv2.QRCodeEncoder.create().encode("SF1234567890")
+    doc = fitz.open()
+    page = doc.new_page(width=283, height=425)
+    size = 120 / modules.shape[0]
+    shape = page.new_shape()
+    for row in range(modules.shape[0]):
+        for column in range(modules.shape[1]):
+            if modules[row, column] == 0:
+                shape.draw_rect(fitz.Rect(80 + column * size, 40 + row * size,
+                                          80 + (column + 1) * size, 40 + (row + 1) * size))
+    shape.finish(color=None, fill=(0, 0, 0), width=0)
+    shape.commit()
+    assert find_vector_barcode(page) == (None, None)
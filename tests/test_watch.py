@@ -0,0 +1,37 @@
+"""监控模式：投放的文件与批处理一样写入处理清单、重命名报告和跟踪记录"""
+import csv
+import json
+import os
+
+from benchmarks.labels import generate_labels
+from pdfclip.manifest import RunManifest
+from pdfclip.report import open_report_sink
+from pdfclip.trace import TraceWriter
+from pdfclip.watch import HotFolder
+
+
+def test_watched_files_reach_report_manifest_and_trace(tmp_path):
+    input_dir = tmp_path / "in"
+    output = tmp_path / "out"
+    barcodes = [generate_labels(str(input_dir / f"{name}.pdf"), 1, seed=seed)[0]["barcode"]
+                for seed, name in enumerate(("a", "b"))]
+    for path in input_dir.glob("*.json"):
+        path.unlink()  # 真值文件不是PDF，但也不要留在监控目录中
+
+    manifest = RunManifest(str(output / "处理进度.jsonl"))
+    report = open_report_sink(str(output / "重命名报告.csv"))
+    hot_folder = HotFolder(str(input_dir), str(output), settle_seconds=0, use_inotify=False,
+                           manifest=manifest, report=report, cache_path=None, roi_memory_path=None)
+    with manifest, report, TraceWriter(str(tmp_path / "trace.json")):
+        hot_folder.run(once=True)
+
+    assert sorted(os.listdir(input_dir / "已完成")) == ["a.pdf", "b.pdf"]
+    with open(output / "重命名报告.csv", encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(row["条码内容"] for row in rows) == sorted(barcodes)
+    with open(output / "处理进度.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(record["source_name"] for record in records) == ["a.pdf", "b.pdf"]
+    with open(tmp_path / "trace.json", encoding="utf-8") as f:
+        spans = [event for event in json.load(f) if event["ph"] == "X"]
+    assert sorted(event["args"]["file"] for event in spans if event["name"] == "file") == ["a.pdf", "b.pdf"]